@@ -0,0 +1,220 @@
+# backfill.py
+"""
+Recuperação de vários dias em uma única execução, por exemplo depois de uma queda.
+
+Uma única sessão do Trier baixa o relatório de alterações de cada dia. Os códigos de
+todos os dias são consultados uma única vez e o estoque é baixado uma única vez.
+Depois as etiquetas e emails são gerados por dia ou de forma consolidada.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import *
+from file_utils import (limpar_pasta_arquivos, ler_relatorio_precos, ler_relatorios_precos_departamentos,
+                        ler_relatorios_estoque, salvar_dataframe_csv)
+from scraper import TrierScraper, alinhar_resultados
+from cache_produtos import CacheProdutos
+from estado_execucao import EstadoExecucao, filtrar_alteracoes, pares_enviados
+from historico_precos import HistoricoPrecos
+from pool_sessoes import extrair_dados_produtos_paralelo, TarefaEstoque
+from trier_http import consultar_produtos_http
+from etiquetas import gerar_etiquetas_por_filial, produtos_por_filial
+from email_sender import enviar_email_com_pdfs
+from montagem_pdf import concatenar_pdfs
+from metricas import metricas
+
+def datas_do_periodo(inicio, fim):
+    """Lista os dias de inicio a fim, inclusive"""
+    if fim < inicio:
+        raise ValueError(f"Período inválido: {inicio:%d/%m/%Y} é posterior a {fim:%d/%m/%Y}")
+    return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+def executar_backfill(datas, agrupamento=BACKFILL_AGRUPAMENTO):
+    """
+    Processa as alterações de preço de vários dias
+
+    Args:
+        datas: Lista de dias (date)
+        agrupamento: "por_dia" ou "consolidado"
+    """
+    if agrupamento not in ("por_dia", "consolidado"):
+        raise ValueError(f"Agrupamento inválido: {agrupamento}")
+    load_email_map()
+
+    print("=" * 60)
+    print(f"🚀 RECUPERAÇÃO DE {len(datas)} DIAS ({datas[0]:%d/%m/%Y} a {datas[-1]:%d/%m/%Y}, {agrupamento})")
+    print("=" * 60)
+
+    limpar_pasta_arquivos()
+    scraper = None
+    cache = CacheProdutos()
+    tarefa_estoque = None
+    estados = {dia: EstadoExecucao(data=dia.strftime("%Y-%m-%d")) for dia in datas}
+    historico = HistoricoPrecos()
+
+    try:
+        # === RELATÓRIOS DE TODOS OS DIAS NA MESMA SESSÃO ===
+        metricas.etapa("precos")
+        scraper = TrierScraper(perfil="principal")
+        scraper.login()
+
+        relatorios = {}
+        # Preços que os dias anteriores do período vão imprimir
+        a_imprimir = {}
+        for dia in datas:
+            print(f"\n📅 Alterações de {dia:%d/%m/%Y}")
+            relatorio_pdf, df_dia = _baixar_dia(scraper, dia)
+            df_dia = filtrar_alteracoes(df_dia, estados[dia], historico if HISTORICO_PRECOS_FILTRAR else None,
+                                        recentes=a_imprimir)
+            if HISTORICO_PRECOS_FILTRAR:
+                a_imprimir.update(zip(df_dia["Código"].astype(int), df_dia["Preço"].astype(float).round(2)))
+            print(f"   {len(df_dia)} alterações a tratar.")
+            if len(df_dia):
+                relatorios[dia] = (relatorio_pdf, df_dia)
+
+        if not relatorios:
+            print("⚠️ Nenhuma alteração nova no período. Encerrando...")
+            return
+
+        # === CONSULTAS E ESTOQUE UMA ÚNICA VEZ PARA TODOS OS DIAS ===
+        metricas.etapa("produtos")
+        df_codigos = pd.concat([df for _, df in relatorios.values()]).drop_duplicates("Código", ignore_index=True)
+        print(f"\n📦 {len(df_codigos)} produtos distintos no período "
+              f"({sum(len(df) for _, df in relatorios.values())} alterações).")
+
+        # A sessão de estoque conta no limite de sessões simultâneas
+        if ESTOQUE_SESSAO_PARALELA and MAX_SESSOES_TRIER >= 2:
+            tarefa_estoque = TarefaEstoque(df_codigos['Código'])
+
+        conhecidos = None
+        if PRODUTOS_BACKEND == "http":
+            conhecidos = consultar_produtos_http(df_codigos['Código'], cache=cache)
+        if MAX_SESSOES_TRIER > 1:
+            # A sessão principal é fechada e a sessão paralela de estoque conta no limite
+            scraper.fechar()
+            scraper = None
+            sessoes = max(1, MAX_SESSOES_TRIER - (1 if tarefa_estoque else 0))
+            produtos = extrair_dados_produtos_paralelo(df_codigos, cache=cache, max_sessoes=sessoes,
+                                                       conhecidos=conhecidos)
+        else:
+            produtos = scraper.extrair_dados_produtos(df_codigos, cache=cache, conhecidos=conhecidos)
+
+        metricas.etapa("estoque")
+        if tarefa_estoque:
+            arquivos_estoque = tarefa_estoque.resultado()
+        else:
+            if scraper is None:
+                scraper = TrierScraper(perfil="principal")
+                scraper.login()
+            arquivos_estoque = scraper.baixar_relatorios_estoque(df_codigos['Código'])
+        if scraper:
+            scraper.fechar()
+            scraper = None
+        df_estoque = ler_relatorios_estoque(arquivos_estoque)
+
+        # === ETIQUETAS E EMAILS ===
+        for periodo, relatorio_pdf, df, dias in _agrupar(relatorios, agrupamento):
+            print("\n" + "=" * 60)
+            print(f"🏷️ ETIQUETAS E EMAILS - {periodo}")
+            print("=" * 60)
+            df = _completar(df, produtos)
+            df_estoque_periodo = df_estoque
+            for dia in dias:
+                df_estoque_periodo = estados[dia].filtrar_estoque(df, df_estoque_periodo)
+            salvar_dataframe_csv(df, prefixo=f"produtos_{dias[0]:%Y%m%d}_{dias[-1]:%Y%m%d}")
+
+            metricas.etapa("etiquetas")
+            saida_dir = os.path.join(SAIDA_DIR, f"etiquetas_{dias[0]:%Y%m%d}_{dias[-1]:%Y%m%d}")
+            os.makedirs(saida_dir, exist_ok=True)
+            arquivos_etiquetas = gerar_etiquetas_por_filial(df, df_estoque_periodo, saida_dir)
+            if not arquivos_etiquetas:
+                print("⚠️ Nenhuma etiqueta gerada para o período.")
+                continue
+
+            metricas.etapa("envio")
+            resultados_envio = enviar_email_com_pdfs(
+                relatorio_pdf, {str(k): v for k, v in arquivos_etiquetas.items()}, periodo=periodo
+            )
+            if resultados_envio:
+                produtos_filiais = produtos_por_filial(df, df_estoque_periodo)
+                for dia in dias:
+                    df_dia = _impressos(relatorios[dia][1], df)
+                    estados[dia].registrar_execucao(df_dia, produtos_filiais, resultados_envio)
+                    historico.registrar(pares_enviados(df_dia, produtos_filiais, resultados_envio),
+                                        data=dia.strftime("%Y-%m-%d"))
+
+        print("\n✅ RECUPERAÇÃO CONCLUÍDA!")
+
+    finally:
+        if tarefa_estoque:
+            tarefa_estoque.cancelar()
+        if scraper:
+            scraper.fechar()
+        cache.fechar()
+        for estado in estados.values():
+            estado.fechar()
+        historico.fechar()
+
+def _baixar_dia(scraper, dia):
+    """
+    Baixa as alterações do dia de cada departamento na mesma sessão
+
+    Returns:
+        tuple: (relatório PDF, DataFrame de produtos)
+    """
+    if len(TRIER_DEPARTAMENTOS) == 1:
+        relatorio_pdf, arquivo_xls = scraper.baixar_relatorio_precos(dia)
+        return relatorio_pdf, ler_relatorio_precos(arquivo_xls)
+
+    relatorios = {d: scraper.baixar_relatorio_precos(dia, departamento=d) for d in TRIER_DEPARTAMENTOS}
+    relatorio_pdf = concatenar_pdfs(
+        [pdf for pdf, _ in relatorios.values()],
+        os.path.join(ARQUIVOS_DIR, f"alteracoes_departamentos_{dia:%Y%m%d}.pdf")
+    )
+    return relatorio_pdf, ler_relatorios_precos_departamentos({d: xls for d, (_, xls) in relatorios.items()})
+
+def _agrupar(relatorios, agrupamento):
+    """
+    Monta os conjuntos de etiquetas e emails
+
+    Returns:
+        list: [(período exibido, relatório PDF, DataFrame, dias incluídos)]
+    """
+    dias = sorted(relatorios)
+    if agrupamento == "por_dia":
+        return [(f"{dia:%d/%m/%Y}", relatorios[dia][0], relatorios[dia][1], [dia]) for dia in dias]
+
+    # Consolidado: vale o preço do dia mais recente de cada produto
+    df = pd.concat([relatorios[dia][1] for dia in dias], ignore_index=True)
+    df = df.drop_duplicates("Código", keep="last").reset_index(drop=True)
+    relatorio_pdf = concatenar_pdfs(
+        [relatorios[dia][0] for dia in dias],
+        os.path.join(ARQUIVOS_DIR, f"alteracoes_{dias[0]:%Y%m%d}_{dias[-1]:%Y%m%d}.pdf")
+    )
+    periodo = f"{dias[0]:%d/%m/%Y} a {dias[-1]:%d/%m/%Y}"
+    return [(periodo, relatorio_pdf, df, dias)]
+
+def _impressos(df_dia, df):
+    """
+    Linhas do dia com o preço que entrou nas etiquetas do período; no consolidado,
+    os preços substituídos por um dia mais recente não foram impressos
+    """
+    impressos = set(zip(df["Código"].astype(int), df["Preço"].astype(float).round(2)))
+    pares = zip(df_dia["Código"].astype(int), df_dia["Preço"].astype(float).round(2))
+    return df_dia[[par in impressos for par in pares]]
+
+def _completar(df, produtos):
+    """Acrescenta EAN e descrição completa a partir das consultas já feitas"""
+    eans, descricoes = alinhar_resultados(df, produtos)
+    return df.assign(**{"EAN": eans, "Descrição Completa": descricoes})
+
+def data_argumento(texto):
+    """Converte DD/MM/AAAA ou AAAA-MM-DD em date (para o argparse)"""
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: {texto}")
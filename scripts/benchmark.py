@@ -0,0 +1,247 @@
+# benchmark.py
+"""
+Suíte de benchmarks offline: relatórios sintéticos no formato do Trier e um
+Trier fake local, sem credenciais nem rede.
+
+Casos:
+- parsing: leitura dos relatórios de preço e estoque e processamento por filial
+- etiquetas: geração dos PDFs por filial e pelo PDF mestre
+- http: consulta de produtos pelo TrierHttpClient
+- selenium: login, relatórios e consultas pelo TrierScraper (requer Chrome)
+
+Cada execução é comparada com a mediana das execuções anteriores com os mesmos
+parâmetros em benchmarks/historico.jsonl; com --historico, ela é anexada ao
+arquivo. Os tempos dependem da máquina, então o histórico fica só local (não vai
+para o repositório).
+
+O parsing mede o xlrd, como em produção, quando as planilhas sintéticas saem em
+BIFF (requer xlwt e no máximo 65.536 linhas); senão mede o openpyxl, e o formato
+gerado entra nos parâmetros e no resultado.
+
+Uso:
+    python benchmark.py [--produtos N] [--filiais N] [--linhas-estoque N]
+                        [--latencia S] [--suites parsing,etiquetas,http,selenium]
+                        [--historico]
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# O benchmark roda offline: credenciais do Trier fake e mapa de emails vazio
+os.environ.setdefault("EMAIL_MAP_BASE64", base64.b64encode(b"{}").decode())
+os.environ.setdefault("username", "teste")
+os.environ.setdefault("password", "teste")
+
+from fake_trier import iniciar_servidor_fake, CAMINHO_LOGIN, CAMINHO_PRODUTO
+from gerador_relatorios import (gerar_catalogo, gerar_alteracoes_preco, gerar_mapa_estoque,
+                                montar_estoque, gerar_estoque_sintetico, formato_planilha, formato_relatorio,
+                                salvar_relatorio_precos, salvar_relatorio_estoque)
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICO_PATH = os.path.join(RAIZ_REPO, "benchmarks", "historico.jsonl")
+SUITES = ["parsing", "etiquetas", "http", "selenium"]
+LIMITE_REGRESSAO = 0.20
+
+def medir(funcao, *args, repeticoes=3):
+    """Retorna o menor tempo (s) entre as repetições e o último resultado"""
+    melhor = float("inf")
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def suite_parsing(args, pasta):
+    import ingestao
+    from etiquetas import processar_estoque_por_filial
+
+    catalogo = gerar_catalogo(args.produtos)
+    caminho_precos = salvar_relatorio_precos(gerar_alteracoes_preco(catalogo),
+                                             os.path.join(pasta, "alteracoes.xls"))
+    caminho_estoque = salvar_relatorio_estoque(gerar_estoque_sintetico(args.linhas_estoque, args.filiais),
+                                               os.path.join(pasta, "estoque.xls"))
+    for caminho in (caminho_precos, caminho_estoque):
+        if formato_planilha(caminho) != "xls":
+            print(f"⚠️ {os.path.basename(caminho)} gerado em {formato_planilha(caminho)}: "
+                  "a leitura mede o openpyxl, não o xlrd de produção.")
+
+    # Cache em uma pasta própria: começa vazio e não mistura com o cache de produção
+    cache_relatorios = os.path.join(pasta, "cache_relatorios")
+    tempos = {}
+    tempos["ler_relatorio_precos"], _ = medir(
+        lambda: ingestao.ler_relatorio_precos(caminho_precos, usar_cache=False))
+    tempos["ler_relatorio_estoque"], _ = medir(
+        lambda: ingestao.ler_relatorio_estoque(caminho_estoque, usar_cache=False))
+    # Primeira leitura grava o Parquet; as repetições medem a leitura do cache
+    tempos["ler_relatorio_estoque_cache"], df_estoque = medir(
+        lambda: ingestao.ler_relatorio_estoque(caminho_estoque, diretorio_cache=cache_relatorios), repeticoes=4)
+    tempos["processar_estoque"], _ = medir(processar_estoque_por_filial, df_estoque)
+    return tempos
+
+def suite_etiquetas(args, pasta):
+    import pandas as pd
+    from etiquetas import gerar_etiquetas_por_filial
+
+    catalogo = gerar_catalogo(args.produtos)
+    df_alteracoes = gerar_alteracoes_preco(catalogo)
+    df_produtos = pd.DataFrame({
+        "Código": df_alteracoes["Código"],
+        "Produto": df_alteracoes["Descrição Produto"],
+        "Preço": df_alteracoes["Preço Venda Atual"],
+        "EAN": [catalogo[c][0] for c in df_alteracoes["Código"]],
+        "Descrição Completa": [catalogo[c][1] for c in df_alteracoes["Código"]],
+    })
+    df_estoque = montar_estoque(gerar_mapa_estoque(catalogo, filiais=args.filiais))
+
+    tempos = {}
+    for modo, imposicao in (("filial", ""), ("mestre", ""), ("filial", "a4")):
+        caso = f"etiquetas_{modo}" + (f"_{imposicao}" if imposicao else "")
+        saida = os.path.join(pasta, caso)
+        os.makedirs(saida, exist_ok=True)
+        tempos[caso], _ = medir(
+            lambda: gerar_etiquetas_por_filial(df_produtos, df_estoque, saida, modo=modo, imposicao=imposicao),
+            repeticoes=1,
+        )
+    return tempos
+
+def suite_http(args, pasta):
+    from trier_http import TrierHttpClient
+
+    catalogo = gerar_catalogo(args.produtos)
+    servidor, url = iniciar_servidor_fake(catalogo, latencia=args.latencia)
+    try:
+        cliente = TrierHttpClient(login_url=url + CAMINHO_LOGIN, produto_url=url + CAMINHO_PRODUTO,
+                                  usuario="teste", senha="teste")
+        cliente.login()
+        tempo, resultados = medir(cliente.consultar_produtos, list(catalogo), repeticoes=1)
+        cliente.fechar()
+    finally:
+        servidor.shutdown()
+
+    if len(resultados) != len(catalogo):
+        raise RuntimeError(f"HTTP retornou {len(resultados)}/{len(catalogo)} produtos")
+    return {"consulta_http_total": tempo, "consulta_http_por_produto": tempo / len(catalogo)}
+
+def suite_selenium(args, pasta):
+    if not (shutil.which("chromedriver") or shutil.which("google-chrome") or shutil.which("chromium")):
+        print("⏭️ Chrome não encontrado, suíte selenium ignorada.")
+        return {}
+
+    catalogo = gerar_catalogo(args.produtos)
+    servidor, url = iniciar_servidor_fake(catalogo, latencia=args.latencia)
+    import ingestao
+    from scraper import TrierScraper
+
+    # A URL vai explícita: o config já foi importado pelas outras suítes com a URL de produção
+    scraper = TrierScraper(download_dir=pasta, login_url=url + CAMINHO_LOGIN)
+    tempos = {}
+    try:
+        tempos["selenium_login"], _ = medir(scraper.login, repeticoes=1)
+        tempos["selenium_relatorio_precos"], (_, arquivo_xls) = medir(
+            scraper.baixar_relatorio_precos, repeticoes=1)
+        df = ingestao.ler_relatorio_precos(arquivo_xls, usar_cache=False)
+        tempos["selenium_consultas"], _ = medir(
+            scraper.consultar_produtos, df["Código"].astype(int).tolist(), repeticoes=1)
+        tempos["selenium_relatorio_estoque"], _ = medir(
+            scraper.baixar_relatorio_estoque, df["Código"].astype(int).tolist(), repeticoes=1)
+    finally:
+        scraper.fechar()
+        servidor.shutdown()
+    return tempos
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_REPO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def carregar_historico(caminho=HISTORICO_PATH):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+def comparar(resultados, parametros, historico):
+    """
+    Compara cada caso com a mediana das execuções anteriores com os mesmos parâmetros
+
+    Returns:
+        list: Casos que ficaram mais de LIMITE_REGRESSAO mais lentos
+    """
+    anteriores = [h["resultados"] for h in historico if h["parametros"] == parametros]
+    regressoes = []
+    for caso, tempo in resultados.items():
+        tempos_anteriores = [r[caso] for r in anteriores if caso in r]
+        if not tempos_anteriores:
+            print(f"   {caso}: {tempo:.4f} s (sem histórico)")
+            continue
+        mediana = statistics.median(tempos_anteriores)
+        variacao = tempo / mediana - 1 if mediana else 0.0
+        marca = "🔺" if variacao > LIMITE_REGRESSAO else "✅"
+        print(f"   {marca} {caso}: {tempo:.4f} s (mediana {mediana:.4f} s, {variacao:+.0%})")
+        if variacao > LIMITE_REGRESSAO:
+            regressoes.append(caso)
+    return regressoes
+
+def salvar_historico(registro, caminho=HISTORICO_PATH):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline da automação de alterações de preço")
+    parser.add_argument("--produtos", type=int, default=500)
+    parser.add_argument("--filiais", type=int, default=20)
+    # Até 65.536 linhas o relatório sintético sai em BIFF, como o do Trier
+    parser.add_argument("--linhas-estoque", type=int, default=60_000)
+    parser.add_argument("--latencia", type=float, default=0.01,
+                        help="Atraso (s) de cada resposta do Trier fake")
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--historico", action="store_true",
+                        help="Anexa a execução a benchmarks/historico.jsonl (arquivo local)")
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    desconhecidas = set(suites) - set(SUITES)
+    if desconhecidas:
+        parser.error(f"Suítes desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    parametros = {"produtos": args.produtos, "filiais": args.filiais,
+                  "linhas_estoque": args.linhas_estoque, "latencia": args.latencia,
+                  "formato_estoque": formato_relatorio(args.linhas_estoque)}
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for suite in suites:
+            print(f"⏱️ Suíte {suite}...")
+            pasta_suite = os.path.join(pasta, suite)
+            os.makedirs(pasta_suite)
+            resultados.update(globals()[f"suite_{suite}"](args, pasta_suite))
+
+    print("📊 Resultados:")
+    regressoes = comparar(resultados, parametros, carregar_historico())
+
+    if args.historico:
+        salvar_historico({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_atual(),
+            "parametros": parametros,
+            "resultados": resultados,
+        })
+
+    if regressoes:
+        print(f"❌ Regressões acima de {LIMITE_REGRESSAO:.0%}: {', '.join(regressoes)}")
+        sys.exit(1)
+    print("✅ Nenhuma regressão detectada.")
+
+if __name__ == "__main__":
+    main()
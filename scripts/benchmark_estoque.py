@@ -0,0 +1,81 @@
+# benchmark_estoque.py
+"""
+Compara o parser vetorizado do relatório de estoque com o laço iterrows() original
+em um relatório sintético.
+
+Uso:
+    python benchmark_estoque.py [linhas]
+"""
+import base64
+import os
+import sys
+import time
+
+# O benchmark roda offline: um mapa de emails vazio basta para importar o config
+os.environ.setdefault("EMAIL_MAP_BASE64", base64.b64encode(b"{}").decode())
+
+from etiquetas import processar_estoque_por_filial
+from gerador_relatorios import gerar_estoque_sintetico
+
+def processar_estoque_por_filial_loop(df_estoque):
+    """Implementação original, linha a linha, mantida como referência"""
+    col_cod = next(c for c in df_estoque.columns if str(c).strip() == "Cód.")
+    idx_cod = df_estoque.columns.get_loc(col_cod)
+    filiais_dict = {}
+    filial_atual = None
+    coletando_produtos = False
+
+    for idx, row in df_estoque.iterrows():
+        valor_cod = str(row[col_cod]).strip()
+
+        if valor_cod == "Filial:":
+            nome_filial_raw = str(row.iloc[idx_cod + 2]).strip()
+            try:
+                filial_num = int(nome_filial_raw.split()[0].replace("F", ""))
+            except:
+                continue
+
+            filiais_dict[filial_num] = []
+            filial_atual = filial_num
+            coletando_produtos = True
+            continue
+
+        if coletando_produtos and filial_atual is not None:
+            if valor_cod == "" or valor_cod.lower() == "nan":
+                coletando_produtos = False
+                continue
+
+            try:
+                codigo_prod = int(float(valor_cod))
+                filiais_dict[filial_atual].append(codigo_prod)
+            except:
+                pass
+
+    return filiais_dict
+
+def medir(funcao, *args, repeticoes=3):
+    """Retorna o menor tempo (s) entre as repetições e o último resultado"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df_estoque = gerar_estoque_sintetico(linhas)
+    print(f"📊 Relatório sintético: {len(df_estoque)} linhas")
+
+    tempo_loop, esperado = medir(processar_estoque_por_filial_loop, df_estoque, repeticoes=1)
+    tempo_vetor, obtido = medir(processar_estoque_por_filial, df_estoque)
+
+    if esperado != obtido:
+        raise SystemExit("❌ Resultados divergentes entre as implementações!")
+
+    print(f"🐢 iterrows():  {tempo_loop:.3f} s")
+    print(f"⚡ vetorizado: {tempo_vetor:.3f} s")
+    print(f"✅ Speedup: {tempo_loop / tempo_vetor:.1f}x")
+
+if __name__ == "__main__":
+    main()
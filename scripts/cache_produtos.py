@@ -0,0 +1,102 @@
+# cache_produtos.py
+import sqlite3
+import threading
+import time
+
+from config import CACHE_PRODUTOS_PATH, CACHE_PRODUTOS_TTL_DIAS, CACHE_PRODUTOS_FORCAR_ATUALIZACAO
+
+class CacheProdutos:
+    """
+    Cache persistente (SQLite) de EAN e descrição completa por código de produto.
+    Evita reconsultar no Trier produtos que já foram lidos em execuções anteriores.
+    """
+    def __init__(self, caminho=CACHE_PRODUTOS_PATH, ttl_dias=CACHE_PRODUTOS_TTL_DIAS,
+                 forcar_atualizacao=CACHE_PRODUTOS_FORCAR_ATUALIZACAO):
+        self.caminho = caminho
+        self.ttl_segundos = ttl_dias * 24 * 60 * 60
+        self.forcar_atualizacao = forcar_atualizacao
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS produtos (
+                codigo INTEGER PRIMARY KEY,
+                ean TEXT NOT NULL,
+                descricao TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.commit()
+
+    def obter_varios(self, codigos):
+        """
+        Busca vários códigos no cache
+
+        Returns:
+            dict: {codigo: (ean, descricao)} apenas para os códigos válidos no cache
+        """
+        codigos = list(dict.fromkeys(int(c) for c in codigos))
+        encontrados = {}
+
+        if not self.forcar_atualizacao and codigos:
+            limite = time.time() - self.ttl_segundos
+            with self._lock:
+                # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+                for inicio in range(0, len(codigos), 500):
+                    bloco = codigos[inicio:inicio + 500]
+                    marcadores = ",".join("?" * len(bloco))
+                    cursor = self._conexao.execute(
+                        f"SELECT codigo, ean, descricao FROM produtos "
+                        f"WHERE codigo IN ({marcadores}) AND atualizado_em >= ?",
+                        (*bloco, limite)
+                    )
+                    for codigo, ean, descricao in cursor:
+                        encontrados[codigo] = (ean, descricao)
+
+        self.acertos += len(encontrados)
+        self.falhas += len(codigos) - len(encontrados)
+        return encontrados
+
+    def salvar(self, codigo, ean, descricao):
+        """Grava (ou atualiza) um produto no cache"""
+        self.salvar_varios({codigo: (ean, descricao)})
+
+    def salvar_varios(self, produtos):
+        """Grava vários produtos no cache a partir de {codigo: (ean, descricao)}"""
+        agora = time.time()
+        with self._lock:
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO produtos (codigo, ean, descricao, atualizado_em) VALUES (?, ?, ?, ?)",
+                [(int(c), ean or "", descricao or "", agora) for c, (ean, descricao) in produtos.items()]
+            )
+            self._conexao.commit()
+
+    def resumo(self):
+        """Retorna texto com os contadores de acertos e falhas"""
+        total = self.acertos + self.falhas
+        taxa = (self.acertos / total * 100) if total else 0
+        return f"Cache de produtos: {self.acertos} acertos, {self.falhas} falhas ({taxa:.0f}% de acerto)"
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        if self._conexao:
+            self._conexao.close()
+            self._conexao = None
+
+def resultados_conhecidos(codigos, cache=None, conhecidos=None):
+    """
+    Resultados já disponíveis para os códigos, antes de ir ao navegador
+
+    Args:
+        codigos: Códigos distintos
+        cache: CacheProdutos consultado quando `conhecidos` não é informado
+        conhecidos: {codigo: (ean, descricao)} já obtidos (ex.: consultar_produtos_http,
+                    que inclui o cache); evita consultar o cache duas vezes
+
+    Returns:
+        dict: {codigo: (ean, descricao)}
+    """
+    if conhecidos is not None:
+        return {c: conhecidos[c] for c in codigos if c in conhecidos}
+    return cache.obter_varios(codigos) if cache else {}
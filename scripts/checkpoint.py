@@ -0,0 +1,121 @@
+# checkpoint.py
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+from config import CHECKPOINT_DIR
+
+ETAPAS = ["precos", "produtos", "estoque", "etiquetas", "envio"]
+
+class Checkpoint:
+    """
+    Guarda os artefatos de cada etapa do main() com um manifesto (hash e tamanho),
+    para que uma nova tentativa possa pular as etapas já concluídas.
+    """
+    def __init__(self, diretorio=CHECKPOINT_DIR):
+        self.diretorio = diretorio
+        self.caminho_manifesto = os.path.join(diretorio, "manifesto.json")
+        self.manifesto = {"criado_em": None, "etapas": {}}
+
+    def iniciar(self, retomar=False):
+        """
+        Carrega o manifesto existente (retomar) ou começa um checkpoint novo; um
+        checkpoint de outro dia é descartado, para não enviar etiquetas antigas
+        """
+        if retomar and os.path.exists(self.caminho_manifesto):
+            with open(self.caminho_manifesto, encoding="utf-8") as f:
+                manifesto = json.load(f)
+            criado_em = manifesto.get("criado_em") or ""
+            if criado_em[:10] == datetime.now().strftime("%Y-%m-%d"):
+                self.manifesto = manifesto
+                concluidas = [e for e in ETAPAS if e in self.manifesto["etapas"]]
+                print(f"♻️ Retomando checkpoint de {criado_em}: etapas concluídas {concluidas}")
+                return
+            print(f"⚠️ Checkpoint de {criado_em or 'data desconhecida'} não é de hoje; executando todas as etapas.")
+        elif retomar:
+            print("⚠️ Nenhum checkpoint encontrado; executando todas as etapas.")
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.manifesto = {"criado_em": datetime.now().isoformat(timespec="seconds"), "etapas": {}}
+        self._gravar_manifesto()
+
+    def salvar(self, etapa, arquivos=None, dados=None):
+        """
+        Registra uma etapa concluída
+
+        Args:
+            etapa: Nome da etapa (ver ETAPAS)
+            arquivos: Dict {nome: caminho} copiados para o checkpoint
+            dados: Informações extras serializáveis em JSON
+
+        Returns:
+            dict: {nome: caminho da cópia no checkpoint}
+        """
+        destino = os.path.join(self.diretorio, etapa)
+        shutil.rmtree(destino, ignore_errors=True)
+        os.makedirs(destino, exist_ok=True)
+
+        registros = {}
+        copias = {}
+        for nome, caminho in (arquivos or {}).items():
+            copia = os.path.join(destino, f"{nome}_{os.path.basename(caminho)}")
+            shutil.copy2(caminho, copia)
+            registros[nome] = {
+                "arquivo": os.path.relpath(copia, self.diretorio),
+                "sha256": _sha256(copia),
+                "tamanho": os.path.getsize(copia),
+            }
+            copias[nome] = copia
+
+        self.manifesto["etapas"][etapa] = {
+            "concluida_em": datetime.now().isoformat(timespec="seconds"),
+            "arquivos": registros,
+            "dados": dados or {},
+        }
+        self._gravar_manifesto()
+        return copias
+
+    def carregar(self, etapa):
+        """
+        Valida e devolve os artefatos de uma etapa concluída
+
+        Returns:
+            tuple: ({nome: caminho}, dados) ou None se a etapa não estiver válida
+        """
+        registro = self.manifesto["etapas"].get(etapa)
+        if registro is None:
+            return None
+
+        arquivos = {}
+        for nome, info in registro["arquivos"].items():
+            caminho = os.path.join(self.diretorio, info["arquivo"])
+            if (not os.path.exists(caminho)
+                    or os.path.getsize(caminho) != info["tamanho"]
+                    or _sha256(caminho) != info["sha256"]):
+                print(f"⚠️ Artefato inválido no checkpoint ({etapa}/{nome}); a etapa será refeita.")
+                return None
+            arquivos[nome] = caminho
+
+        print(f"⏭️ Etapa '{etapa}' recuperada do checkpoint.")
+        return arquivos, registro["dados"]
+
+    def invalidar_a_partir(self, etapa):
+        """Descarta a etapa informada e todas as seguintes"""
+        for posterior in ETAPAS[ETAPAS.index(etapa):]:
+            self.manifesto["etapas"].pop(posterior, None)
+        self._gravar_manifesto()
+
+    def _gravar_manifesto(self):
+        temporario = self.caminho_manifesto + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.manifesto, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_manifesto)
+
+def _sha256(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
@@ -0,0 +1,201 @@
+# comandos.py
+"""
+Subcomandos da linha de comando (python main.py <comando>), para rodar cada etapa
+separadamente a partir de arquivos salvos:
+
+    fetch   baixa os relatórios de preço e de estoque do Trier para uma pasta
+    enrich  consulta EAN e descrição dos produtos de um XLS de preços e grava o CSV
+    labels  gera as etiquetas por filial a partir do CSV e dos XLS de estoque
+    send    envia (ou simula) os emails com o relatório e as etiquetas
+    replay  refaz leitura, etiquetas e envio simulado a partir de arquivos salvos,
+            sem navegador, medindo cada etapa
+
+Sem subcomando, main.py executa o fluxo completo como antes.
+"""
+import os
+import re
+import shutil
+from datetime import datetime
+
+from reportlab.pdfgen import canvas
+
+import ingestao
+from config import *
+from file_utils import ler_relatorios_precos_departamentos, ler_relatorios_estoque, ler_dataframe_csv, salvar_dataframe_csv
+from etiquetas import gerar_etiquetas_por_filial
+from email_sender import enviar_email_com_pdfs, fabrica_servico_simulado
+from metricas import metricas
+
+# etiquetas_F03_20240101_120000.pdf → filial 3
+PADRAO_ARQUIVO_ETIQUETAS = re.compile(r"etiquetas_F(\d+)_")
+
+def comando_fetch(args):
+    """Baixa os relatórios de preço (um por departamento) e de estoque para args.saida"""
+    from scraper import TrierScraper
+    from pool_sessoes import baixar_relatorios_precos_departamentos
+
+    saida = _pasta_saida(args.saida, "fetch")
+    scraper = TrierScraper(perfil="principal")
+    try:
+        scraper.login()
+        metricas.etapa("precos")
+        if len(TRIER_DEPARTAMENTOS) > 1:
+            relatorios = baixar_relatorios_precos_departamentos(TRIER_DEPARTAMENTOS, data=args.data)
+        else:
+            relatorios = {TRIER_DEPARTAMENTOS[0]: scraper.baixar_relatorio_precos(args.data)}
+
+        arquivos_xls = {}
+        for departamento, (pdf, xls) in relatorios.items():
+            shutil.copy2(pdf, os.path.join(saida, f"precos_{departamento}.pdf"))
+            arquivos_xls[departamento] = shutil.copy2(xls, os.path.join(saida, f"precos_{departamento}.xls"))
+        df = _ler_precos(list(arquivos_xls.values()))
+
+        metricas.etapa("estoque")
+        for i, caminho in enumerate(scraper.baixar_relatorios_estoque(df["Código"])):
+            shutil.copy2(caminho, os.path.join(saida, f"estoque_{i:03d}.xls"))
+    finally:
+        scraper.fechar()
+    print(f"✅ Relatórios salvos em {saida}")
+
+def comando_enrich(args):
+    """Consulta EAN e descrição completa dos produtos e grava o CSV enriquecido"""
+    from scraper import TrierScraper, alinhar_resultados
+    from cache_produtos import CacheProdutos
+    from trier_http import consultar_produtos_http
+    from pool_sessoes import extrair_dados_produtos_paralelo
+
+    df = _ler_precos(args.precos)
+    cache = CacheProdutos()
+    scraper = None
+    try:
+        metricas.etapa("produtos")
+        conhecidos = None
+        if PRODUTOS_BACKEND == "http":
+            conhecidos = consultar_produtos_http(df["Código"], cache=cache)
+        if MAX_SESSOES_TRIER > 1:
+            resultados = extrair_dados_produtos_paralelo(df, cache=cache, max_sessoes=MAX_SESSOES_TRIER,
+                                                         conhecidos=conhecidos)
+        else:
+            scraper = TrierScraper(perfil="principal")
+            scraper.login()
+            resultados = scraper.extrair_dados_produtos(df, cache=cache, conhecidos=conhecidos)
+    finally:
+        if scraper:
+            scraper.fechar()
+        cache.fechar()
+
+    df["EAN"], df["Descrição Completa"] = alinhar_resultados(df, resultados)
+    caminho = salvar_dataframe_csv(df)
+    if args.saida:
+        caminho = shutil.move(caminho, args.saida)
+    print(f"✅ CSV enriquecido: {caminho}")
+
+def comando_labels(args):
+    """Gera as etiquetas por filial a partir do CSV enriquecido e do estoque"""
+    saida = _pasta_saida(args.saida, "etiquetas")
+    metricas.etapa("estoque")
+    df_estoque = ler_relatorios_estoque(args.estoque)
+    metricas.etapa("etiquetas")
+    arquivos = gerar_etiquetas_por_filial(ler_dataframe_csv(args.produtos), df_estoque, saida,
+                                          modo=args.modo, imposicao=args.imposicao)
+    print(f"✅ {len(arquivos)} PDFs de etiquetas em {saida}")
+
+def comando_send(args):
+    """Envia o relatório e as etiquetas de cada filial; com --simular, grava os emails em disco"""
+    arquivos = _etiquetas_da_pasta(args.etiquetas)
+    if not arquivos:
+        print(f"⚠️ Nenhum PDF de etiquetas em {args.etiquetas}")
+        return
+    metricas.etapa("envio")
+    _enviar(args.relatorio, arquivos, args.simular and _pasta_saida(args.simular, "emails"))
+
+def comando_replay(args):
+    """
+    Refaz as etapas posteriores ao navegador com arquivos salvos: leitura dos
+    relatórios, cruzamento com o CSV enriquecido, etiquetas e envio simulado.
+    Não altera o estado de execução nem o histórico de preços.
+    """
+    saida = _pasta_saida(args.saida, "replay")
+    usar_cache = not args.sem_cache
+
+    metricas.etapa("precos")
+    df = _ler_precos(args.precos, usar_cache)
+    metricas.etapa("produtos")
+    df = _completar_com_csv(df, ler_dataframe_csv(args.produtos))
+    metricas.etapa("estoque")
+    df_estoque = ingestao.concatenar_estoques([ingestao.ler_relatorio_estoque(c, usar_cache) for c in args.estoque])
+
+    metricas.etapa("etiquetas")
+    pasta_etiquetas = os.path.join(saida, "etiquetas")
+    os.makedirs(pasta_etiquetas, exist_ok=True)
+    arquivos = gerar_etiquetas_por_filial(df, df_estoque, pasta_etiquetas, modo=args.modo, imposicao=args.imposicao)
+
+    metricas.etapa("envio")
+    relatorio = args.relatorio or _relatorio_substituto(os.path.join(saida, "relatorio_replay.pdf"))
+    _enviar(relatorio, {str(k): v for k, v in arquivos.items()}, os.path.join(saida, "emails"))
+    metricas.finalizar_etapa()
+
+    print("\n" + "=" * 60)
+    print(f"⏱️ REPLAY: {len(df)} produtos, {len(arquivos)} filiais")
+    tempos = {l["rotulos"]["etapa"]: l["total"] for l in metricas.resumo() if l["operacao"] == "etapa"}
+    for nome in ("precos", "produtos", "estoque", "etiquetas", "envio"):
+        print(f"   {nome:<10} {tempos.get(nome, 0):8.3f} s")
+    print("=" * 60)
+    metricas.exportar_json(os.path.join(saida, "metricas.json"))
+    print(f"📁 Saída do replay: {saida}")
+
+def _ler_precos(caminhos, usar_cache=True):
+    """
+    Lê um ou mais XLS de preço; com vários, o departamento vem do nome do arquivo
+    (precos_<departamento>.xls, como gravado pelo fetch)
+    """
+    if len(caminhos) == 1:
+        return ingestao.ler_relatorio_precos(caminhos[0], usar_cache)
+    return ler_relatorios_precos_departamentos({
+        os.path.splitext(os.path.basename(c))[0].removeprefix("precos_"): c for c in caminhos
+    })
+
+def _completar_com_csv(df, df_csv):
+    """Acrescenta EAN e descrição do CSV enriquecido às linhas do relatório de preços"""
+    dados = df_csv.drop_duplicates("Código", keep="last").set_index(df_csv["Código"].astype(int))
+    codigos = df["Código"].astype(int)
+    faltando = (~codigos.isin(dados.index)).sum()
+    if faltando:
+        print(f"⚠️ {faltando} produtos do relatório não estão no CSV; etiquetas sem EAN e descrição.")
+    return df.assign(**{
+        "EAN": codigos.map(dados["EAN"]).fillna("").to_numpy(),
+        "Descrição Completa": codigos.map(dados["Descrição Completa"]).fillna("").to_numpy(),
+    })
+
+def _etiquetas_da_pasta(pasta):
+    """{filial (texto): caminho} a partir dos PDFs etiquetas_FNN_*.pdf da pasta"""
+    arquivos = {}
+    for nome in sorted(os.listdir(pasta)):
+        encontrado = PADRAO_ARQUIVO_ETIQUETAS.match(nome)
+        if encontrado and nome.endswith(".pdf"):
+            arquivos[str(int(encontrado.group(1)))] = os.path.join(pasta, nome)
+    return arquivos
+
+def _enviar(relatorio, arquivos, pasta_simulacao=None):
+    """Envia pela Gmail API ou, com pasta_simulacao, grava os emails como .eml"""
+    if not pasta_simulacao:
+        return enviar_email_com_pdfs(relatorio, arquivos)
+
+    # Endereços fictícios: a simulação não depende do segredo nem grava endereços reais
+    emails = {filial: f"filial{filial}@simulacao.invalid" for filial in arquivos}
+    resultados = enviar_email_com_pdfs(relatorio, arquivos, fabrica_servico=fabrica_servico_simulado(pasta_simulacao),
+                                       emails_filiais=emails)
+    print(f"📭 Envio simulado: emails gravados em {pasta_simulacao}")
+    return resultados
+
+def _relatorio_substituto(caminho):
+    """PDF de uma página usado no lugar do relatório de alterações quando ele não é informado"""
+    c = canvas.Canvas(caminho)
+    c.drawString(72, 720, "Relatório de alterações não informado (replay)")
+    c.save()
+    return caminho
+
+def _pasta_saida(pasta, prefixo):
+    pasta = pasta or os.path.join(BASE_DIR, f"{prefixo}_{datetime.now():%Y%m%d_%H%M%S}")
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
@@ -1,6 +1,7 @@
 # config.py
 import os
 import base64
+import functools
 import json
 from pathlib import Path
 
@@ -10,18 +11,40 @@ ARQUIVOS_DIR = os.path.join(BASE_DIR, 'arquivos')
 os.makedirs(ARQUIVOS_DIR, exist_ok=True)
 DOWNLOAD_DIR = ARQUIVOS_DIR
 SAIDA_DIR = ARQUIVOS_DIR
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+os.makedirs(CACHE_DIR, exist_ok=True)
+METRICAS_DIR = os.getenv("METRICAS_DIR", os.path.join(BASE_DIR, 'metricas'))
+# Artefatos das etapas para retomar uma execução (--resume); fica fora de ARQUIVOS_DIR
+CHECKPOINT_DIR = os.path.join(BASE_DIR, 'checkpoint')
 
 # === CONFIGURAÇÕES DO SISTEMA ===
-LOGIN_URL = "http://drogcidade.ddns.net:4647/sgfpod1/Login.pod"
+LOGIN_URL = os.getenv("TRIER_LOGIN_URL", "http://drogcidade.ddns.net:4647/sgfpod1/Login.pod")
 LOGIN_USUARIO = os.getenv("username")
 LOGIN_SENHA = os.getenv("password")
 
+# Backend de consulta de produtos: "selenium" (padrão) ou "http" (com fallback para selenium)
+PRODUTOS_BACKEND = os.getenv("PRODUTOS_BACKEND", "selenium").lower()
+# Endereço da consulta de produto por código usado pelo backend HTTP
+TRIER_PRODUTO_URL = os.getenv("TRIER_PRODUTO_URL")
+TRIER_HTTP_CONEXOES = int(os.getenv("TRIER_HTTP_CONEXOES", "8"))
+TRIER_HTTP_TIMEOUT = float(os.getenv("TRIER_HTTP_TIMEOUT", "15"))
+
+# Departamentos do relatório de alterações de preço, separados por vírgula. Com mais
+# de um, cada relatório é baixado em uma sessão própria em paralelo, os produtos são
+# unidos antes das consultas e cada etiqueta indica o seu departamento
+TRIER_DEPARTAMENTOS = [d.strip() for d in os.getenv("TRIER_DEPARTAMENTOS", "121").split(",") if d.strip()]
+
 # === CONFIGURAÇÕES DE EMAIL ===
 SERVICE_ACCOUNT_PATH = os.getenv("GSA_CREDENTIALS")
 GMAIL_SENDER = os.getenv("sender")
+EMAIL_THREADS = int(os.getenv("EMAIL_THREADS", "4"))
+EMAIL_ENVIOS_POR_SEGUNDO = float(os.getenv("EMAIL_ENVIOS_POR_SEGUNDO", "5"))
+EMAIL_TENTATIVAS = int(os.getenv("EMAIL_TENTATIVAS", "5"))
 
-# Mapeamento de filiais para emails
+# Mapeamento de filiais para emails, lido só quando um envio real precisa dele:
+# os comandos offline (replay, labels, send --simular) rodam sem o segredo
 
+@functools.lru_cache(maxsize=None)
 def load_email_map():
     encoded_map = os.getenv("EMAIL_MAP_BASE64")
     """
@@ -37,8 +60,6 @@ def load_email_map():
     except Exception as e:
         raise ValueError(f"Invalid EMAIL_MAP_B64 format: {e}")
 
-EMAILS_FILIAIS = load_email_map()
-
 # === CONFIGURAÇÕES DO NAVEGADOR ===
 CHROME_OPTIONS = {
     "headless": True,  # Mude para True se quiser headless
@@ -46,6 +67,94 @@ CHROME_OPTIONS = {
     "download_dir": DOWNLOAD_DIR
 }
 
+# Perfis do Chrome e cookies do Trier reaproveitados entre sessões e execuções na mesma
+# máquina. Ficam fora de CACHE_DIR: a pasta contém credenciais de sessão e não deve ir
+# para o cache compartilhado do GitHub Actions
+CHROME_PERFIL_DIR = os.getenv("CHROME_PERFIL_DIR", os.path.join(BASE_DIR, 'navegador'))
+SESSAO_PERSISTENTE = os.getenv("SESSAO_PERSISTENTE", "1").lower() in ("1", "true", "sim")
+# Não carrega imagens, fontes e mídia, que a automação nunca usa
+CHROME_BLOQUEAR_RECURSOS = os.getenv("CHROME_BLOQUEAR_RECURSOS", "1").lower() in ("1", "true", "sim")
+
+# Esperas do navegador: o timeout de cada ponto é ESPERA_FATOR × p95 das durações
+# já observadas naquele ponto, limitado entre o mínimo e o máximo (segundos)
+ESPERA_TIMEOUT_MAXIMO = float(os.getenv("ESPERA_TIMEOUT_MAXIMO", "30"))
+ESPERA_TIMEOUT_MINIMO = float(os.getenv("ESPERA_TIMEOUT_MINIMO", "5"))
+ESPERA_FATOR = float(os.getenv("ESPERA_FATOR", "4"))
+
+# Tempo máximo (segundos) para concluir o download de um relatório
+DOWNLOAD_TIMEOUT = int(os.getenv("DOWNLOAD_TIMEOUT", "120"))
+
+# Número máximo de sessões simultâneas no Trier (1 = extração serial)
+MAX_SESSOES_TRIER = int(os.getenv("MAX_SESSOES_TRIER", "1"))
+
+# Consultas de produto com falha voltam para uma fila depois da primeira passada:
+# até CONSULTA_TENTATIVAS consultas por código, esperando CONSULTA_ESPERA_BASE
+# segundos antes da segunda e o dobro a cada nova tentativa
+CONSULTA_TENTATIVAS = int(os.getenv("CONSULTA_TENTATIVAS", "3"))
+CONSULTA_ESPERA_BASE = float(os.getenv("CONSULTA_ESPERA_BASE", "2"))
+
+# === CONFIGURAÇÕES DO RELATÓRIO DE ESTOQUE ===
+# Entrada dos códigos: "individual" (um ENTER por código), "lote" (lista digitada
+# de uma vez com separador) ou "js" (lista atribuída ao campo via JavaScript)
+ESTOQUE_MODO_ENTRADA = os.getenv("ESTOQUE_MODO_ENTRADA", "individual").lower()
+ESTOQUE_SEPARADOR_LOTE = os.getenv("ESTOQUE_SEPARADOR_LOTE", ",")
+# Máximo de códigos por relatório de estoque (0 = todos em um único relatório)
+ESTOQUE_CODIGOS_POR_RELATORIO = int(os.getenv("ESTOQUE_CODIGOS_POR_RELATORIO", "0"))
+# Baixa o relatório de estoque em uma segunda sessão, em paralelo com as consultas de
+# produtos; a sessão conta em MAX_SESSOES_TRIER, então só é aberta com limite >= 2
+ESTOQUE_SESSAO_PARALELA = os.getenv("ESTOQUE_SESSAO_PARALELA", "1").lower() in ("1", "true", "sim")
+
 # === CONFIGURAÇÕES DAS ETIQUETAS ===
 ETIQUETA_LARGURA_CM = 9
 ETIQUETA_ALTURA_CM = 3
+# Processos usados para gerar os PDFs das filiais (1 = sequencial; ex.: o número de CPUs)
+ETIQUETAS_PROCESSOS = int(os.getenv("ETIQUETAS_PROCESSOS", "1"))
+# "filial": um PDF renderizado por filial; "mestre": cada etiqueta renderizada uma
+# única vez e os PDFs das filiais montados a partir das páginas do PDF mestre
+ETIQUETAS_MODO = os.getenv("ETIQUETAS_MODO", "filial").lower()
+
+# Imposição: várias etiquetas por página, mantendo o tamanho de cada uma.
+# "" = uma etiqueta por página; modelos em montagem_pdf.MODELOS_IMPOSICAO ("a4",
+# "carta", "rolo") ou "personalizado" com ETIQUETAS_MODELO_PERSONALIZADO em cm:
+# "largura_pagina,altura_pagina,colunas,linhas,margem_esq,margem_sup,espaco_h,espaco_v"
+ETIQUETAS_IMPOSICAO = os.getenv("ETIQUETAS_IMPOSICAO", "").lower()
+ETIQUETAS_MODELO_PERSONALIZADO = os.getenv("ETIQUETAS_MODELO_PERSONALIZADO", "")
+# Regrava os PDFs finais com fluxos de objetos comprimidos
+ETIQUETAS_COMPRIMIR = os.getenv("ETIQUETAS_COMPRIMIR", "1").lower() in ("1", "true", "sim")
+# Fontes TrueType opcionais (embutidas apenas com os caracteres usados); sem elas,
+# Helvetica, que não é embutida
+ETIQUETAS_FONTE_TTF = os.getenv("ETIQUETAS_FONTE_TTF")
+ETIQUETAS_FONTE_NEGRITO_TTF = os.getenv("ETIQUETAS_FONTE_NEGRITO_TTF")
+
+# Gera as etiquetas durante as consultas de produtos: cada PDF de filial é fechado
+# assim que todos os seus produtos foram consultados. Usa uma sessão de consultas
+# (mais a de estoque) e o modo "filial" sequencial; com mais sessões em
+# MAX_SESSOES_TRIER, ETIQUETAS_MODO=mestre ou ETIQUETAS_PROCESSOS > 1 fica
+# desligado (com aviso)
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "").lower() in ("1", "true", "sim")
+
+# === CONFIGURAÇÕES DA RECUPERAÇÃO DE VÁRIOS DIAS (--de/--ate) ===
+# "por_dia": etiquetas e emails separados para cada dia; "consolidado": um único
+# conjunto com o preço mais recente de cada produto no período
+BACKFILL_AGRUPAMENTO = os.getenv("BACKFILL_AGRUPAMENTO", "por_dia").lower()
+
+# === CONFIGURAÇÕES DO CACHE DE PRODUTOS ===
+CACHE_PRODUTOS_PATH = os.path.join(CACHE_DIR, 'produtos.sqlite3')
+CACHE_PRODUTOS_TTL_DIAS = int(os.getenv("CACHE_PRODUTOS_TTL_DIAS", "30"))
+CACHE_PRODUTOS_FORCAR_ATUALIZACAO = os.getenv("CACHE_PRODUTOS_FORCAR_ATUALIZACAO", "").lower() in ("1", "true", "sim")
+
+# === CONFIGURAÇÕES DO ESTADO DE EXECUÇÃO ===
+# Pares (Código, Preço) já tratados no dia, para reexecuções incrementais
+ESTADO_EXECUCAO_PATH = os.path.join(CACHE_DIR, 'estado_execucao.sqlite3')
+
+# === CONFIGURAÇÕES DO HISTÓRICO DE PREÇOS ===
+# Preço final impresso de cada produto por dia, indexado por (Código, data)
+HISTORICO_PRECOS_PATH = os.path.join(CACHE_DIR, 'historico_precos.sqlite3')
+# Pula produtos cujo preço final é igual ao último preço impresso
+HISTORICO_PRECOS_FILTRAR = os.getenv("HISTORICO_PRECOS_FILTRAR", "1").lower() in ("1", "true", "sim")
+
+# === CONFIGURAÇÕES DA LEITURA DE RELATÓRIOS ===
+# Relatórios já interpretados, em Parquet, identificados pelo hash do arquivo
+INGESTAO_CACHE_DIR = os.path.join(CACHE_DIR, 'relatorios')
+# Entradas sem uso há mais dias que isso são apagadas (o cache vai junto no Actions cache)
+INGESTAO_CACHE_DIAS = int(os.getenv("INGESTAO_CACHE_DIAS", "7"))
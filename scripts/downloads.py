@@ -0,0 +1,243 @@
+# downloads.py
+import json
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import websocket
+
+from config import DOWNLOAD_TIMEOUT
+from metricas import metricas
+
+EXTENSOES_PARCIAIS = (".crdownload", ".tmp", ".part")
+
+class GerenciadorDownloads:
+    """
+    Dá a cada relatório um diretório de download próprio e aguarda o arquivo
+    exato daquele pedido, em vez de esperar tempos fixos e pegar o mais recente.
+
+    A conclusão vem dos eventos do Chrome (Browser.downloadProgress) em uma conexão
+    de depuração própria; se ela não puder ser aberta ou cair, o diretório é
+    acompanhado até não haver arquivos parciais e o tamanho ficar estável.
+    """
+    def __init__(self, navegador, diretorio_base, timeout=DOWNLOAD_TIMEOUT, intervalo=0.2, eventos=None):
+        self.navegador = navegador
+        self.diretorio_base = diretorio_base
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self._contador = 0
+        self.eventos = eventos
+        if self.eventos is None:
+            try:
+                self.eventos = EventosDownload.conectar(navegador)
+            except Exception as e:
+                print(f"⚠️ Eventos de download indisponíveis ({e}); acompanhando os arquivos da pasta.")
+
+    def preparar(self, nome):
+        """
+        Cria um diretório exclusivo e direciona os próximos downloads do Chrome para ele
+
+        Returns:
+            str: Caminho do diretório de destino
+        """
+        self._contador += 1
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        destino = os.path.join(self.diretorio_base, f"{nome}_{timestamp}_{self._contador}")
+        os.makedirs(destino, exist_ok=True)
+
+        # Vale para todas as abas, inclusive as que o Trier abre para o relatório
+        if self.eventos and self.eventos.ativo:
+            try:
+                self.eventos.direcionar(destino)
+                return destino
+            except Exception as e:
+                print(f"⚠️ Eventos de download indisponíveis ({e}); acompanhando os arquivos da pasta.")
+                self.fechar()
+        self.navegador.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": destino,
+        })
+        return destino
+
+    def aguardar(self, destino, extensao, timeout=None):
+        """
+        Aguarda o download terminar: pelo evento de conclusão do Chrome ou, sem
+        eventos, sem arquivos parciais e com tamanho estável
+
+        Returns:
+            str: Caminho do arquivo baixado
+        """
+        timeout = timeout or self.timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        modo = "eventos"
+
+        caminho = None
+        if self.eventos and self.eventos.ativo:
+            caminho = self.eventos.aguardar(destino, extensao, limite)
+        if caminho is None and (not self.eventos or not self.eventos.ativo):
+            # Sem conexão de eventos (ou ela caiu durante a espera)
+            modo = "arquivos"
+            caminho = self._aguardar_arquivo(destino, extensao, limite)
+
+        if caminho is None:
+            encontrados = os.listdir(destino)
+            raise TimeoutError(
+                f"❌ Download .{extensao} não concluído em {timeout}s no diretório {destino} "
+                f"(arquivos presentes: {encontrados or 'nenhum'})"
+            )
+        metricas.registrar("espera_download", time.monotonic() - inicio, extensao=extensao, modo=modo)
+        return caminho
+
+    def fechar(self):
+        """Encerra a conexão de eventos"""
+        if self.eventos:
+            eventos, self.eventos = self.eventos, None
+            eventos.fechar()
+
+    def _aguardar_arquivo(self, destino, extensao, limite):
+        """Acompanha o diretório até o arquivo estar completo; None se passar do limite"""
+        ultimo_tamanho = None
+        while time.monotonic() < limite:
+            nomes = os.listdir(destino)
+            parciais = [n for n in nomes if n.endswith(EXTENSOES_PARCIAIS)]
+            prontos = [n for n in nomes if n.lower().endswith(f".{extensao}")]
+
+            if prontos and not parciais:
+                caminho = os.path.join(destino, prontos[0])
+                tamanho = os.path.getsize(caminho)
+                # Só considera pronto depois de duas leituras iguais e não vazias
+                if tamanho > 0 and tamanho == ultimo_tamanho:
+                    return caminho
+                ultimo_tamanho = tamanho
+            else:
+                ultimo_tamanho = None
+
+            time.sleep(self.intervalo)
+        return None
+
+class EventosDownload:
+    """
+    Conexão própria com o depurador do Chrome que recebe Browser.downloadWillBegin
+    e Browser.downloadProgress; o download é associado à pasta definida em
+    direcionar() quando começa.
+    """
+    def __init__(self, conexao, timeout_comando=10):
+        self._conexao = conexao
+        self._timeout_comando = timeout_comando
+        self._condicao = threading.Condition()
+        self._proximo_id = 0
+        self._respostas = {}
+        self._downloads = {}
+        self._destino = None
+        self.ativo = True
+        threading.Thread(target=self._ler, name="eventos-download", daemon=True).start()
+
+    @classmethod
+    def conectar(cls, navegador):
+        """Abre a conexão no endereço de depuração informado pelo ChromeDriver"""
+        endereco = navegador.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        with urllib.request.urlopen(f"http://{endereco}/json/version", timeout=10) as resposta:
+            url = json.load(resposta)["webSocketDebuggerUrl"]
+        # Sem cabeçalho Origin: o Chrome recusa origens não liberadas por --remote-allow-origins
+        return cls(websocket.create_connection(url, timeout=None, suppress_origin=True))
+
+    def direcionar(self, destino):
+        """Envia os próximos downloads para `destino`, com eventos de progresso"""
+        self._comando("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": destino,
+            "eventsEnabled": True,
+        })
+        # Só depois da resposta: eventos anteriores a ela ainda são da pasta antiga
+        with self._condicao:
+            self._destino = destino
+
+    def aguardar(self, destino, extensao, limite):
+        """
+        Espera o evento de conclusão de um download .extensao em `destino`
+
+        Returns:
+            str: Caminho do arquivo, ou None se passar do limite ou a conexão cair
+        """
+        with self._condicao:
+            while self.ativo:
+                caminho = self._concluido(destino, extensao)
+                if caminho:
+                    return caminho
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return None
+                self._condicao.wait(restante)
+        return None
+
+    def fechar(self):
+        with self._condicao:
+            self.ativo = False
+            self._condicao.notify_all()
+        try:
+            self._conexao.close()
+        except Exception:
+            pass
+
+    def _concluido(self, destino, extensao):
+        for download in self._downloads.values():
+            if download["destino"] != destino or not download["nome"].lower().endswith(f".{extensao}"):
+                continue
+            if download["estado"] == "canceled":
+                raise RuntimeError(f"❌ Download de {download['nome']} cancelado pelo navegador")
+            if download["estado"] == "completed":
+                # filePath só é informado pelas versões mais novas do Chrome
+                return download["caminho"] or os.path.join(destino, download["nome"])
+        return None
+
+    def _comando(self, metodo, parametros):
+        with self._condicao:
+            self._proximo_id += 1
+            identificador = self._proximo_id
+        self._conexao.send(json.dumps({"id": identificador, "method": metodo, "params": parametros}))
+
+        limite = time.monotonic() + self._timeout_comando
+        with self._condicao:
+            while identificador not in self._respostas:
+                restante = limite - time.monotonic()
+                if not self.ativo or restante <= 0:
+                    raise TimeoutError(f"Sem resposta do navegador para {metodo}")
+                self._condicao.wait(restante)
+            resposta = self._respostas.pop(identificador)
+        if "error" in resposta:
+            raise RuntimeError(f"{metodo}: {resposta['error'].get('message')}")
+        return resposta.get("result", {})
+
+    def _ler(self):
+        try:
+            while True:
+                mensagem = json.loads(self._conexao.recv())
+                with self._condicao:
+                    self._tratar(mensagem)
+                    self._condicao.notify_all()
+        except Exception:
+            # Conexão encerrada (navegador fechado): quem espera passa a acompanhar a pasta
+            with self._condicao:
+                self.ativo = False
+                self._condicao.notify_all()
+
+    def _tratar(self, mensagem):
+        if "id" in mensagem:
+            self._respostas[mensagem["id"]] = mensagem
+            return
+        parametros = mensagem.get("params", {})
+        if mensagem.get("method") == "Browser.downloadWillBegin":
+            self._downloads[parametros["guid"]] = {
+                "destino": self._destino,
+                "nome": parametros.get("suggestedFilename", ""),
+                "estado": "inProgress",
+                "caminho": None,
+            }
+        elif mensagem.get("method") == "Browser.downloadProgress":
+            download = self._downloads.get(parametros["guid"])
+            if download:
+                download["estado"] = parametros.get("state", download["estado"])
+                download["caminho"] = parametros.get("filePath") or download["caminho"]
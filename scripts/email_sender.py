@@ -1,79 +1,111 @@
 # email_sender.py
 import base64
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from google.oauth2.service_account import Credentials
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from datetime import datetime, timedelta
-from config import EMAILS_FILIAIS
+from datetime import datetime
+from config import load_email_map
 import os
 import json
-import tempfile
 
 from config import *
+from metricas import metricas
 
-def enviar_email_com_pdfs(relatorio_pdf, arquivos_etiquetas):
+# Status HTTP em que a Gmail API pede para tentar de novo mais tarde
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+def criar_servico_gmail():
+    """Cria o serviço da Gmail API com a conta de serviço delegada ao remetente"""
+    creds_json = json.loads(SERVICE_ACCOUNT_PATH)
+    creds = service_account.Credentials.from_service_account_info(
+        creds_json,
+        scopes=["https://www.googleapis.com/auth/gmail.send"]
+    )
+    delegated_creds = creds.with_subject(GMAIL_SENDER)
+    return build("gmail", "v1", credentials=delegated_creds, cache_discovery=False)
+
+class ServicoSimulado:
     """
-    Envia emails com PDFs para cada filial
-    
-    Args:
-        relatorio_pdf: Caminho do relatório principal
-        arquivos_etiquetas: Dict {filial: caminho_pdf}
+    Substituto da Gmail API para execuções de teste (envio simulado): cada
+    mensagem é gravada como .eml na pasta informada e nada é enviado
     """
-    print("\n📨 Preparando envio de emails...")
-    print(f"📧 Sender: {GMAIL_SENDER}")
-    print(f"📋 Filiais no mapa: {list(EMAILS_FILIAIS.keys())}")
-    print(f"🏷️ Etiquetas geradas: {list(arquivos_etiquetas.keys())}")
-    
-    if not SERVICE_ACCOUNT_PATH:
-        print("❌ Service account credentials not found in environment!")
-        return
-    
-    # Create temporary service account file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp_file:
-        try:
-            # Parse the JSON to validate it
-            creds_json = json.loads(SERVICE_ACCOUNT_PATH)
-            json.dump(creds_json, temp_file)
-            temp_file_path = temp_file.name
-            print(f"✅ Temporary service account file created: {temp_file_path}")
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON in service account credentials: {e}")
-            return
-        except Exception as e:
-            print(f"❌ Error creating service account file: {e}")
-            return
-    
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return _EnvioSimulado(self.diretorio, body["raw"])
+
+class _EnvioSimulado:
+    _contador = 0
+    _lock = threading.Lock()
+
+    def __init__(self, diretorio, raw):
+        self.diretorio = diretorio
+        self.raw = raw
+
+    def execute(self):
+        with self._lock:
+            _EnvioSimulado._contador += 1
+            identificador = f"simulado-{_EnvioSimulado._contador:04d}"
+        with open(os.path.join(self.diretorio, f"{identificador}.eml"), "wb") as f:
+            f.write(base64.urlsafe_b64decode(self.raw))
+        return {"id": identificador}
+
+def fabrica_servico_simulado(diretorio):
+    """Fábrica para enviar_email_com_pdfs(fabrica_servico=...) que grava os emails em disco"""
+    return lambda: ServicoSimulado(diretorio)
+
+class LimitadorTaxa:
+    """Garante no máximo N envios por segundo entre todas as threads"""
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0
+        self._proximo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+def _status_http(erro):
+    """Extrai o status HTTP de um erro da Gmail API (ou de um substituto local)"""
+    resp = getattr(erro, "resp", None)
+    status = getattr(resp, "status", None) or getattr(erro, "status_code", None)
     try:
-        # Configura credenciais
-        scope = ["https://www.googleapis.com/auth/gmail.send"]
-        
-        creds = service_account.Credentials.from_service_account_file(
-            temp_file_path,
-            scopes=scope
-        )
-        
-        delegated_creds = creds.with_subject(GMAIL_SENDER)
-        service = build("gmail", "v1", credentials=delegated_creds)
-        print("✅ Gmail API service initialized successfully")
-        
-        data = (datetime.now()).strftime("%d/%m/%Y")
-        
-        for filial, email in EMAILS_FILIAIS.items():
-            # Verifica se há etiquetas para esta filial
-            if filial not in arquivos_etiquetas:
-                print(f"   ⚠️ Filial {filial} não tem etiquetas, pulando...")
-                continue
-            
-            print(f"  📧 Preparando email para Filial {filial} -> {email}")
-            
-            try:
-                # Cria mensagem
-                msg = EmailMessage()
-                msg["To"] = email
-                msg["From"] = GMAIL_SENDER
-                msg["Subject"] = f"ALTERAÇÕES DE PREÇOS - {data}"
-                msg.set_content(f"""
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def _criar_anexo_pdf(caminho):
+    """Lê e codifica um PDF como parte MIME, reaproveitável em várias mensagens"""
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    anexo = EmailMessage()
+    anexo.set_content(dados, maintype="application", subtype="pdf",
+                      filename=os.path.basename(caminho))
+    return anexo
+
+def _montar_mensagem(filial, email, data, anexo_relatorio, caminho_etiquetas):
+    """Monta o email de uma filial com o relatório global e as etiquetas dela"""
+    msg = EmailMessage()
+    msg["To"] = email
+    msg["From"] = GMAIL_SENDER
+    msg["Subject"] = f"ALTERAÇÕES DE PREÇOS - {data}"
+    msg.set_content(f"""
 Esta é uma mensagem automática.
 
 Foram detectadas alterações de preços na data atual e a filial {filial} possui produtos com saldo em estoque relacionados a essas alterações.
@@ -84,47 +116,116 @@ Estão anexados:
 
 Sistema de Automação - Drogaria Cidade
 """)
-                
-                # Anexa relatório global
-                with open(relatorio_pdf, "rb") as f:
-                    msg.add_attachment(
-                        f.read(),
-                        maintype="application",
-                        subtype="pdf",
-                        filename=os.path.basename(relatorio_pdf)
-                    )
-                
-                # Anexa etiquetas da filial
-                with open(arquivos_etiquetas[filial], "rb") as f:
-                    msg.add_attachment(
-                        f.read(),
-                        maintype="application",
-                        subtype="pdf",
-                        filename=os.path.basename(arquivos_etiquetas[filial])
-                    )
-                
-                # Envia email
-                raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-                result = service.users().messages().send(userId="me", body={"raw": raw}).execute()
-                
-                print(f"    ✅ Email enviado para Filial {filial} (Message ID: {result.get('id', 'N/A')})")
-                
-            except Exception as e:
-                print(f"    ❌ Erro ao enviar email para Filial {filial}: {e}")
-                import traceback
-                traceback.print_exc()
-    
+
+    # Anexa relatório global (já codificado uma única vez)
+    msg.make_mixed()
+    msg.attach(anexo_relatorio)
+
+    # Anexa etiquetas da filial
+    msg.attach(_criar_anexo_pdf(caminho_etiquetas))
+    return msg
+
+def _enviar_com_retry(servico, raw, limitador, tentativas, espera_base):
+    """
+    Envia a mensagem com backoff exponencial em 429/5xx
+
+    Returns:
+        tuple: (resposta da API, número de tentativas usadas)
+    """
+    for tentativa in range(1, tentativas + 1):
+        limitador.aguardar()
+        try:
+            return servico.users().messages().send(userId="me", body={"raw": raw}).execute(), tentativa
+        except Exception as e:
+            status = _status_http(e)
+            if status not in STATUS_RETENTAVEIS or tentativa == tentativas:
+                e.tentativas = tentativa
+                raise
+            espera = espera_base * (2 ** (tentativa - 1)) + random.uniform(0, espera_base)
+            print(f"    ⏳ Gmail respondeu {status}, nova tentativa em {espera:.1f}s...")
+            time.sleep(espera)
+
+def enviar_email_com_pdfs(relatorio_pdf, arquivos_etiquetas, fabrica_servico=None,
+                          emails_filiais=None, max_threads=EMAIL_THREADS,
+                          envios_por_segundo=EMAIL_ENVIOS_POR_SEGUNDO,
+                          tentativas=EMAIL_TENTATIVAS, espera_base=1.0, periodo=None):
+    """
+    Envia emails com PDFs para cada filial
+
+    Args:
+        relatorio_pdf: Caminho do relatório principal
+        arquivos_etiquetas: Dict {filial: caminho_pdf}
+        fabrica_servico: Função que cria o serviço Gmail (uma instância por thread);
+                         por padrão usa a conta de serviço configurada
+        emails_filiais: Dict {filial: email}; por padrão o mapa de EMAIL_MAP_BASE64
+        periodo: Data ou período exibido no assunto; por padrão a data de hoje
+
+    Returns:
+        dict: {filial: {"status", "id", "tentativas", "erro"}}
+    """
+    emails_filiais = load_email_map() if emails_filiais is None else emails_filiais
+
+    print("\n📨 Preparando envio de emails...")
+    print(f"📧 Sender: {GMAIL_SENDER}")
+    print(f"📋 Filiais no mapa: {list(emails_filiais.keys())}")
+    print(f"🏷️ Etiquetas geradas: {list(arquivos_etiquetas.keys())}")
+
+    if fabrica_servico is None:
+        if not SERVICE_ACCOUNT_PATH:
+            print("❌ Service account credentials not found in environment!")
+            return {}
+        fabrica_servico = criar_servico_gmail
+
+    resultados = {}
+    pendentes = []
+    for filial, email in emails_filiais.items():
+        # Verifica se há etiquetas para esta filial
+        if filial not in arquivos_etiquetas:
+            print(f"   ⚠️ Filial {filial} não tem etiquetas, pulando...")
+            resultados[filial] = {"status": "sem_etiquetas", "id": None, "tentativas": 0, "erro": None}
+            continue
+        pendentes.append((filial, email))
+
+    if not pendentes:
+        return resultados
+
+    try:
+        anexo_relatorio = _criar_anexo_pdf(relatorio_pdf)
     except Exception as e:
-        print(f"❌ Erro crítico no envio de emails: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    finally:
-        # Clean up temporary file
+        print(f"❌ Erro crítico ao ler o relatório {relatorio_pdf}: {e}")
+        return resultados
+
+    data = periodo or (datetime.now()).strftime("%d/%m/%Y")
+    limitador = LimitadorTaxa(envios_por_segundo)
+    local = threading.local()
+
+    def enviar(filial, email):
+        print(f"  📧 Preparando email para Filial {filial} -> {email}")
         try:
-            os.unlink(temp_file_path)
-            print(f"🧹 Temporary file cleaned up: {temp_file_path}")
-        except:
-            pass
-    
+            # O cliente da Gmail API não é thread-safe: um serviço por thread
+            if not hasattr(local, "servico"):
+                local.servico = fabrica_servico()
+
+            with metricas.medir("envio_email"):
+                msg = _montar_mensagem(filial, email, data, anexo_relatorio, arquivos_etiquetas[filial])
+                raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
+                result, usadas = _enviar_com_retry(local.servico, raw, limitador, tentativas, espera_base)
+
+            print(f"    ✅ Email enviado para Filial {filial} (Message ID: {result.get('id', 'N/A')})")
+            return filial, {"status": "enviado", "id": result.get("id"), "tentativas": usadas, "erro": None}
+        except Exception as e:
+            print(f"    ❌ Erro ao enviar email para Filial {filial}: {e}")
+            return filial, {"status": "erro", "id": None, "tentativas": getattr(e, "tentativas", 0), "erro": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_threads, len(pendentes)))) as executor:
+        for filial, resultado in executor.map(lambda p: enviar(*p), pendentes):
+            resultados[filial] = resultado
+
+    enviados = sum(1 for r in resultados.values() if r["status"] == "enviado")
+    falhas = [f for f, r in resultados.items() if r["status"] == "erro"]
+    print(f"\n📊 Emails enviados: {enviados}/{len(pendentes)}")
+    if falhas:
+        print(f"❌ Falhas: {falhas}")
+
     print("\n✅ Todos os emails foram processados.")
+    return resultados
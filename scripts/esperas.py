@@ -0,0 +1,97 @@
+# esperas.py
+import sys
+import time
+from collections import defaultdict, deque
+
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import ESPERA_TIMEOUT_MAXIMO, ESPERA_TIMEOUT_MINIMO, ESPERA_FATOR
+from metricas import metricas
+
+class Esperas:
+    """
+    Esperas por condições reais do DOM, no lugar de pausas fixas.
+
+    Cada ponto de espera (por padrão, função e linha de quem chamou) guarda as
+    últimas durações observadas. O timeout de cada ponto é ESPERA_FATOR vezes o p95
+    dessas durações, limitado entre ESPERA_TIMEOUT_MINIMO e ESPERA_TIMEOUT_MAXIMO,
+    para que uma tela travada seja detectada em segundos em vez de sempre 30 s.
+    """
+    AMOSTRAS_MINIMAS = 5
+
+    def __init__(self, navegador, maximo=ESPERA_TIMEOUT_MAXIMO, minimo=ESPERA_TIMEOUT_MINIMO,
+                 fator=ESPERA_FATOR, intervalo=0.05):
+        self.navegador = navegador
+        self.maximo = maximo
+        self.minimo = minimo
+        self.fator = fator
+        self.intervalo = intervalo
+        self.historico = defaultdict(lambda: deque(maxlen=50))
+        self._waits = {}
+
+    def timeout(self, ponto, maximo=None):
+        """Timeout atual do ponto de espera, em segundos"""
+        maximo = maximo or self.maximo
+        duracoes = sorted(self.historico[ponto])
+        if len(duracoes) < self.AMOSTRAS_MINIMAS:
+            return maximo
+        p95 = duracoes[min(len(duracoes) - 1, int(0.95 * len(duracoes)))]
+        return min(maximo, max(self.minimo, self.fator * p95))
+
+    def ate(self, condicao, ponto=None, timeout=None, maximo=None):
+        """
+        Aguarda a condição e registra quanto tempo o ponto de espera levou
+
+        Args:
+            condicao: Condição do Selenium (expected_conditions ou função(navegador))
+            ponto: Nome do ponto de espera; padrão "função:linha" de quem chamou
+            timeout: Força um timeout fixo em vez do adaptativo
+            maximo: Teto do timeout adaptativo deste ponto (padrão ESPERA_TIMEOUT_MAXIMO)
+
+        Returns:
+            O valor retornado pela condição (elemento, True...)
+        """
+        if ponto is None:
+            chamador = sys._getframe(1)
+            ponto = f"{chamador.f_code.co_name}:{chamador.f_lineno}"
+        limite = timeout or self.timeout(ponto, maximo)
+
+        inicio = time.perf_counter()
+        try:
+            resultado = self._wait(limite).until(condicao)
+        except TimeoutException:
+            metricas.registrar("espera", time.perf_counter() - inicio, ponto=ponto, resultado="timeout")
+            raise TimeoutException(f"Espera '{ponto}' excedeu {limite:.1f}s")
+
+        duracao = time.perf_counter() - inicio
+        self.historico[ponto].append(duracao)
+        metricas.registrar("espera", duracao, ponto=ponto, resultado="ok")
+        return resultado
+
+    def _wait(self, limite):
+        # Reaproveita os WebDriverWait; timeouts arredondados para poucos objetos distintos
+        chave = round(limite, 1)
+        if chave not in self._waits:
+            self._waits[chave] = WebDriverWait(
+                self.navegador, chave, poll_frequency=self.intervalo,
+                ignored_exceptions=(StaleElementReferenceException,)
+            )
+        return self._waits[chave]
+
+def valor_diferente(localizador, anterior):
+    """Condição: o value do elemento mudou em relação ao valor anterior"""
+    def condicao(navegador):
+        valor = navegador.find_element(*localizador).get_attribute("value")
+        return valor if valor != anterior else False
+    return condicao
+
+def valor_igual(localizador, esperado):
+    """Condição: o value do elemento é exatamente o esperado"""
+    def condicao(navegador):
+        return navegador.find_element(*localizador).get_attribute("value") == esperado
+    return condicao
+
+def pagina_carregada(navegador):
+    """Condição: o documento terminou de carregar"""
+    return navegador.execute_script("return document.readyState") in ("interactive", "complete")
@@ -0,0 +1,197 @@
+# estado_execucao.py
+import sqlite3
+from datetime import datetime
+
+from config import ESTADO_EXECUCAO_PATH
+
+class EstadoExecucao:
+    """
+    Registra, por dia, quais etiquetas (filial, Código, Preço) já foram enviadas.
+
+    Um par (Código, Preço) entregue a todas as filiais que o têm em estoque fica
+    completo e sai das reexecuções do dia já na etapa 1. Um par entregue só a
+    algumas filiais volta a ser processado, mas apenas para as filiais que ainda
+    não o receberam (filtrar_estoque). Vale sempre o último preço tratado de cada
+    código: um preço que voltou a um valor já enviado no dia é enviado de novo.
+    """
+    def __init__(self, caminho=ESTADO_EXECUCAO_PATH, data=None):
+        self.data = data or datetime.now().strftime("%Y-%m-%d")
+        self._conexao = sqlite3.connect(caminho)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS pares_processados (
+                data TEXT NOT NULL,
+                codigo INTEGER NOT NULL,
+                preco REAL NOT NULL,
+                PRIMARY KEY (data, codigo, preco)
+            )
+        """)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS envios_filiais (
+                data TEXT NOT NULL,
+                filial INTEGER NOT NULL,
+                codigo INTEGER NOT NULL,
+                preco REAL NOT NULL,
+                PRIMARY KEY (data, filial, codigo, preco)
+            )
+        """)
+        self._conexao.commit()
+
+    def pares_processados(self):
+        """
+        Retorna o último par (codigo, preco) de cada código entregue a todas as filiais na data
+
+        Os registros são regravados a cada envio (INSERT OR REPLACE), então o maior
+        rowid de cada código é o último preço tratado.
+        """
+        cursor = self._conexao.execute("""
+            SELECT codigo, preco FROM pares_processados
+            WHERE rowid IN (SELECT MAX(rowid) FROM pares_processados WHERE data = ? GROUP BY codigo)
+        """, (self.data,))
+        return set(cursor)
+
+    def envios_filiais(self):
+        """Retorna o último (filial, codigo, preco) enviado a cada filial, por código, na data"""
+        cursor = self._conexao.execute("""
+            SELECT filial, codigo, preco FROM envios_filiais
+            WHERE rowid IN (SELECT MAX(rowid) FROM envios_filiais WHERE data = ? GROUP BY filial, codigo)
+        """, (self.data,))
+        return set(cursor)
+
+    def filtrar_novos(self, df_produtos):
+        """
+        Remove do DataFrame as linhas cujo preço é o último já entregue hoje a todas
+        as filiais; df_produtos deve ter um preço por código (ver filtrar_alteracoes)
+        """
+        processados = dict(self.pares_processados())
+        if not processados:
+            return df_produtos
+        # Códigos com alguma filial cujo último envio foi em outro preço
+        precos_filiais = {}
+        for _, codigo, preco in self.envios_filiais():
+            precos_filiais.setdefault(codigo, set()).add(preco)
+        mascara = [
+            processados.get(codigo) != preco or precos_filiais.get(codigo, {preco}) != {preco}
+            for codigo, preco in _pares(df_produtos)
+        ]
+        return df_produtos[mascara]
+
+    def filtrar_estoque(self, df_produtos, df_estoque):
+        """
+        Remove do estoque as filiais que já receberam hoje a etiqueta do produto no preço atual
+
+        Args:
+            df_produtos: Produtos da execução (um preço por código)
+            df_estoque: Tabela longa com 'filial' e 'Código'
+
+        Returns:
+            DataFrame: df_estoque sem as linhas já enviadas
+        """
+        enviados = self.envios_filiais()
+        if not enviados:
+            return df_estoque
+        precos = dict(_pares(df_produtos))
+        mascara = [
+            (int(filial), int(codigo), precos.get(int(codigo))) not in enviados
+            for filial, codigo in zip(df_estoque["filial"], df_estoque["Código"])
+        ]
+        removidas = len(mascara) - sum(mascara)
+        if removidas:
+            print(f"♻️ {removidas} etiquetas já enviadas hoje às filiais ficam de fora.")
+        return df_estoque[mascara]
+
+    def registrar_execucao(self, df_produtos, produtos_filiais, resultados_envio):
+        """
+        Marca como enviadas as etiquetas que chegaram a cada filial
+
+        Args:
+            df_produtos: Produtos processados nesta execução
+            produtos_filiais: {filial: DataFrame} usado para gerar as etiquetas
+            resultados_envio: Resumo por filial retornado por enviar_email_com_pdfs
+
+        Returns:
+            int: Quantidade de pares entregues a todas as filiais
+        """
+        pares = set(_pares(df_produtos))
+        envios = [envio for envio in _envios(produtos_filiais, resultados_envio) if envio[1:] in pares]
+        completos = pares_enviados(df_produtos, produtos_filiais, resultados_envio)
+        self._conexao.executemany(
+            "INSERT OR REPLACE INTO envios_filiais (data, filial, codigo, preco) VALUES (?, ?, ?, ?)",
+            [(self.data, *envio) for envio in envios]
+        )
+        self._conexao.executemany(
+            "INSERT OR REPLACE INTO pares_processados (data, codigo, preco) VALUES (?, ?, ?)",
+            [(self.data, codigo, preco) for codigo, preco in completos]
+        )
+        self._conexao.commit()
+        return len(completos)
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        if self._conexao:
+            self._conexao.close()
+            self._conexao = None
+
+def filtrar_alteracoes(df_produtos, estado, historico=None, recentes=None):
+    """
+    Reduz o relatório às alterações que ainda precisam de etiqueta
+
+    1. Um código alterado várias vezes no dia fica com a última linha (o preço final)
+    2. Saem os preços finais já entregues hoje (estado)
+    3. Saem os produtos cujo preço final é o da última etiqueta impressa (historico, opcional)
+
+    Args:
+        df_produtos: DataFrame com 'Código' e 'Preço', na ordem do relatório
+        estado: EstadoExecucao do dia do relatório
+        historico: HistoricoPrecos, ou None para não filtrar pelo histórico
+        recentes: {codigo: preco} ainda não gravados no histórico (ver HistoricoPrecos.filtrar_alterados)
+
+    Returns:
+        DataFrame: Linhas a tratar
+    """
+    df = df_produtos.drop_duplicates("Código", keep="last")
+    if len(df) < len(df_produtos):
+        print(f"♻️ {len(df_produtos) - len(df)} linhas de produtos alterados mais de uma vez; vale o último preço.")
+
+    total = len(df)
+    df = estado.filtrar_novos(df)
+    if len(df) < total:
+        print(f"♻️ {total - len(df)} alterações já tratadas hoje; {len(df)} novas.")
+
+    if historico is not None:
+        total = len(df)
+        df = historico.filtrar_alterados(df, data=estado.data, recentes=recentes)
+        if len(df) < total:
+            print(f"🗃️ {total - len(df)} produtos com o mesmo preço da última etiqueta; {len(df)} a imprimir.")
+    return df
+
+def pares_enviados(df_produtos, produtos_filiais, resultados_envio):
+    """
+    Pares (codigo, preco) cujas etiquetas chegaram a todas as filiais que os têm;
+    ficam pendentes os de filiais sem envio confirmado ("erro", "sem_etiquetas")
+    e os consultados sem EAN
+
+    Returns:
+        list: Pares (codigo, preco) distintos
+    """
+    enviados = set(_envios(produtos_filiais, resultados_envio))
+    pendentes = {
+        (codigo, preco)
+        for filial, df_filial in produtos_filiais.items()
+        for codigo, preco in _pares(df_filial)
+        if (int(filial), codigo, preco) not in enviados
+    }
+    return [par for par in dict.fromkeys(_pares(df_produtos)) if par not in pendentes]
+
+def _envios(produtos_filiais, resultados_envio):
+    """(filial, codigo, preco) das filiais com status "enviado", somente produtos com EAN"""
+    envios = []
+    for filial, df_filial in produtos_filiais.items():
+        if resultados_envio.get(str(filial), {}).get("status") != "enviado":
+            continue
+        com_ean = df_filial["EAN"].fillna("").astype(str).str.strip() != ""
+        envios.extend((int(filial), codigo, preco) for codigo, preco in _pares(df_filial[com_ean]))
+    return envios
+
+def _pares(df):
+    """Lista os pares (codigo, preco) normalizados de um DataFrame de produtos"""
+    return [(int(c), round(float(p), 2)) for c, p in zip(df["Código"], df["Preço"])]
@@ -3,195 +3,423 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm, mm
 from reportlab.lib.colors import black
 from reportlab.graphics.barcode import code128
-from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfbase.pdfmetrics import stringWidth, registerFont
+from reportlab.pdfbase.ttfonts import TTFont
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import textwrap
+import time
+import pandas as pd
 from datetime import datetime
 import os
 
 from config import *
+from montagem_pdf import montar_pdfs_por_pagina, modelo_imposicao, posicoes_imposicao, comprimir_pdf
+from ingestao import interpretar_estoque, DESLOCAMENTO_NOME_FILIAL
+from metricas import metricas
 
-def gerar_etiquetas(lista_produtos, caminho_pdf):
+MARGEM_ESQ = 0.5 * cm
+MARGEM_DIR = 0.5 * cm
+
+def _registrar_fontes():
     """
-    Gera PDF com etiquetas de preço
+    Usa as fontes TrueType configuradas, se houver. O ReportLab embute apenas os
+    caracteres usados (subconjunto), o que mantém o PDF pequeno.
     
-    Args:
-        lista_produtos: Lista de tuplas (descricao, preco, ean)
-        caminho_pdf: Caminho para salvar o PDF
+    Returns:
+        tuple: (fonte normal, fonte negrito)
     """
-    print(f"\n📄 Criando etiquetas no arquivo: {caminho_pdf}")
-    print(f"   Total de produtos: {len(lista_produtos)}")
-    
-    # Configurações da página
-    largura = ETIQUETA_LARGURA_CM * cm
-    altura = ETIQUETA_ALTURA_CM * cm
-    margem_esq = 0.5 * cm
-    margem_dir = 0.5 * cm
+    if not ETIQUETAS_FONTE_TTF:
+        return "Helvetica", "Helvetica-Bold"
+    registerFont(TTFont("EtiquetaNormal", ETIQUETAS_FONTE_TTF))
+    registerFont(TTFont("EtiquetaNegrito", ETIQUETAS_FONTE_NEGRITO_TTF or ETIQUETAS_FONTE_TTF))
+    return "EtiquetaNormal", "EtiquetaNegrito"
+
+FONTE, FONTE_NEGRITO = _registrar_fontes()
+
+class RenderizadorEtiquetas:
+    """
+    Desenha etiquetas em um canvas reaproveitando as partes repetidas.
     
-    c = canvas.Canvas(caminho_pdf, pagesize=(largura, altura))
+    A moldura e cada código de barras viram Form XObjects do PDF: são desenhados
+    uma única vez por arquivo e depois apenas referenciados, o que acelera a
+    geração e reduz o tamanho do arquivo. Com várias etiquetas por página, os
+    códigos de barras (quase nunca repetidos no mesmo arquivo) ficam no fluxo da
+    página, que é comprimido junto com as demais etiquetas.
+    """
+    def __init__(self, c, largura=ETIQUETA_LARGURA_CM * cm, altura=ETIQUETA_ALTURA_CM * cm,
+                 formas_codigo_barras=True):
+        self.c = c
+        self.largura = largura
+        self.altura = altura
+        self.formas_codigo_barras = formas_codigo_barras
+        self._formas = set()
     
-    for idx, (descricao, preco, ean) in enumerate(lista_produtos, start=1):
-        # Debug
-        print(f"      Produto {idx}: {descricao[:30]}... | R$ {preco} | EAN: {ean}")
-        
+    def desenhar(self, descricao, preco, ean, departamento=""):
+        """Desenha uma etiqueta completa na origem atual do canvas"""
         # Prepara dados
         descricao = str(descricao).upper().strip()
         preco_txt = f"R$ {float(preco):.2f}".replace(".", ",")
+        ean = "" if pd.isna(ean) else str(ean).strip()
         
         # Desenha descrição (centralizada, máximo 2 linhas)
-        desenhar_descricao(c, descricao, largura, margem_esq, margem_dir)
+        desenhar_descricao(self.c, descricao, self.largura, MARGEM_ESQ, MARGEM_DIR)
         
         # Desenha preço (grande à esquerda)
-        c.setFont("Helvetica-Bold", 31.5)
-        c.drawString(margem_esq, 0.9 * cm, preco_txt)
+        self.c.setFont(FONTE_NEGRITO, 31.5)
+        self.c.drawString(MARGEM_ESQ, 0.9 * cm, preco_txt)
         
         # Desenha código de barras e EAN (centralizado à direita)
-        if ean and len(ean) > 5:
-            desenhar_codigo_barras(c, ean, largura)
+        if len(ean) > 5:
+            if self.formas_codigo_barras:
+                self._usar_forma(f"ean_{ean}", lambda: desenhar_codigo_barras(self.c, ean, self.largura))
+            else:
+                desenhar_codigo_barras(self.c, ean, self.largura)
         
-        # Moldura da etiqueta (opcional)
-        c.setStrokeColor(black)
-        c.rect(0, 0, largura, altura, stroke=1, fill=0)
-        c.showPage()
+        # Departamento (modo com vários departamentos), pequeno no canto inferior direito
+        if departamento:
+            self.c.setFont(FONTE, 6)
+            self.c.drawRightString(self.largura - MARGEM_DIR, 0.15 * cm, f"DEP {departamento}")
+        
+        # Moldura da etiqueta
+        self._usar_forma("moldura", self._desenhar_moldura)
+    
+    def _desenhar_moldura(self):
+        self.c.setStrokeColor(black)
+        self.c.rect(0, 0, self.largura, self.altura, stroke=1, fill=0)
+    
+    def _usar_forma(self, nome, desenhar):
+        """Desenha o conteúdo como Form XObject na primeira vez e depois só o referencia"""
+        if nome not in self._formas:
+            self.c.beginForm(nome, 0, 0, self.largura, self.altura)
+            desenhar()
+            self.c.endForm()
+            self._formas.add(nome)
+        self.c.doForm(nome)
+
+class FolhaEtiquetas:
+    """
+    PDF de etiquetas: uma etiqueta por página ou várias em grade, conforme o
+    modelo de imposição (montagem_pdf.MODELOS_IMPOSICAO). Cada etiqueta mantém o
+    tamanho e o desenho originais, apenas deslocada para a sua posição na página.
+    """
+    def __init__(self, caminho_pdf, modelo=None, largura=ETIQUETA_LARGURA_CM * cm,
+                 altura=ETIQUETA_ALTURA_CM * cm, comprimir=ETIQUETAS_COMPRIMIR):
+        self.caminho_pdf = caminho_pdf
+        self.comprimir = comprimir
+        if modelo is None:
+            tamanho_pagina, self.posicoes = (largura, altura), [(0, 0)]
+        else:
+            tamanho_pagina, self.posicoes = posicoes_imposicao(modelo, largura, altura)
+        self.c = canvas.Canvas(caminho_pdf, pagesize=tamanho_pagina)
+        self.renderizador = RenderizadorEtiquetas(self.c, largura, altura,
+                                                  formas_codigo_barras=modelo is None)
+        self._posicao = 0
     
-    c.save()
+    def adicionar(self, descricao, preco, ean, departamento=""):
+        """Desenha a etiqueta na próxima posição livre, abrindo outra página se preciso"""
+        if self._posicao == len(self.posicoes):
+            self.c.showPage()
+            self._posicao = 0
+        x, y = self.posicoes[self._posicao]
+        self.c.saveState()
+        self.c.translate(x, y)
+        self.renderizador.desenhar(descricao, preco, ean, departamento)
+        self.c.restoreState()
+        self._posicao += 1
+    
+    def salvar(self):
+        self.c.save()
+        if self.comprimir:
+            comprimir_pdf(self.caminho_pdf)
+        return self.caminho_pdf
+
+def gerar_etiquetas(lista_produtos, caminho_pdf, modelo=None, comprimir=ETIQUETAS_COMPRIMIR):
+    """
+    Gera PDF com etiquetas de preço
+    
+    Args:
+        lista_produtos: Lista de tuplas (descricao, preco, ean) ou (descricao, preco, ean, departamento)
+        caminho_pdf: Caminho para salvar o PDF
+        modelo: Modelo de imposição (None = uma etiqueta por página)
+        comprimir: Regrava o PDF com fluxos de objetos comprimidos
+    """
+    print(f"\n📄 Criando etiquetas no arquivo: {caminho_pdf}")
+    print(f"   Total de produtos: {len(lista_produtos)}")
+    
+    folha = FolhaEtiquetas(caminho_pdf, modelo, comprimir=comprimir)
+    for produto in lista_produtos:
+        folha.adicionar(*produto)
+    folha.salvar()
     print(f"✅ Etiquetas geradas com sucesso: {caminho_pdf}")
 
-def desenhar_descricao(c, descricao, largura, margem_esq, margem_dir):
-    """Desenha a descrição do produto no topo da etiqueta"""
-    fonte_base = 10
-    largura_max = largura - margem_esq - margem_dir
+@lru_cache(maxsize=8192)
+def ajustar_descricao(descricao, largura_max):
+    """
+    Calcula o maior tamanho de fonte (10 a 6) em que a descrição cabe em 2 linhas
+    
+    Returns:
+        tuple: (tamanho_fonte, (linha1, linha2))
+    """
+    linhas = textwrap.wrap(descricao, width=40) or [""]
+    
+    # Garante exatamente 2 linhas
+    if len(linhas) == 1:
+        linhas.append("")
+    elif len(linhas) > 2:
+        linhas = [linhas[0], " ".join(linhas[1:])]
     
     # Ajusta fonte para caber no espaço
+    fonte_base = 10
     while fonte_base >= 6:
-        c.setFont("Helvetica-Bold", fonte_base)
-        linhas = textwrap.wrap(descricao, width=40)
-        
-        # Garante exatamente 2 linhas
-        if len(linhas) == 1:
-            linhas.append("")
-        elif len(linhas) > 2:
-            linhas = [linhas[0], " ".join(linhas[1:])]
-        
-        # Verifica se cabe na largura
-        larguras = [stringWidth(l, "Helvetica-Bold", fonte_base) for l in linhas]
+        larguras = [stringWidth(l, FONTE_NEGRITO, fonte_base) for l in linhas]
         if all(w <= largura_max for w in larguras):
             break
         fonte_base -= 1
     
+    return fonte_base, tuple(linhas)
+
+def desenhar_descricao(c, descricao, largura, margem_esq, margem_dir):
+    """Desenha a descrição do produto no topo da etiqueta"""
+    fonte_base, linhas = ajustar_descricao(descricao, largura - margem_esq - margem_dir)
+    
     # Desenha as linhas
-    c.setFont("Helvetica-Bold", fonte_base)
+    c.setFont(FONTE_NEGRITO, fonte_base)
     if linhas[1] == "":
         c.drawCentredString(largura / 2, 2.4 * cm, linhas[0])
     else:
         c.drawCentredString(largura / 2, 2.5 * cm, linhas[0])
         c.drawCentredString(largura / 2, 2.1 * cm, linhas[1])
 
+@lru_cache(maxsize=8192)
+def _criar_codigo_barras(ean):
+    return code128.Code128(ean, barHeight=7 * mm, barWidth=0.52)
+
 def desenhar_codigo_barras(c, ean, largura):
     """Desenha código de barras e número EAN"""
     try:
         # Código de barras
-        barcode = code128.Code128(ean, barHeight=7 * mm, barWidth=0.52)
+        barcode = _criar_codigo_barras(ean)
         barcode_x = largura - 3.5 * cm
         barcode_y = 1.1 * cm
         barcode.drawOn(c, barcode_x, barcode_y)
         
         # Número EAN abaixo do código
-        c.setFont("Helvetica", 9)
+        c.setFont(FONTE, 9)
         c.drawCentredString(barcode_x + 1.75 * cm, barcode_y - 10, ean)
     except Exception as e:
         print(f"⚠️ Erro ao gerar código de barras {ean}: {e}")
 
-def gerar_etiquetas_por_filial(df_produtos, df_estoque, saida_dir):
+def gerar_etiquetas_por_filial(df_produtos, df_estoque, saida_dir, processos=ETIQUETAS_PROCESSOS,
+                               modo=ETIQUETAS_MODO, imposicao=ETIQUETAS_IMPOSICAO):
     """
     Gera etiquetas separadas por filial baseado no estoque
     
+    Args:
+        processos: Número de processos para gerar os PDFs (1 = sequencial)
+        modo: "filial" renderiza cada PDF separadamente; "mestre" renderiza cada
+              etiqueta uma única vez e monta os PDFs das filiais por página
+        imposicao: Modelo de imposição ("" = uma etiqueta por página)
+    
     Returns:
         dict: {filial: caminho_pdf}
     """
     print("\n🏷️ Gerando etiquetas por filial...")
+    modelo = modelo_imposicao(imposicao)
     
-    # Processa estoque por filial
-    filiais_dict = processar_estoque_por_filial(df_estoque)
+    # Processa estoque por filial e seleciona os produtos alterados de cada uma
+    filiais, codigos_por_filial, grupos = _selecionar_produtos(df_produtos, df_estoque)
     
-    print(f"\nTotal de filiais encontradas: {len(filiais_dict)}")
-    for filial, codigos in filiais_dict.items():
-        print(f"Filial {filial} → {len(codigos)} códigos no estoque")
+    print(f"\nTotal de filiais encontradas: {len(filiais)}")
+    for filial in filiais:
+        print(f"Filial {filial} → {codigos_por_filial.get(filial, 0)} códigos no estoque")
     
-    arquivos_etiquetas = {}
+    trabalhos = []
     
-    for filial, codigos in filiais_dict.items():
+    for filial in filiais:
         print(f"\n➡️ Processando filial {filial}")
-        print(f"   Total de códigos no estoque: {len(codigos)}")
+        print(f"   Total de códigos no estoque: {codigos_por_filial.get(filial, 0)}")
         
-        # Filtra produtos alterados que existem nesta filial
-        df_filial = df_produtos[df_produtos["Código"].astype(int).isin(codigos)]
+        df_filial = grupos.get(filial)
         
-        print(f"   Produtos alterados nesta filial: {len(df_filial)}")
-        if df_filial.empty:
+        print(f"   Produtos alterados nesta filial: {0 if df_filial is None else len(df_filial)}")
+        if df_filial is None or df_filial.empty:
             print("   ⚠️ Nenhum produto alterado nesta filial — pulando.")
             continue
         
-        # Gera etiquetas
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         caminho_pdf = os.path.join(saida_dir, f"etiquetas_F{filial:02d}_{timestamp}.pdf")
         
-        lista_produtos = list(zip(
-            df_filial["Descrição Completa"], 
-            df_filial["Preço"], 
-            df_filial["EAN"]
-        ))
-        
-        gerar_etiquetas(lista_produtos, caminho_pdf)
+        # Tuplas simples, baratas de enviar para outro processo
+        lista_produtos = [
+            (str(descricao), float(preco), "" if pd.isna(ean) else str(ean), departamento)
+            for descricao, preco, ean, departamento in zip(
+                df_filial["Descrição Completa"], 
+                df_filial["Preço"], 
+                df_filial["EAN"],
+                _departamentos(df_filial)
+            )
+        ]
+        trabalhos.append((filial, lista_produtos, caminho_pdf))
+    
+    # O modo mestre copia uma etiqueta por página; com imposição cada filial tem
+    # a sua própria grade e é renderizada diretamente nela
+    if modo == "mestre" and modelo is None and trabalhos:
+        return _gerar_etiquetas_mestre(trabalhos, saida_dir)
+    
+    if processos > 1 and len(trabalhos) > 1:
+        return _gerar_etiquetas_paralelo(trabalhos, processos, modelo)
+    
+    # Gera etiquetas
+    arquivos_etiquetas = {}
+    for filial, lista_produtos, caminho_pdf in trabalhos:
+        with metricas.medir("pdf_filial"):
+            gerar_etiquetas(lista_produtos, caminho_pdf, modelo)
         arquivos_etiquetas[filial] = caminho_pdf
     
     return arquivos_etiquetas
 
+def _gerar_etiquetas_mestre(trabalhos, saida_dir):
+    """
+    Renderiza um PDF mestre com cada etiqueta distinta uma única vez e monta
+    o PDF de cada filial copiando as páginas correspondentes.
+    """
+    # Etiquetas idênticas (descrição, preço, EAN) compartilham a mesma página
+    paginas = {}
+    for _, lista_produtos, _ in trabalhos:
+        for produto in lista_produtos:
+            paginas.setdefault(produto, len(paginas))
+    
+    total = sum(len(lista_produtos) for _, lista_produtos, _ in trabalhos)
+    print(f"\n🧩 {len(paginas)} etiquetas distintas para {total} etiquetas em {len(trabalhos)} filiais")
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    caminho_mestre = os.path.join(saida_dir, f"etiquetas_mestre_{timestamp}.pdf")
+    with metricas.medir("pdf_mestre"):
+        gerar_etiquetas(list(paginas), caminho_mestre, comprimir=False)
+    
+    with metricas.medir("montagem_pdfs_filiais"):
+        montados = set(montar_pdfs_por_pagina(caminho_mestre, {
+            caminho_pdf: [paginas[produto] for produto in lista_produtos]
+            for _, lista_produtos, caminho_pdf in trabalhos
+        }))
+    
+    if ETIQUETAS_COMPRIMIR:
+        for caminho_pdf in montados:
+            comprimir_pdf(caminho_pdf)
+    
+    return {filial: caminho_pdf for filial, _, caminho_pdf in trabalhos if caminho_pdf in montados}
+
+def _gerar_etiquetas_paralelo(trabalhos, processos, modelo=None):
+    """
+    Gera os PDFs das filiais em um pool de processos.
+    Uma filial com erro é registrada e não interrompe as demais.
+    """
+    print(f"\n⚙️ Gerando {len(trabalhos)} PDFs em até {processos} processos...")
+    arquivos_etiquetas = {}
+    
+    with ProcessPoolExecutor(max_workers=min(processos, len(trabalhos))) as executor:
+        futuros = {
+            executor.submit(_gerar_etiquetas_cronometrado, lista_produtos, caminho_pdf, modelo): (filial, caminho_pdf)
+            for filial, lista_produtos, caminho_pdf in trabalhos
+        }
+        for futuro in as_completed(futuros):
+            filial, caminho_pdf = futuros[futuro]
+            try:
+                # O tempo é medido no processo filho e registrado aqui
+                metricas.registrar("pdf_filial", futuro.result())
+                arquivos_etiquetas[filial] = caminho_pdf
+            except Exception as e:
+                print(f"❌ Erro ao gerar etiquetas da filial {filial}: {e}")
+    
+    # Mantém a ordem das filiais do relatório
+    return {filial: arquivos_etiquetas[filial] for filial, _, _ in trabalhos if filial in arquivos_etiquetas}
+
+def _departamentos(df):
+    """Departamento de cada linha ("" quando o relatório é de um único departamento)"""
+    if "Departamento" not in df.columns:
+        return [""] * len(df)
+    return ["" if pd.isna(d) else str(d) for d in df["Departamento"]]
+
+def produtos_por_filial(df_produtos, df_estoque):
+    """
+    Seleciona os produtos alterados que têm estoque em cada filial
+    
+    Returns:
+        dict: {filial: DataFrame com as linhas de df_produtos daquela filial}
+    """
+    return _selecionar_produtos(df_produtos, df_estoque)[2]
+
+def _selecionar_produtos(df_produtos, df_estoque):
+    """
+    Cruza os produtos alterados com o estoque em um único merge, mantendo a
+    ordem original dos produtos dentro de cada filial
+    
+    Returns:
+        tuple: (filiais, códigos em estoque por filial, {filial: DataFrame})
+    """
+    # Processa estoque por filial (tabela longa filial × código)
+    df_estoque_long, filiais = _ler_estoque_long(df_estoque)
+    codigos_por_filial = df_estoque_long.groupby("filial", sort=False, observed=True).size()
+    
+    df_alterados = df_produtos.assign(**{
+        "Código": df_produtos["Código"].astype(int),
+        "_ordem": range(len(df_produtos)),
+    })
+    df_selecionados = (
+        df_estoque_long.merge(df_alterados, on="Código", how="inner")
+        .sort_values(["filial", "_ordem"], kind="stable")
+        .drop(columns="_ordem")
+    )
+    grupos = dict(tuple(df_selecionados.groupby("filial", sort=False, observed=True)))
+    return filiais, codigos_por_filial, grupos
+
+def _gerar_etiquetas_cronometrado(lista_produtos, caminho_pdf, modelo=None):
+    """Gera o PDF e devolve a duração em segundos"""
+    inicio = time.perf_counter()
+    gerar_etiquetas(lista_produtos, caminho_pdf, modelo)
+    return time.perf_counter() - inicio
+
 def processar_estoque_por_filial(df_estoque):
     """
     Processa relatório de estoque para extrair códigos por filial
-    """
-    # Encontra coluna 'Cód.'
-    col_cod = None
-    for c in df_estoque.columns:
-        if str(c).strip() == "Cód.":
-            col_cod = c
-            break
     
-    if col_cod is None:
-        raise Exception("❌ Coluna 'Cód.' não encontrada no relatório de estoque.")
+    Returns:
+        dict: {filial: [códigos]}
+    """
+    df_estoque_long, filiais = _ler_estoque_long(df_estoque)
+    codigos = df_estoque_long.groupby("filial", sort=False, observed=True)["Código"].apply(list)
+    return {filial: codigos.get(filial, []) for filial in filiais}
+
+def estoque_long_por_filial(df_estoque):
+    """
+    Converte o relatório de estoque em uma tabela longa
     
-    idx_cod = df_estoque.columns.get_loc(col_cod)
-    filiais_dict = {}
-    filial_atual = None
-    coletando_produtos = False
+    Returns:
+        DataFrame: colunas 'filial' e 'Código', uma linha por produto em estoque na filial
+    """
+    return _ler_estoque_long(df_estoque)[0]
+
+def _ler_estoque_long(df_estoque):
+    """
+    Aceita o relatório de estoque já lido pelo módulo de ingestão (tabela longa
+    filial/Código) ou a planilha bruta, com a coluna 'Cód.'
     
-    # Percorre linhas
-    for idx, row in df_estoque.iterrows():
-        valor_cod = str(row[col_cod]).strip()
+    Returns:
+        tuple: (DataFrame longo filial/Código, lista de filiais na ordem do relatório)
+    """
+    if "filial" not in df_estoque.columns:
+        # Encontra coluna 'Cód.'
+        col_cod = None
+        for c in df_estoque.columns:
+            if str(c).strip() == "Cód.":
+                col_cod = c
+                break
         
-        # Encontrou início de uma filial
-        if valor_cod == "Filial:":
-            nome_filial_raw = str(row.iloc[idx_cod + 2]).strip()
-            try:
-                filial_num = int(nome_filial_raw.split()[0].replace("F", ""))
-            except:
-                continue
-            
-            filiais_dict[filial_num] = []
-            filial_atual = filial_num
-            coletando_produtos = True
-            continue
+        if col_cod is None:
+            raise Exception("❌ Coluna 'Cód.' não encontrada no relatório de estoque.")
         
-        # Coletando códigos da filial atual
-        if coletando_produtos and filial_atual is not None:
-            if valor_cod == "" or valor_cod.lower() == "nan":
-                coletando_produtos = False
-                continue
-            
-            try:
-                codigo_prod = int(float(valor_cod))
-                filiais_dict[filial_atual].append(codigo_prod)
-            except:
-                pass
+        idx_cod = df_estoque.columns.get_loc(col_cod)
+        df_estoque = interpretar_estoque(df_estoque[col_cod], df_estoque.iloc[:, idx_cod + DESLOCAMENTO_NOME_FILIAL])
     
-    return filiais_dict
+    return df_estoque, list(df_estoque["filial"].cat.categories)
@@ -0,0 +1,347 @@
+# fake_trier.py
+"""
+Servidor local que imita as telas do Trier usadas pela automação:
+login, cadastro de produtos, relatório de alterações de preço e relatório de
+saldo em estoque. Os ids e a estrutura dos menus seguem os XPaths do
+TrierScraper, e os relatórios são gerados pelo gerador_relatorios. A página de
+produto (CAMINHO_PRODUTO) segue o contrato descrito em trier_http, que não foi
+confirmado no Trier real. Sem sessão válida, as telas redirecionam para o login.
+
+Uso:
+    python fake_trier.py [porta] [produtos]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from reportlab.pdfgen import canvas
+
+from gerador_relatorios import (gerar_catalogo, gerar_alteracoes_preco, gerar_mapa_estoque,
+                                montar_estoque, salvar_relatorio_precos, salvar_relatorio_estoque)
+
+CAMINHO_LOGIN = "/sgfpod1/Login.pod"
+CAMINHO_PRINCIPAL = "/sgfpod1/Principal.pod"
+CAMINHO_PRODUTO = "/sgfpod1/Produto.pod"
+CAMINHO_API_PRODUTO = "/sgfpod1/api/produto"
+CAMINHO_RELATORIO = "/sgfpod1/relatorio"
+
+PAGINA_LOGIN = """<html><body>
+<form method="post" action="{acao}">
+<input id="id_cod_usuario" name="cod_usuario">
+<input id="nom_senha" name="nom_senha" type="password">
+<button id="login" type="submit">Entrar</button>
+</form></body></html>"""
+
+PAGINA_PRODUTO = """<html><body>
+<input id="cod_redbarraEntrada" value="{codigo}">
+<input id="cod_barra_principal" value="{ean}">
+<input id="nom_prodcomp" value="{descricao}">
+</body></html>"""
+
+def _menu(id_lista, itens):
+    """Monta um <ul> cujos itens seguem o padrão li/a/span dos XPaths"""
+    linhas = []
+    for i in range(1, itens[0] + 1):
+        tela = itens[1].get(i, "")
+        linhas.append(f'<li><a href="#" data-tela="{tela}"><span>Item {i}</span></a></li>')
+    return f'<ul id="{id_lista}">{"".join(linhas)}</ul>'
+
+# menuBar usa li/a/span[2]; os submenus, li/a/span
+MENU_BAR = '<ul id="menuBar">' + "".join(
+    f'<li><a href="#"><span>•</span><span>Menu {i}</span></a></li>' for i in range(1, 12)
+) + "</ul>"
+
+PAGINA_PRINCIPAL = """<html><head><style>
+#divLoading {{ display: none; position: fixed; top: 0; left: 0; }}
+ul {{ display: inline-block; vertical-align: top; }}
+</style></head><body>
+{menu_bar}
+{submenus}
+<div id="divLoading">Carregando...</div>
+<div id="tela"></div>
+<script>
+const TELAS = {{
+  cadastro: `<input id="cod_redbarraEntrada">
+    <input id="cod_barra_principal" value=""><input id="nom_prodcomp" value="">`,
+  precos: `<input id="cod_deptoEntrada"> <input type="radio" name="consid_depto" id="consid_depto_D">
+    <div id="tabTabdhtmlgoodies_tabView1_1"><a href="#">Filtros</a></div>
+    <input id="dat_init"> <input id="dat_fim"> <input type="checkbox" id="ultima_alteracao">
+    <input type="radio" name="sel_produ_alt" id="sel_produ_alt_3">
+    <input type="radio" name="sel_tipo_alt_preco" id="sel_tipo_alt_preco_2">
+    <input type="radio" name="saida" id="saida_1" checked> <input type="radio" name="saida" id="saida_4">
+    <button id="runReport">Gerar</button>`,
+  estoque: `<input type="radio" name="agrup_fil" id="agrup_fil_2">
+    <div id="tabTabdhtmlgoodies_tabView1_1"><a href="#">Filtros</a></div>
+    <input id="cod_reduzidoEntrada"> <span id="codigos"></span>
+    <div id="tabTabdhtmlgoodies_tabView1_3"><a href="#">Saída</a></div>
+    <input type="radio" name="saida" id="saida_1" checked> <input type="radio" name="saida" id="saida_4">
+    <button id="runReport">Gerar</button>`,
+}};
+const LATENCIA = {latencia_ms};
+let codigosEstoque = [];
+
+function carregando(ativo) {{
+  document.getElementById('divLoading').style.display = ativo ? 'block' : 'none';
+}}
+
+function baixar(parametros) {{
+  carregando(true);
+  setTimeout(() => {{
+    window.location = '{relatorio}?' + new URLSearchParams(parametros);
+    carregando(false);
+  }}, LATENCIA);
+}}
+
+function abrirTela(nome) {{
+  document.getElementById('tela').innerHTML = TELAS[nome];
+  codigosEstoque = [];
+  carregando(true);
+  setTimeout(() => carregando(false), LATENCIA);
+
+  if (nome === 'cadastro') {{
+    const campo = document.getElementById('cod_redbarraEntrada');
+    campo.addEventListener('keydown', e => {{
+      if (e.key !== 'Enter') return;
+      carregando(true);
+      fetch('{api}?codigo=' + encodeURIComponent(campo.value))
+        .then(r => r.json())
+        .then(d => {{
+          document.getElementById('cod_barra_principal').value = d.ean || '';
+          document.getElementById('nom_prodcomp').value = d.descricao || '';
+        }})
+        .finally(() => carregando(false));
+    }});
+  }}
+
+  if (nome === 'estoque') {{
+    const campo = document.getElementById('cod_reduzidoEntrada');
+    campo.addEventListener('keydown', e => {{
+      if (e.key !== 'Enter') return;
+      carregando(true);
+      codigosEstoque.push(...campo.value.split(/[,;\\s]+/).filter(Boolean));
+      campo.value = '';
+      document.getElementById('codigos').textContent = codigosEstoque.length + ' códigos';
+      setTimeout(() => carregando(false), LATENCIA);
+    }});
+  }}
+
+  if (nome === 'precos') {{
+    document.getElementById('cod_deptoEntrada').addEventListener('keydown', e => {{
+      if (e.key !== 'Enter') return;
+      carregando(true);
+      setTimeout(() => carregando(false), LATENCIA);
+    }});
+  }}
+
+  const botao = document.getElementById('runReport');
+  if (botao) {{
+    botao.addEventListener('click', () => {{
+      const saida = document.getElementById('saida_4').checked ? 'xls' : 'pdf';
+      if (nome === 'precos') baixar({{tipo: 'precos', saida: saida}});
+      else baixar({{tipo: 'estoque', saida: 'xls', codigos: codigosEstoque.join(',')}});
+    }});
+  }}
+}}
+
+document.querySelectorAll('a[data-tela]').forEach(a => a.addEventListener('click', e => {{
+  e.preventDefault();
+  if (a.dataset.tela) abrirTela(a.dataset.tela);
+}}));
+</script></body></html>"""
+
+def _pagina_principal(latencia):
+    submenus = "".join([
+        _menu("ul1", (1, {})),
+        _menu("ul77", (1, {1: "cadastro"})),
+        _menu("ul123", (7, {})),
+        _menu("ul127", (1, {1: "estoque"})),
+        _menu("ul130", (2, {2: "precos"})),
+    ])
+    return PAGINA_PRINCIPAL.format(
+        menu_bar=MENU_BAR, submenus=submenus, latencia_ms=int(latencia * 1000),
+        api=CAMINHO_API_PRODUTO, relatorio=CAMINHO_RELATORIO,
+    )
+
+class FakeTrierHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém keep-alive como o servidor real
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+        if url.path == CAMINHO_LOGIN:
+            self._responder(200, PAGINA_LOGIN.format(acao=CAMINHO_LOGIN))
+        elif self._sessao() not in self.server.sessoes:
+            self._responder(302, "", cabecalhos={"Location": CAMINHO_LOGIN})
+        elif url.path == CAMINHO_PRINCIPAL:
+            self._responder(200, _pagina_principal(self.server.latencia))
+        elif url.path == CAMINHO_PRODUTO:
+            self._produto(parametros)
+        elif url.path == CAMINHO_API_PRODUTO:
+            self._api_produto(parametros)
+        elif url.path == CAMINHO_RELATORIO:
+            self._relatorio(parametros)
+        else:
+            self._responder(404, "não encontrado")
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        corpo = parse_qs(self.rfile.read(tamanho).decode())
+        if urlparse(self.path).path != CAMINHO_LOGIN:
+            self._responder(404, "não encontrado")
+            return
+
+        usuario = corpo.get("cod_usuario", [""])[0]
+        senha = corpo.get("nom_senha", [""])[0]
+        if (usuario, senha) != self.server.credenciais:
+            self._responder(200, PAGINA_LOGIN.format(acao=CAMINHO_LOGIN))
+            return
+
+        sessao = uuid.uuid4().hex
+        self.server.sessoes.add(sessao)
+        self._responder(303, "", cabecalhos={
+            "Set-Cookie": f"JSESSIONID={sessao}; Path=/",
+            "Location": CAMINHO_PRINCIPAL,
+        })
+
+    def _buscar_produto(self, parametros, nome):
+        time.sleep(self.server.latencia)
+        self.server.consultas += 1
+        if self.server.consultas == self.server.expirar_apos:
+            # Simula a expiração da sessão no meio de um lote
+            self.server.sessoes.clear()
+        codigo = parametros.get(nome, [""])[0]
+        try:
+            return codigo, self.server.produtos[int(codigo)]
+        except (KeyError, ValueError):
+            return codigo, None
+
+    def _produto(self, parametros):
+        codigo, dados = self._buscar_produto(parametros, "cod_redbarra")
+        if dados is None:
+            self._responder(200, "<html><body>Produto não encontrado</body></html>")
+            return
+        ean, descricao = dados
+        self._responder(200, PAGINA_PRODUTO.format(
+            codigo=escape(codigo), ean=escape(ean), descricao=escape(descricao)))
+
+    def _api_produto(self, parametros):
+        _, dados = self._buscar_produto(parametros, "codigo")
+        ean, descricao = dados or ("", "")
+        self._responder(200, json.dumps({"ean": ean, "descricao": descricao}),
+                        tipo="application/json")
+
+    def _relatorio(self, parametros):
+        tipo = parametros.get("tipo", [""])[0]
+        saida = parametros.get("saida", ["pdf"])[0]
+        timestamp = time.strftime("%Y%m%d%H%M%S")
+
+        if tipo == "precos" and saida == "pdf":
+            dados = _pdf_precos(self.server.alteracoes)
+            nome, tipo_mime = f"alteracoes_{timestamp}.pdf", "application/pdf"
+        elif tipo == "precos":
+            dados = _xls(salvar_relatorio_precos, self.server.alteracoes)
+            nome, tipo_mime = f"alteracoes_{timestamp}.xls", "application/vnd.ms-excel"
+        elif tipo == "estoque":
+            codigos = {int(c) for c in parametros.get("codigos", [""])[0].split(",") if c}
+            mapa = {f: [c for c in cods if c in codigos] for f, cods in self.server.estoque.items()}
+            dados = _xls(salvar_relatorio_estoque, montar_estoque(mapa))
+            nome, tipo_mime = f"estoque_{timestamp}.xls", "application/vnd.ms-excel"
+        else:
+            self._responder(404, "relatório desconhecido")
+            return
+
+        self._responder(200, dados, tipo=tipo_mime, cabecalhos={
+            "Content-Disposition": f'attachment; filename="{nome}"',
+        })
+
+    def _sessao(self):
+        for parte in self.headers.get("Cookie", "").split(";"):
+            nome, _, valor = parte.strip().partition("=")
+            if nome == "JSESSIONID":
+                return valor
+        return None
+
+    def _responder(self, status, corpo, tipo="text/html; charset=utf-8", cabecalhos=None):
+        dados = corpo if isinstance(corpo, bytes) else corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        pass
+
+def _xls(salvar, df):
+    """Gera a planilha em um arquivo temporário e devolve os bytes"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "relatorio.xls")
+        salvar(df, caminho)
+        with open(caminho, "rb") as f:
+            return f.read()
+
+def _pdf_precos(df_alteracoes):
+    """PDF simples listando as alterações, no lugar do relatório técnico"""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    y = 800
+    for codigo, descricao, preco in zip(df_alteracoes["Código"], df_alteracoes["Descrição Produto"],
+                                        df_alteracoes["Preço Venda Atual"]):
+        c.drawString(40, y, f"{codigo}  {descricao}  R$ {preco:.2f}")
+        y -= 14
+        if y < 40:
+            c.showPage()
+            y = 800
+    c.save()
+    return buffer.getvalue()
+
+def iniciar_servidor_fake(produtos, porta=0, usuario="teste", senha="teste", latencia=0.0,
+                          alteracoes=None, estoque=None, expirar_apos=None):
+    """
+    Sobe o servidor fake em uma thread
+
+    Args:
+        produtos: Dict {codigo: (ean, descricao)}
+        porta: Porta local (0 = porta livre qualquer)
+        latencia: Atraso em segundos de cada consulta e carregamento de tela
+        alteracoes: DataFrame do relatório de preços (padrão: todos os produtos)
+        estoque: Dict {filial: [códigos]} (padrão: sorteado a partir dos produtos)
+        expirar_apos: Encerra todas as sessões ao atender essa consulta de produto
+
+    Returns:
+        tuple: (servidor, url_base) — chame servidor.shutdown() ao terminar
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), FakeTrierHandler)
+    servidor.daemon_threads = True
+    servidor.produtos = {int(c): v for c, v in produtos.items()}
+    servidor.alteracoes = alteracoes if alteracoes is not None else gerar_alteracoes_preco(servidor.produtos)
+    servidor.estoque = estoque if estoque is not None else gerar_mapa_estoque(servidor.produtos)
+    servidor.credenciais = (usuario, senha)
+    servidor.sessoes = set()
+    servidor.latencia = latencia
+    servidor.consultas = 0
+    servidor.expirar_apos = expirar_apos
+
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    return servidor, url_base
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 4647
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    servidor, url = iniciar_servidor_fake(gerar_catalogo(quantidade), porta=porta)
+    print(f"🧪 Trier fake em {url}{CAMINHO_LOGIN} (usuário/senha: teste/teste)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
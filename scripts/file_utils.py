@@ -4,6 +4,7 @@ import glob
 import shutil
 from datetime import datetime
 import pandas as pd
+import ingestao
 from config import ARQUIVOS_DIR
 
 def limpar_pasta_arquivos():
@@ -18,9 +19,9 @@ def limpar_pasta_arquivos():
         except Exception as e:
             print(f"⚠️ Não foi possível remover {caminho}: {e}")
 
-def encontrar_arquivo_mais_recente(extensao):
+def encontrar_arquivo_mais_recente(extensao, diretorio=ARQUIVOS_DIR):
     """Encontra o arquivo mais recente com a extensão especificada"""
-    arquivos = glob.glob(os.path.join(ARQUIVOS_DIR, f"*.{extensao}"))
+    arquivos = glob.glob(os.path.join(diretorio, f"*.{extensao}"))
     if not arquivos:
         return None
     return max(arquivos, key=os.path.getctime)
@@ -33,6 +34,47 @@ def salvar_dataframe_csv(df, prefixo="produtos_completos"):
     print(f"💾 Arquivo salvo: {caminho}")
     return caminho
 
-def ler_excel_com_cabecalho(caminho, linha_cabecalho=11):
-    """Lê arquivo Excel com cabeçalho em linha específica"""
-    return pd.read_excel(caminho, header=linha_cabecalho)
+def ler_dataframe_csv(caminho):
+    """Lê um CSV salvo por salvar_dataframe_csv, mantendo EAN e descrição como texto"""
+    df = pd.read_csv(caminho, sep=';', encoding='utf-8-sig',
+                     dtype={'EAN': str, 'Descrição Completa': str, 'Departamento': str})
+    for coluna in ('EAN', 'Descrição Completa'):
+        if coluna in df.columns:
+            df[coluna] = df[coluna].fillna("")
+    return df
+
+def ler_relatorio_precos(arquivo_xls):
+    """Lê o XLS de alterações de preço com as colunas Código, Produto e Preço"""
+    return ingestao.ler_relatorio_precos(arquivo_xls)
+
+def ler_relatorios_precos_departamentos(arquivos_xls):
+    """
+    Lê os relatórios de alterações de vários departamentos em uma única tabela
+    
+    Args:
+        arquivos_xls: Dict {departamento: caminho_xls}
+    
+    Returns:
+        DataFrame com Código, Produto, Preço e Departamento, um produto por linha.
+        Dentro de um departamento vale a última linha do código (o preço mais
+        recente do dia); um código repetido entre departamentos fica no primeiro
+        departamento em que aparece.
+    """
+    df = pd.concat([
+        ler_relatorio_precos(arquivo).drop_duplicates("Código", keep="last").assign(Departamento=str(departamento))
+        for departamento, arquivo in arquivos_xls.items()
+    ], ignore_index=True)
+    total = len(df)
+    df = df.drop_duplicates("Código", ignore_index=True)
+    if len(df) < total:
+        print(f"♻️ {total - len(df)} produtos repetidos entre departamentos removidos.")
+    return df
+
+def ler_relatorios_estoque(caminhos):
+    """
+    Lê um ou mais relatórios de estoque e junta os blocos de filiais
+    
+    Returns:
+        DataFrame longo com as colunas 'filial' e 'Código'
+    """
+    return ingestao.concatenar_estoques([ingestao.ler_relatorio_estoque(caminho) for caminho in caminhos])
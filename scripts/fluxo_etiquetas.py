@@ -0,0 +1,230 @@
+# fluxo_etiquetas.py
+"""
+Modo streaming das etapas 2 a 4: as consultas de produtos entram em uma fila
+assim que terminam e um consumidor já prepara as etiquetas. Quando o estoque é
+conhecido, cada PDF de filial é desenhado em ordem conforme os produtos chegam
+e fechado assim que o último produto daquela filial é consultado. A renderização
+fica escondida atrás da latência do navegador em vez de somar a ela.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+from reportlab.lib.units import cm
+
+from config import (ETIQUETA_LARGURA_CM, ETIQUETA_ALTURA_CM, ETIQUETAS_IMPOSICAO, ETIQUETAS_MODO,
+                    ETIQUETAS_PROCESSOS, MAX_SESSOES_TRIER, ESTOQUE_SESSAO_PARALELA)
+from file_utils import ler_relatorios_estoque
+from etiquetas import (FolhaEtiquetas, ajustar_descricao, _criar_codigo_barras,
+                       produtos_por_filial, _departamentos, MARGEM_ESQ, MARGEM_DIR)
+from montagem_pdf import modelo_imposicao
+from cache_produtos import resultados_conhecidos
+from metricas import metricas
+
+# Marca o fim da fila de resultados
+_FIM = object()
+
+class MontadorEtiquetas:
+    """
+    Recebe os resultados das consultas em qualquer ordem e desenha as etiquetas
+    de cada filial na ordem original dos produtos, fechando cada PDF assim que
+    todos os seus produtos tiverem resultado.
+    """
+    def __init__(self, df_produtos, saida_dir, imposicao=ETIQUETAS_IMPOSICAO):
+        self.df_produtos = df_produtos
+        self.saida_dir = saida_dir
+        self.modelo = modelo_imposicao(imposicao)
+        self.largura = ETIQUETA_LARGURA_CM * cm
+        self.altura = ETIQUETA_ALTURA_CM * cm
+        self.resultados = {}
+        self.filas = None
+        self.arquivos = {}
+        self._abertos = {}
+        self._posicoes = {}
+        self._filiais_por_codigo = {}
+
+    @property
+    def estoque_definido(self):
+        return self.filas is not None
+
+    def definir_estoque(self, df_estoque):
+        """Define os produtos de cada filial e desenha o que já estiver disponível"""
+        self.filas = {
+            filial: list(zip(df["Código"].astype(int), df["Preço"], _departamentos(df)))
+            for filial, df in produtos_por_filial(self.df_produtos, df_estoque).items()
+        }
+        for filial, itens in self.filas.items():
+            self._posicoes[filial] = 0
+            for codigo, _, _ in itens:
+                self._filiais_por_codigo.setdefault(codigo, []).append(filial)
+        print(f"📦 Estoque recebido: {len(self.filas)} filiais com produtos alterados.")
+        for filial in self.filas:
+            self._avancar(filial)
+
+    def receber(self, codigo, dados):
+        """Registra o resultado de uma consulta (None quando falhou)"""
+        ean, descricao = dados or ("", "")
+        self.resultados[codigo] = (ean, descricao)
+
+        # Adianta o trabalho de CPU compartilhado entre as filiais
+        ajustar_descricao(str(descricao).upper().strip(), self.largura - MARGEM_ESQ - MARGEM_DIR)
+        if len(str(ean).strip()) > 5:
+            _criar_codigo_barras(str(ean).strip())
+
+        if self.estoque_definido:
+            for filial in self._filiais_por_codigo.get(codigo, ()):
+                self._avancar(filial)
+
+    def finalizar(self):
+        """
+        Fecha os PDFs restantes; produtos sem resultado saem sem EAN e descrição
+
+        Returns:
+            dict: {filial: caminho_pdf} na ordem do relatório de estoque
+        """
+        for filial, itens in self.filas.items():
+            for codigo, _, _ in itens:
+                self.resultados.setdefault(codigo, ("", ""))
+            self._avancar(filial)
+        return {filial: self.arquivos[filial] for filial in self.filas if filial in self.arquivos}
+
+    def _avancar(self, filial):
+        """Desenha as próximas etiquetas da filial enquanto houver resultado para elas"""
+        itens = self.filas[filial]
+        posicao = self._posicoes[filial]
+        if posicao >= len(itens):
+            return
+
+        while posicao < len(itens) and itens[posicao][0] in self.resultados:
+            codigo, preco, departamento = itens[posicao]
+            ean, descricao = self.resultados[codigo]
+            self._folha(filial).adicionar(descricao, preco, ean, departamento)
+            posicao += 1
+        self._posicoes[filial] = posicao
+
+        if posicao == len(itens):
+            self.arquivos[filial] = self._abertos.pop(filial).salvar()
+            print(f"✅ Etiquetas da filial {filial} concluídas ({len(itens)} produtos).")
+
+    def _folha(self, filial):
+        if filial not in self._abertos:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            caminho_pdf = os.path.join(self.saida_dir, f"etiquetas_F{filial:02d}_{timestamp}.pdf")
+            self._abertos[filial] = FolhaEtiquetas(caminho_pdf, self.modelo, self.largura, self.altura)
+        return self._abertos[filial]
+
+def conflitos_streaming(max_sessoes=MAX_SESSOES_TRIER, modo=ETIQUETAS_MODO, processos=ETIQUETAS_PROCESSOS,
+                        estoque_paralelo=ESTOQUE_SESSAO_PARALELA):
+    """
+    Configurações que o modo streaming não atende: as consultas usam uma única
+    sessão do Trier (mais a sessão paralela de estoque, se ativa) e as etiquetas
+    são desenhadas por filial no processo principal
+
+    Returns:
+        list: Descrição de cada configuração conflitante (vazia se compatível)
+    """
+    conflitos = []
+    if max_sessoes > (2 if estoque_paralelo else 1):
+        conflitos.append(f"MAX_SESSOES_TRIER={max_sessoes}")
+    if modo != "filial":
+        conflitos.append(f"ETIQUETAS_MODO={modo}")
+    if processos > 1:
+        conflitos.append(f"ETIQUETAS_PROCESSOS={processos}")
+    return conflitos
+
+def executar_em_fluxo(df_produtos, consultar, estoque, saida_dir, cache=None, conhecidos=None, filtro_estoque=None):
+    """
+    Consulta os produtos e gera as etiquetas ao mesmo tempo
+
+    Args:
+        df_produtos: DataFrame com 'Código' e 'Preço'
+        consultar: Função que recebe os códigos pendentes e gera (codigo, dados|None),
+                   como TrierScraper.consultar_produtos_iter
+        estoque: Caminhos dos XLS de estoque, DataFrame já lido, ou Future que
+                 entregará os caminhos depois (sessão paralela de estoque)
+        saida_dir: Pasta dos PDFs
+        cache: CacheProdutos opcional; os códigos em cache entram na fila de imediato
+        conhecidos: Resultados já obtidos (cache e HTTP), usados no lugar da leitura do cache
+        filtro_estoque: Função opcional aplicada ao estoque lido antes de montar as filas
+                        (ex.: EstadoExecucao.filtrar_estoque, que tira as filiais já atendidas)
+
+    Returns:
+        tuple: (resultados {codigo: (ean, descricao)}, arquivos_etiquetas {filial: caminho})
+    """
+    codigos = list(dict.fromkeys(int(c) for c in df_produtos['Código']))
+    em_cache = resultados_conhecidos(codigos, cache, conhecidos)
+    pendentes = [c for c in codigos if c not in em_cache]
+    print(f"📦 {len(codigos)} códigos distintos: {len(em_cache)} no cache, {len(pendentes)} a consultar.")
+
+    fila = queue.Queue()
+    for codigo, dados in em_cache.items():
+        fila.put((codigo, dados))
+
+    def produzir():
+        try:
+            for item in consultar(pendentes):
+                fila.put(item)
+        except BaseException as e:
+            fila.put(e)
+        finally:
+            fila.put(_FIM)
+
+    produtor = threading.Thread(target=produzir, name="consultas-produtos", daemon=True)
+    if pendentes:
+        produtor.start()
+    else:
+        fila.put(_FIM)
+
+    montador = MontadorEtiquetas(df_produtos, saida_dir)
+    ler_estoque = lambda e: (filtro_estoque or (lambda df: df))(_ler_estoque(e))
+    novos = {}
+    tempo_ocioso = 0.0
+    erro = None
+
+    while True:
+        if not montador.estoque_definido:
+            if not isinstance(estoque, Future):
+                montador.definir_estoque(ler_estoque(estoque))
+            elif estoque.done():
+                montador.definir_estoque(ler_estoque(estoque.result()))
+
+        inicio = time.perf_counter()
+        try:
+            item = fila.get(timeout=0.2)
+        except queue.Empty:
+            tempo_ocioso += time.perf_counter() - inicio
+            continue
+        tempo_ocioso += time.perf_counter() - inicio
+
+        if item is _FIM:
+            break
+        if isinstance(item, BaseException):
+            erro = item
+            continue
+
+        codigo, dados = item
+        if dados is not None and codigo not in em_cache:
+            novos[codigo] = dados
+        montador.receber(codigo, dados)
+
+    if cache and novos:
+        cache.salvar_varios(novos)
+    if erro:
+        raise erro
+
+    # Sem consultas pendentes, ainda pode ser preciso aguardar o estoque
+    if not montador.estoque_definido:
+        montador.definir_estoque(ler_estoque(estoque.result() if isinstance(estoque, Future) else estoque))
+
+    metricas.registrar("fluxo_espera_consultas", tempo_ocioso)
+    print(f"⏱️ Consumidor ocioso aguardando consultas: {tempo_ocioso:.1f} s")
+
+    resultados = {**em_cache, **novos}
+    return resultados, montador.finalizar()
+
+def _ler_estoque(estoque):
+    return estoque if isinstance(estoque, pd.DataFrame) else ler_relatorios_estoque(estoque)
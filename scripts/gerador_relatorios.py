@@ -0,0 +1,170 @@
+# gerador_relatorios.py
+"""
+Gera relatórios sintéticos no mesmo formato dos exportados pelo Trier:
+- alterações de preço (cabeçalho na linha 7)
+- saldo em estoque por filial (cabeçalho na linha 11, blocos "Filial:")
+
+Os arquivos são gravados em BIFF (.xls do Excel 97-2003, o formato do Trier, lido
+pelo xlrd) quando o xlwt está instalado e a planilha cabe em 65.536 linhas; senão
+são gravados em xlsx pelo openpyxl. O pandas identifica o formato pelo conteúdo,
+mas a leitura de um xlsx mede o openpyxl e não o xlrd: formato_relatorio e
+formato_planilha informam qual foi gerado.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import xlwt
+except ImportError:
+    xlwt = None
+
+LINHA_CABECALHO_PRECOS = 7
+LINHA_CABECALHO_ESTOQUE = 11
+# Limite de linhas de uma planilha BIFF
+LINHAS_MAXIMAS_XLS = 65536
+
+PALAVRAS = ["DIPIRONA", "PARACETAMOL", "SHAMPOO", "CREME", "VITAMINA", "PROTETOR", "SOLAR",
+            "ALGODAO", "FRALDA", "INFANTIL", "COMPRIMIDO", "GOTAS", "XAROPE", "HIDRATANTE",
+            "CAPSULAS", "MG", "ML", "FPS", "50", "500", "200", "30", "C/", "10", "20"]
+
+def gerar_catalogo(n_produtos, seed=42):
+    """
+    Gera um cadastro de produtos
+
+    Returns:
+        dict: {codigo: (ean, descricao_completa)}
+    """
+    rng = np.random.default_rng(seed)
+    codigos = rng.choice(900_000, size=n_produtos, replace=False) + 100_000
+    catalogo = {}
+    for codigo in codigos:
+        palavras = rng.choice(PALAVRAS, size=rng.integers(3, 9))
+        ean = "" if rng.random() < 0.03 else f"789{rng.integers(0, 10**10):010d}"
+        catalogo[int(codigo)] = (ean, " ".join(palavras))
+    return catalogo
+
+def gerar_alteracoes_preco(catalogo, seed=42):
+    """Gera o DataFrame de alterações de preço para os produtos do catálogo"""
+    rng = np.random.default_rng(seed)
+    codigos = list(catalogo)
+    anteriores = rng.uniform(2, 300, size=len(codigos)).round(2)
+    atuais = (anteriores * rng.uniform(0.85, 1.2, size=len(codigos))).round(2)
+    return pd.DataFrame({
+        "Código": codigos,
+        "Descrição Produto": [catalogo[c][1][:40] for c in codigos],
+        "Preço Venda Anterior": anteriores,
+        "Preço Venda Atual": atuais,
+    })
+
+def gerar_mapa_estoque(codigos, filiais=20, cobertura=0.7, seed=42):
+    """
+    Sorteia quais produtos têm saldo em cada filial
+
+    Returns:
+        dict: {filial: [códigos]}
+    """
+    rng = np.random.default_rng(seed)
+    codigos = list(codigos)
+    return {
+        f: [c for c in codigos if rng.random() < cobertura]
+        for f in range(1, filiais + 1)
+    }
+
+def montar_estoque(mapa_estoque, seed=42):
+    """
+    Monta o DataFrame do relatório de estoque (como lido com header=11) a partir de
+    {filial: [códigos]}: linha "Filial:", produtos, linha de total e linha vazia.
+    """
+    rng = np.random.default_rng(seed)
+    cod, descricao, nome, saldo = [], [], [], []
+
+    for filial, codigos in mapa_estoque.items():
+        cod.append("Filial:")
+        descricao.append(None)
+        nome.append(f"F{filial:02d} - LOJA {filial}")
+        saldo.append(None)
+
+        cod.extend(float(c) for c in codigos)
+        descricao.extend(f"PRODUTO {c}" for c in codigos)
+        nome.extend([None] * len(codigos))
+        saldo.extend(rng.integers(1, 50, size=len(codigos)).tolist())
+
+        cod.extend(["Total", None])
+        descricao.extend([None, None])
+        nome.extend([None, None])
+        saldo.extend([None, None])
+
+    return pd.DataFrame({"Cód.": cod, "Descrição": descricao, "Unnamed: 2": nome, "Saldo": saldo})
+
+def gerar_estoque_sintetico(linhas=100_000, filiais=40, seed=42):
+    """Gera um relatório de estoque com aproximadamente o número de linhas pedido"""
+    rng = np.random.default_rng(seed)
+    por_filial = max(1, linhas // filiais - 3)
+    mapa = {
+        f: (rng.choice(200_000, size=por_filial, replace=False) + 1).tolist()
+        for f in range(1, filiais + 1)
+    }
+    return montar_estoque(mapa, seed)
+
+def salvar_relatorio_precos(df_alteracoes, caminho):
+    """Grava o relatório de alterações de preço com o cabeçalho na linha 7"""
+    preambulo = [
+        ["RELATÓRIO DE ALTERAÇÕES DE PREÇO"],
+        ["Departamento: 121"],
+        [f"Emitido em: {pd.Timestamp.now():%d/%m/%Y %H:%M}"],
+    ]
+    _salvar_com_preambulo(df_alteracoes, caminho, preambulo, LINHA_CABECALHO_PRECOS)
+    return caminho
+
+def salvar_relatorio_estoque(df_estoque, caminho):
+    """Grava o relatório de saldo em estoque com o cabeçalho na linha 11"""
+    preambulo = [
+        ["SALDO EM ESTOQUE"],
+        ["Agrupado por filial"],
+        [f"Emitido em: {pd.Timestamp.now():%d/%m/%Y %H:%M}"],
+    ]
+    # A terceira coluna não tem título no relatório original
+    df = df_estoque.rename(columns={"Unnamed: 2": ""})
+    _salvar_com_preambulo(df, caminho, preambulo, LINHA_CABECALHO_ESTOQUE)
+    return caminho
+
+def formato_planilha(caminho):
+    """Formato real do arquivo pelos bytes iniciais: "xls" (BIFF/OLE2) ou "xlsx" (zip)"""
+    with open(caminho, "rb") as f:
+        assinatura = f.read(4)
+    if assinatura == b"\xd0\xcf\x11\xe0":
+        return "xls"
+    if assinatura == b"PK\x03\x04":
+        return "xlsx"
+    return "desconhecido"
+
+def formato_relatorio(linhas, linha_cabecalho=LINHA_CABECALHO_ESTOQUE):
+    """Formato em que um relatório com `linhas` linhas de dados é gravado ("xls" ou "xlsx")"""
+    return "xls" if xlwt is not None and linha_cabecalho + 1 + linhas <= LINHAS_MAXIMAS_XLS else "xlsx"
+
+def _salvar_com_preambulo(df, caminho, preambulo, linha_cabecalho):
+    if formato_relatorio(len(df), linha_cabecalho) == "xls":
+        _salvar_xls(df, caminho, preambulo, linha_cabecalho)
+        return
+    with pd.ExcelWriter(caminho, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, startrow=linha_cabecalho)
+        planilha = writer.sheets["Sheet1"]
+        for i, linha in enumerate(preambulo, start=1):
+            for j, valor in enumerate(linha, start=1):
+                planilha.cell(row=i, column=j, value=valor)
+
+def _salvar_xls(df, caminho, preambulo, linha_cabecalho):
+    """Grava em BIFF com o xlwt; células vazias (None/NaN) ficam em branco"""
+    livro = xlwt.Workbook()
+    planilha = livro.add_sheet("Sheet1")
+    for i, linha in enumerate(preambulo):
+        for j, valor in enumerate(linha):
+            planilha.write(i, j, valor)
+    for j, coluna in enumerate(df.columns):
+        planilha.write(linha_cabecalho, j, str(coluna))
+    for j, coluna in enumerate(df.columns):
+        for i, valor in enumerate(df[coluna].tolist(), start=linha_cabecalho + 1):
+            if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+                continue
+            planilha.write(i, j, valor.item() if isinstance(valor, np.generic) else valor)
+    livro.save(caminho)
@@ -0,0 +1,159 @@
+# historico_precos.py
+"""
+Histórico local dos preços impressos em etiquetas, indexado por (Código, data).
+
+Cada execução grava o preço final de cada produto enviado às filiais. Antes das
+consultas, os produtos cujo preço final é igual ao último preço impresso (alterações
+desfeitas, reajustes que voltaram ao valor anterior) são descartados.
+
+Consulta rápida:
+    python historico_precos.py CODIGO [--ultimas N]
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from config import HISTORICO_PRECOS_PATH
+
+class HistoricoPrecos:
+    """Preços impressos por produto e dia (um preço final por dia)"""
+    def __init__(self, caminho=HISTORICO_PRECOS_PATH):
+        self._conexao = sqlite3.connect(caminho)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS precos_impressos (
+                codigo INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                preco REAL NOT NULL,
+                registrado_em TEXT NOT NULL,
+                PRIMARY KEY (codigo, data)
+            ) WITHOUT ROWID
+        """)
+        self._conexao.commit()
+
+    def ultimos_precos(self, codigos, ate=None):
+        """
+        Último preço impresso de cada código
+
+        Args:
+            codigos: Códigos dos produtos
+            ate: Considera apenas registros até esta data (AAAA-MM-DD), inclusive
+
+        Returns:
+            dict: {codigo: preco} para os códigos com histórico
+        """
+        codigos = list(dict.fromkeys(int(c) for c in codigos))
+        ate = ate or "9999-12-31"
+        precos = {}
+        # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+        for inicio in range(0, len(codigos), 500):
+            bloco = codigos[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(bloco))
+            cursor = self._conexao.execute(f"""
+                SELECT codigo, preco FROM precos_impressos AS p
+                WHERE codigo IN ({marcadores}) AND data = (
+                    SELECT MAX(data) FROM precos_impressos
+                    WHERE codigo = p.codigo AND data <= ?
+                )
+            """, (*bloco, ate))
+            precos.update(cursor)
+        return precos
+
+    def filtrar_alterados(self, df_produtos, data=None, recentes=None):
+        """
+        Mantém somente os produtos cujo preço final mudou desde a última etiqueta
+
+        Um código que aparece várias vezes no relatório (alterado mais de uma vez no
+        dia) fica com a última linha, que tem o preço final.
+
+        Args:
+            df_produtos: DataFrame com 'Código' e 'Preço'
+            data: Dia do relatório (AAAA-MM-DD); o histórico é considerado até ele
+            recentes: {codigo: preco} ainda não gravados que valem sobre o histórico
+                      (ex.: dias anteriores de uma recuperação de vários dias)
+
+        Returns:
+            DataFrame: Linhas a imprimir, na ordem do relatório
+        """
+        df = df_produtos.drop_duplicates("Código", keep="last")
+        ultimos = {**self.ultimos_precos(df["Código"], ate=data), **(recentes or {})}
+        if not ultimos:
+            return df
+        mascara = [
+            ultimos.get(int(codigo)) != round(float(preco), 2)
+            for codigo, preco in zip(df["Código"], df["Preço"])
+        ]
+        return df[mascara]
+
+    def registrar(self, pares, data=None):
+        """
+        Grava o preço final impresso no dia; uma nova execução no mesmo dia substitui o anterior
+
+        Args:
+            pares: Pares (codigo, preco) enviados com sucesso
+            data: Dia (AAAA-MM-DD); padrão hoje
+
+        Returns:
+            int: Quantidade de preços gravados
+        """
+        data = data or datetime.now().strftime("%Y-%m-%d")
+        agora = datetime.now().isoformat(timespec="seconds")
+        linhas = [(int(codigo), data, round(float(preco), 2), agora) for codigo, preco in pares]
+        self._conexao.executemany(
+            "INSERT OR REPLACE INTO precos_impressos (codigo, data, preco, registrado_em) VALUES (?, ?, ?, ?)",
+            linhas
+        )
+        self._conexao.commit()
+        return len(linhas)
+
+    def ultimas_alteracoes(self, codigo, n=10):
+        """
+        Últimas N alterações impressas de um produto, da mais recente para a mais antiga
+
+        Returns:
+            DataFrame: 'data', 'preco', 'preco_anterior' e 'variacao' (fração, ex. 0.05 = +5%)
+        """
+        return pd.read_sql_query("""
+            SELECT data, preco, preco_anterior,
+                   CASE WHEN preco_anterior > 0 THEN preco / preco_anterior - 1 END AS variacao
+            FROM (
+                SELECT data, preco, LAG(preco) OVER (ORDER BY data) AS preco_anterior
+                FROM precos_impressos WHERE codigo = ?
+            )
+            ORDER BY data DESC
+            LIMIT ?
+        """, self._conexao, params=(int(codigo), int(n)))
+
+    def precos_no_periodo(self, de, ate, codigos=None):
+        """
+        Preços impressos entre duas datas (AAAA-MM-DD), inclusive
+
+        Returns:
+            DataFrame: 'codigo', 'data' e 'preco'
+        """
+        consulta = "SELECT codigo, data, preco FROM precos_impressos WHERE data BETWEEN ? AND ?"
+        parametros = [de, ate]
+        if codigos is not None:
+            codigos = [int(c) for c in codigos]
+            consulta += f" AND codigo IN ({','.join('?' * len(codigos))})"
+            parametros += codigos
+        return pd.read_sql_query(consulta + " ORDER BY codigo, data", self._conexao, params=parametros)
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        if self._conexao:
+            self._conexao.close()
+            self._conexao = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta o histórico de preços impressos")
+    parser.add_argument("codigo", type=int)
+    parser.add_argument("--ultimas", type=int, default=10, help="Quantidade de alterações")
+    args = parser.parse_args()
+
+    historico = HistoricoPrecos()
+    try:
+        print(historico.ultimas_alteracoes(args.codigo, args.ultimas).to_string(index=False))
+    finally:
+        historico.fechar()
@@ -0,0 +1,250 @@
+# ingestao.py
+"""
+Leitura dos relatórios exportados pelo Trier.
+
+- Localiza a linha de cabeçalho pelo conteúdo, em vez de um número fixo de linha
+- Lê somente as colunas usadas pela automação
+- Converte para tipos compactos: códigos inteiros, preços float, filiais categóricas
+- Guarda o resultado em Parquet, identificado pelo hash do arquivo, para que
+  reexecuções e retomadas não precisem interpretar a planilha de novo; entradas
+  sem uso há mais de INGESTAO_CACHE_DIAS dias são apagadas na primeira leitura
+"""
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from config import INGESTAO_CACHE_DIR, INGESTAO_CACHE_DIAS
+
+# Colunas do relatório de alterações de preço e os nomes usados no restante do código
+COLUNAS_PRECOS = {
+    "Código": "Código",
+    "Descrição Produto": "Produto",
+    "Preço Venda Atual": "Preço",
+}
+COLUNA_CODIGO_ESTOQUE = "Cód."
+# O nome da filial fica duas colunas à direita de 'Cód.' na linha "Filial:"
+DESLOCAMENTO_NOME_FILIAL = 2
+LINHAS_BUSCA_CABECALHO = 50
+VERSAO_CACHE = 1
+# Pastas de cache já limpas neste processo
+_caches_limpos = set()
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Retorna o sha256 do conteúdo do arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def detectar_cabecalho(planilha, colunas, max_linhas=LINHAS_BUSCA_CABECALHO):
+    """
+    Encontra a linha de cabeçalho: a primeira que contém todas as colunas informadas
+
+    Args:
+        planilha: pd.ExcelFile já aberto
+        colunas: Nomes que precisam aparecer na linha (comparados sem espaços nas pontas)
+
+    Returns:
+        tuple: (índice da linha, lista com os nomes das células daquela linha)
+    """
+    topo = planilha.parse(header=None, nrows=max_linhas, dtype=object)
+    procuradas = set(colunas)
+    for indice, linha in topo.iterrows():
+        nomes = ["" if pd.isna(v) else str(v).strip() for v in linha]
+        if procuradas.issubset(nomes):
+            return indice, nomes
+    raise Exception(
+        f"❌ Cabeçalho com as colunas {sorted(procuradas)} não encontrado "
+        f"nas primeiras {max_linhas} linhas de {planilha.io}"
+    )
+
+def ler_relatorio_precos(caminho, usar_cache=True, diretorio_cache=None):
+    """
+    Lê o relatório de alterações de preço
+
+    Args:
+        diretorio_cache: Pasta do cache Parquet (padrão: INGESTAO_CACHE_DIR)
+
+    Returns:
+        DataFrame: colunas 'Código' (int32), 'Produto' (texto) e 'Preço' (float64)
+    """
+    return _com_cache("precos", caminho, _ler_precos, usar_cache, diretorio_cache)
+
+def ler_relatorio_estoque(caminho, usar_cache=True, diretorio_cache=None):
+    """
+    Lê o relatório de saldo em estoque agrupado por filial
+
+    Args:
+        diretorio_cache: Pasta do cache Parquet (padrão: INGESTAO_CACHE_DIR)
+
+    Returns:
+        DataFrame longo: 'filial' (categórica, na ordem do relatório, incluindo
+        filiais sem produtos) e 'Código' (int32)
+    """
+    return _com_cache("estoque", caminho, _ler_estoque, usar_cache, diretorio_cache)
+
+def concatenar_estoques(frames):
+    """Junta tabelas longas de vários relatórios mantendo a ordem das filiais"""
+    if len(frames) == 1:
+        return frames[0]
+    filiais = list(dict.fromkeys(f for df in frames for f in df["filial"].cat.categories))
+    df = pd.concat([df.astype({"filial": int}) for df in frames], ignore_index=True)
+    df["filial"] = pd.Categorical(df["filial"], categories=filiais)
+    return df.drop_duplicates(ignore_index=True)
+
+def interpretar_estoque(codigos, nomes):
+    """
+    Interpreta o relatório de estoque de forma vetorizada.
+
+    Cada linha "Filial:" na coluna 'Cód.' abre um bloco; o número da filial vem da
+    coluna de nomes ("F01 - ..." → 1). Os códigos do bloco vão até a primeira linha
+    com 'Cód.' vazio.
+
+    Args:
+        codigos: Série da coluna 'Cód.'
+        nomes: Série da coluna com o nome da filial
+
+    Returns:
+        DataFrame longo: 'filial' (categórica) e 'Código' (int32)
+    """
+    valores = pd.Series(codigos).astype("string").str.strip()
+    nomes = pd.Series(nomes, index=valores.index).astype("string").str.strip()
+
+    # Linhas marcadoras de filial e o número da filial ("F01 - ..." → 1)
+    marcador = valores.eq("Filial:").fillna(False).astype(bool)
+    numero_filial = pd.to_numeric(
+        nomes.where(marcador).str.split().str[0].str.replace("F", "", regex=False),
+        errors="coerce"
+    )
+    filial_valida = marcador & numero_filial.notna().astype(bool)
+
+    # Propaga a filial para as linhas seguintes e encerra o bloco na primeira linha vazia
+    bloco = filial_valida.cumsum()
+    filial = numero_filial.where(filial_valida).ffill()
+    vazio = (valores.isna() | valores.eq("") | valores.str.lower().eq("nan")).fillna(True).astype(bool)
+    encerrado = vazio.groupby(bloco).cummax()
+
+    codigo = pd.to_numeric(valores, errors="coerce")
+    coletar = (bloco > 0) & ~marcador & ~encerrado & codigo.notna().astype(bool)
+
+    filiais = list(dict.fromkeys(numero_filial[filial_valida].astype(int)))
+    return pd.DataFrame({
+        "filial": pd.Categorical(filial[coletar].astype(int), categories=filiais),
+        "Código": codigo[coletar].astype("int32"),
+    }).drop_duplicates(ignore_index=True)
+
+def _ler_precos(caminho):
+    with pd.ExcelFile(caminho) as planilha:
+        linha, nomes = detectar_cabecalho(planilha, COLUNAS_PRECOS)
+        df = planilha.parse(
+            header=linha,
+            usecols=[nomes.index(coluna) for coluna in COLUNAS_PRECOS],
+            dtype=object,
+        )
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns=COLUNAS_PRECOS)
+
+    codigo = pd.to_numeric(df["Código"], errors="coerce")
+    df = df[codigo.notna()]
+    return pd.DataFrame({
+        "Código": codigo[df.index].astype("int32"),
+        "Produto": df["Produto"].astype("string").str.strip(),
+        "Preço": pd.to_numeric(df["Preço"], errors="coerce").astype("float64"),
+    }).reset_index(drop=True)
+
+def _ler_estoque(caminho):
+    with pd.ExcelFile(caminho) as planilha:
+        linha, nomes = detectar_cabecalho(planilha, [COLUNA_CODIGO_ESTOQUE])
+        indice = nomes.index(COLUNA_CODIGO_ESTOQUE)
+        df = planilha.parse(
+            header=linha,
+            usecols=[indice, indice + DESLOCAMENTO_NOME_FILIAL],
+            dtype=object,
+        )
+    return interpretar_estoque(df.iloc[:, 0], df.iloc[:, 1])
+
+def limpar_cache(dias=INGESTAO_CACHE_DIAS, diretorio=INGESTAO_CACHE_DIR):
+    """
+    Apaga as entradas do cache de relatórios sem uso há mais de `dias` dias
+
+    Returns:
+        int: Quantidade de arquivos apagados
+    """
+    if not os.path.isdir(diretorio):
+        return 0
+    limite = time.time() - dias * 24 * 60 * 60
+    apagados = 0
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        try:
+            if os.path.isfile(caminho) and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                apagados += 1
+        except OSError as e:
+            print(f"⚠️ Não foi possível remover {caminho}: {e}")
+    if apagados:
+        print(f"🧹 {apagados} relatórios antigos removidos do cache.")
+    return apagados
+
+def _com_cache(tipo, caminho, ler, usar_cache, diretorio=None):
+    """Lê do Parquet correspondente ao hash do arquivo ou interpreta e grava o Parquet"""
+    if not usar_cache:
+        return ler(caminho)
+    diretorio = diretorio or INGESTAO_CACHE_DIR
+    if diretorio not in _caches_limpos:
+        _caches_limpos.add(diretorio)
+        limpar_cache(diretorio=diretorio)
+
+    destino = os.path.join(diretorio, f"{tipo}_v{VERSAO_CACHE}_{hash_arquivo(caminho)}.parquet")
+    if os.path.exists(destino):
+        try:
+            df = _ler_parquet(destino)
+            # Marca o uso, para a limpeza por idade manter as entradas ainda lidas
+            os.utime(destino)
+            print(f"⚡ {os.path.basename(caminho)} carregado do cache de relatórios.")
+            return df
+        except Exception as e:
+            print(f"⚠️ Cache de relatório ilegível, relendo a planilha: {e}")
+
+    df = ler(caminho)
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = f"{destino}.tmp"
+        _gravar_parquet(df, temporario)
+        os.replace(temporario, destino)
+    except Exception as e:
+        # Sem pyarrow o cache fica desativado, mas a leitura continua funcionando
+        print(f"⚠️ Não foi possível gravar o cache de relatórios: {e}")
+    return df
+
+def _gravar_parquet(df, caminho):
+    """
+    Grava o DataFrame em Parquet. O Parquet só preserva categorias de texto, então
+    as categorias de cada coluna categórica (inclusive as sem linhas, como filiais
+    sem produtos) vão nos metadados do arquivo.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    categorias = {
+        coluna: df[coluna].cat.categories.tolist()
+        for coluna in df.columns if isinstance(df[coluna].dtype, pd.CategoricalDtype)
+    }
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[b"categorias"] = json.dumps(categorias, default=int).encode()
+    pq.write_table(tabela.replace_schema_metadata(metadados), caminho)
+
+def _ler_parquet(caminho):
+    import pyarrow.parquet as pq
+
+    tabela = pq.read_table(caminho)
+    df = tabela.to_pandas()
+    categorias = json.loads((tabela.schema.metadata or {}).get(b"categorias", b"{}"))
+    for coluna, valores in categorias.items():
+        df[coluna] = pd.Categorical(df[coluna], categories=valores)
+    return df
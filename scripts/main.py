@@ -1,15 +1,30 @@
 # main.py
+import argparse
 import pandas as pd
 import time
 from datetime import datetime
 
 from config import *
-from file_utils import limpar_pasta_arquivos, encontrar_arquivo_mais_recente, salvar_dataframe_csv, ler_excel_com_cabecalho
-from scraper import TrierScraper
-from etiquetas import gerar_etiquetas_por_filial
+from file_utils import limpar_pasta_arquivos, encontrar_arquivo_mais_recente, salvar_dataframe_csv, ler_dataframe_csv, ler_relatorio_precos, ler_relatorios_precos_departamentos, ler_relatorios_estoque
+from scraper import TrierScraper, alinhar_resultados
+from cache_produtos import CacheProdutos
+from estado_execucao import EstadoExecucao, filtrar_alteracoes, pares_enviados
+from historico_precos import HistoricoPrecos
+from checkpoint import Checkpoint
+from pool_sessoes import extrair_dados_produtos_paralelo, baixar_relatorios_precos_departamentos, TarefaEstoque
+from trier_http import consultar_produtos_http
+from fluxo_etiquetas import executar_em_fluxo, conflitos_streaming
+from etiquetas import gerar_etiquetas_por_filial, produtos_por_filial
 from email_sender import enviar_email_com_pdfs
+from montagem_pdf import concatenar_pdfs
+from metricas import metricas
+from backfill import executar_backfill, datas_do_periodo, data_argumento
+import comandos
 
-def main():
+def main(retomar=False):
+    # Sem o mapa de emails o envio falharia só no fim; interrompe antes de abrir o Trier
+    load_email_map()
+    
     print("=" * 60)
     print("🚀 SISTEMA DE AUTOMAÇÃO - ALTERAÇÕES DE PREÇO")
     print("=" * 60)
@@ -21,26 +36,65 @@ def main():
     # Cria diretórios se não existirem
     os.makedirs(ARQUIVOS_DIR, exist_ok=True)
     
+    checkpoint = Checkpoint()
+    checkpoint.iniciar(retomar)
+    
+    # O streaming usa uma sessão e desenha as etiquetas por filial no próprio processo;
+    # com configurações que ele não atende, as etapas rodam separadas
+    streaming = PIPELINE_STREAMING
+    conflitos = conflitos_streaming() if streaming else []
+    if conflitos:
+        print(f"⚠️ PIPELINE_STREAMING ignorado: incompatível com {', '.join(conflitos)}. "
+              "Executando as etapas separadamente.")
+        streaming = False
+    
     scraper = None
+    cache = None
+    tarefa_estoque = None
+    estado = EstadoExecucao()
+    historico = HistoricoPrecos()
+    
+    def obter_scraper():
+        # O navegador só é aberto se alguma etapa do Trier precisar rodar
+        nonlocal scraper
+        if scraper is None:
+            scraper = TrierScraper(perfil="principal")
+            scraper.login()
+        return scraper
+    
     try:
         # === ETAPA 1: BAIXAR RELATÓRIOS ===
         print("\n" + "=" * 60)
         print("ETAPA 1: BAIXANDO RELATÓRIOS DO SISTEMA")
         print("=" * 60)
+        metricas.etapa("precos")
         
-        scraper = TrierScraper()
-        scraper.login()
-        
-        relatorio_pdf, arquivo_xls = scraper.baixar_relatorio_precos()
+        salvo = checkpoint.carregar("precos")
+        if salvo:
+            relatorio_pdf = salvo[0]["pdf"]
+            arquivos_xls = {nome[4:]: caminho for nome, caminho in salvo[0].items() if nome.startswith("xls_")}
+        else:
+            checkpoint.invalidar_a_partir("precos")
+            if len(TRIER_DEPARTAMENTOS) > 1:
+                # Um relatório por departamento, cada um em sua sessão; um único PDF vai no email
+                relatorios = baixar_relatorios_precos_departamentos(TRIER_DEPARTAMENTOS)
+                relatorio_pdf = concatenar_pdfs(
+                    [pdf for pdf, _ in relatorios.values()],
+                    os.path.join(ARQUIVOS_DIR, "alteracoes_departamentos.pdf")
+                )
+                arquivos_xls = {departamento: xls for departamento, (_, xls) in relatorios.items()}
+            else:
+                relatorio_pdf, arquivo_xls = obter_scraper().baixar_relatorio_precos()
+                arquivos_xls = {TRIER_DEPARTAMENTOS[0]: arquivo_xls}
+            checkpoint.salvar("precos", {
+                "pdf": relatorio_pdf, **{f"xls_{d}": caminho for d, caminho in arquivos_xls.items()}
+            })
         
-        # Processa o XLS baixado
-        df = pd.read_excel(arquivo_xls, header=7)
-        df.columns = df.columns.str.strip()
-        df = df.rename(columns={
-            'Código': 'Código',
-            'Descrição Produto': 'Produto',
-            'Preço Venda Atual': 'Preço'
-        }).dropna(subset=['Código'])
+        # Processa o XLS baixado (vários departamentos viram uma única lista de produtos)
+        if len(arquivos_xls) > 1:
+            df = ler_relatorios_precos_departamentos(arquivos_xls)
+        else:
+            df = ler_relatorio_precos(next(iter(arquivos_xls.values())))
         
         print(f"\n✅ {len(df)} produtos encontrados no relatório.")
         
@@ -48,35 +102,118 @@ def main():
             print("⚠️ Nenhum produto alterado encontrado. Encerrando...")
             return
         
+        # Vale o preço final de cada produto; em reexecuções no mesmo dia segue apenas
+        # com as alterações novas, e alterações desfeitas ou que voltaram ao último
+        # preço impresso não geram etiqueta
+        df = filtrar_alteracoes(df, estado, historico if HISTORICO_PRECOS_FILTRAR else None)
+        
+        if len(df) == 0:
+            print("⚠️ Nenhuma alteração nova desde a última execução. Encerrando...")
+            return
+        
+        # O relatório de estoque só depende dos códigos: em uma segunda sessão,
+        # a etapa 3 roda enquanto a etapa 2 consulta os produtos (se o limite de
+        # sessões comportar a sessão principal e a de estoque)
+        if ESTOQUE_SESSAO_PARALELA and MAX_SESSOES_TRIER >= 2 and not (checkpoint.carregar("produtos") and checkpoint.carregar("estoque")):
+            tarefa_estoque = TarefaEstoque(df['Código'])
+        
         # === ETAPA 2: EXTRAIR EAN E DESCRIÇÃO ===
         print("\n" + "=" * 60)
         print("ETAPA 2: EXTRAINDO EAN E DESCRIÇÃO COMPLETA")
         print("=" * 60)
+        metricas.etapa("produtos")
         
-        eans, descricoes = scraper.extrair_dados_produtos(df)
-        df['EAN'] = eans
-        df['Descrição Completa'] = descricoes
-        
-        # Salva CSV completo
-        arquivo_csv = salvar_dataframe_csv(df)
+        salvo = checkpoint.carregar("produtos")
+        if salvo:
+            df = estado.filtrar_novos(ler_dataframe_csv(salvo[0]["csv"]))
+        else:
+            checkpoint.invalidar_a_partir("produtos")
+            cache = CacheProdutos()
+            conhecidos = None
+            if PRODUTOS_BACKEND == "http":
+                # Consulta direta por HTTP; só o que faltar segue pelo navegador
+                conhecidos = consultar_produtos_http(df['Código'], cache=cache)
+            
+            if streaming:
+                # Com o estoque disponível (antes ou durante as consultas), as
+                # etiquetas são geradas enquanto as consultas estão em andamento
+                if tarefa_estoque:
+                    estoque = tarefa_estoque.futuro
+                else:
+                    estoque = obter_scraper().baixar_relatorios_estoque(df['Código'])
+                resultados, arquivos_etiquetas = executar_em_fluxo(
+                    df, obter_scraper().consultar_produtos_iter, estoque, SAIDA_DIR, cache=cache, conhecidos=conhecidos,
+                    filtro_estoque=lambda df_estoque: estado.filtrar_estoque(df, df_estoque)
+                )
+                arquivos_estoque = tarefa_estoque.resultado() if tarefa_estoque else estoque
+                eans, descricoes = alinhar_resultados(df, resultados)
+            elif MAX_SESSOES_TRIER > 1:
+                # A sessão principal é fechada e a sessão paralela de estoque conta no limite
+                if scraper:
+                    scraper.fechar()
+                    scraper = None
+                sessoes = max(1, MAX_SESSOES_TRIER - (1 if tarefa_estoque else 0))
+                resultados = extrair_dados_produtos_paralelo(df, cache=cache, max_sessoes=sessoes,
+                                                             conhecidos=conhecidos)
+                eans, descricoes = alinhar_resultados(df, resultados)
+            else:
+                resultados = obter_scraper().extrair_dados_produtos(df, cache=cache, conhecidos=conhecidos)
+                eans, descricoes = alinhar_resultados(df, resultados)
+            df['EAN'] = eans
+            df['Descrição Completa'] = descricoes
+            
+            # Salva CSV completo
+            arquivo_csv = salvar_dataframe_csv(df)
+            checkpoint.salvar("produtos", {"csv": arquivo_csv})
+            
+            if streaming:
+                # Etapas 3 e 4 já concluídas junto com as consultas
+                checkpoint.salvar("estoque", {
+                    f"estoque_{i:03d}": caminho for i, caminho in enumerate(arquivos_estoque)
+                })
+                checkpoint.salvar("etiquetas", {str(k): v for k, v in arquivos_etiquetas.items()})
         
         # === ETAPA 3: BAIXAR RELATÓRIO DE ESTOQUE ===
         print("\n" + "=" * 60)
         print("ETAPA 3: BAIXANDO RELATÓRIO DE ESTOQUE")
         print("=" * 60)
+        metricas.etapa("estoque")
+        
+        salvo = checkpoint.carregar("estoque")
+        if salvo:
+            arquivos_estoque = [salvo[0][nome] for nome in sorted(salvo[0])]
+        else:
+            checkpoint.invalidar_a_partir("estoque")
+            if tarefa_estoque:
+                print("⏳ Aguardando a sessão paralela de estoque...")
+                arquivos_estoque = tarefa_estoque.resultado()
+            else:
+                arquivos_estoque = obter_scraper().baixar_relatorios_estoque(df['Código'])
+            checkpoint.salvar("estoque", {
+                f"estoque_{i:03d}": caminho for i, caminho in enumerate(arquivos_estoque)
+            })
         
-        arquivo_estoque = scraper.baixar_relatorio_estoque(df['Código'])
-        scraper.fechar()
+        if scraper:
+            scraper.fechar()
+            scraper = None
         
-        # Processa estoque
-        df_estoque = ler_excel_com_cabecalho(arquivo_estoque)
+        # Processa estoque (blocos de vários relatórios são concatenados); as filiais
+        # que já receberam hoje a etiqueta de um produto nesse preço ficam de fora
+        df_estoque = estado.filtrar_estoque(df, ler_relatorios_estoque(arquivos_estoque))
         
         # === ETAPA 4: GERAR ETIQUETAS ===
         print("\n" + "=" * 60)
         print("ETAPA 4: GERANDO ETIQUETAS POR FILIAL")
         print("=" * 60)
+        metricas.etapa("etiquetas")
         
-        arquivos_etiquetas = gerar_etiquetas_por_filial(df, df_estoque, SAIDA_DIR)
+        salvo = checkpoint.carregar("etiquetas")
+        if salvo:
+            arquivos_etiquetas = {int(filial): caminho for filial, caminho in salvo[0].items()}
+        else:
+            checkpoint.invalidar_a_partir("etiquetas")
+            arquivos_etiquetas = gerar_etiquetas_por_filial(df, df_estoque, SAIDA_DIR)
+            checkpoint.salvar("etiquetas", {str(k): v for k, v in arquivos_etiquetas.items()})
         
         if not arquivos_etiquetas:
             print("⚠️ Nenhuma etiqueta foi gerada. Encerrando...")
@@ -89,21 +226,108 @@ def main():
         print("\n" + "=" * 60)
         print("ETAPA 5: ENVIANDO EMAILS")
         print("=" * 60)
+        metricas.etapa("envio")
+        
+        # Em uma retomada, reenvia apenas para as filiais que ainda não receberam
+        salvo = checkpoint.carregar("envio")
+        envio_anterior = salvo[1] if salvo else {"completo": False, "resultados": {}}
+        if envio_anterior["completo"]:
+            print("✅ Emails já enviados nesta execução. Nada a fazer.")
+            return
+        
+        ja_enviados = {
+            filial: resultado for filial, resultado in envio_anterior["resultados"].items()
+            if resultado["status"] == "enviado"
+        }
+        pendentes = {f: c for f, c in arquivos_etiquetas_str.items() if f not in ja_enviados}
+        resultados_envio = enviar_email_com_pdfs(relatorio_pdf, pendentes)
+        
+        # Registra o que foi tratado para reexecuções no mesmo dia
+        if resultados_envio:
+            resultados_envio.update(ja_enviados)
+            produtos_filiais = produtos_por_filial(df, df_estoque)
+            registrados = estado.registrar_execucao(df, produtos_filiais, resultados_envio)
+            print(f"🗂️ {registrados} alterações registradas como tratadas hoje.")
+            historico.registrar(pares_enviados(df, produtos_filiais, resultados_envio))
+            
+            checkpoint.salvar("envio", dados={
+                "completo": all(r["status"] != "erro" for r in resultados_envio.values()),
+                "resultados": resultados_envio,
+            })
         
-        enviar_email_com_pdfs(relatorio_pdf, arquivos_etiquetas_str)
-                
         print("\n" + "=" * 60)
         print("✅ PROCESSO CONCLUÍDO COM SUCESSO!")
         print("=" * 60)
-        
+    
     except Exception as e:
         print(f"\n❌ ERRO CRÍTICO: {e}")
         import traceback
         traceback.print_exc()
-        
+    
     finally:
+        if tarefa_estoque:
+            tarefa_estoque.cancelar()
         if scraper:
             scraper.fechar()
+        if cache:
+            cache.fechar()
+        estado.fechar()
+        historico.fechar()
+        try:
+            metricas.exportar()
+        except Exception as e:
+            print(f"⚠️ Não foi possível exportar as métricas: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Automação de alterações de preço")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma a última execução, pulando as etapas já concluídas no checkpoint")
+    parser.add_argument("--de", type=data_argumento, metavar="DATA",
+                        help="Recupera as alterações a partir desta data (DD/MM/AAAA ou AAAA-MM-DD)")
+    parser.add_argument("--ate", type=data_argumento, metavar="DATA",
+                        help="Último dia da recuperação (padrão: a data de --de)")
+    parser.add_argument("--agrupamento", choices=["por_dia", "consolidado"], default=BACKFILL_AGRUPAMENTO,
+                        help="Etiquetas e emails por dia ou um único conjunto para o período")
+
+    subcomandos = parser.add_subparsers(dest="comando", metavar="COMANDO",
+                                        help="Executa só uma etapa (sem comando: fluxo completo)")
+    fetch = subcomandos.add_parser("fetch", help="Baixa os relatórios de preço e de estoque para uma pasta")
+    fetch.add_argument("--data", type=data_argumento, help="Dia do relatório de preços (padrão: hoje)")
+    fetch.add_argument("--saida", help="Pasta dos relatórios")
+
+    enrich = subcomandos.add_parser("enrich", help="Consulta EAN e descrição e grava o CSV enriquecido")
+    enrich.add_argument("precos", nargs="+", metavar="PRECOS_XLS",
+                        help="XLS de preços (vários: precos_<departamento>.xls)")
+    enrich.add_argument("--saida", help="Caminho do CSV (padrão: pasta de arquivos)")
+
+    labels = subcomandos.add_parser("labels", help="Gera as etiquetas por filial sem navegador")
+    replay = subcomandos.add_parser("replay", help="Refaz leitura, etiquetas e envio simulado com arquivos salvos")
+    for subparser in (labels, replay):
+        subparser.add_argument("--produtos", required=True, metavar="CSV", help="CSV salvo pelo enrich/execução")
+        subparser.add_argument("--estoque", required=True, nargs="+", metavar="XLS", help="XLS de estoque")
+        subparser.add_argument("--saida", help="Pasta de saída")
+        subparser.add_argument("--modo", choices=["filial", "mestre"], default=ETIQUETAS_MODO)
+        subparser.add_argument("--imposicao", default=ETIQUETAS_IMPOSICAO,
+                               help="Modelo de página (a4, carta, rolo, personalizado) ou vazio")
+    replay.add_argument("--precos", required=True, nargs="+", metavar="XLS", help="XLS de preços")
+    replay.add_argument("--relatorio", metavar="PDF", help="Relatório de alterações anexado aos emails")
+    replay.add_argument("--sem-cache", action="store_true", help="Ignora o cache Parquet da ingestão")
+
+    send = subcomandos.add_parser("send", help="Envia o relatório e as etiquetas das filiais")
+    send.add_argument("--relatorio", required=True, metavar="PDF")
+    send.add_argument("--etiquetas", required=True, metavar="PASTA", help="Pasta com os etiquetas_FNN_*.pdf")
+    send.add_argument("--simular", metavar="PASTA", help="Grava os emails como .eml em vez de enviar")
+    args = parser.parse_args()
+    
+    if args.comando:
+        try:
+            getattr(comandos, f"comando_{args.comando}")(args)
+        finally:
+            metricas.exportar()
+    elif args.de:
+        try:
+            executar_backfill(datas_do_periodo(args.de, args.ate or args.de), args.agrupamento)
+        finally:
+            metricas.exportar()
+    else:
+        main(retomar=args.resume)
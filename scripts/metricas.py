@@ -0,0 +1,130 @@
+# metricas.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import METRICAS_DIR
+
+PERCENTIS = (0.5, 0.9, 0.99)
+NOME_METRICA = "alteracoes_preco_duracao_segundos"
+
+class Metricas:
+    """
+    Registro em memória das durações de etapas e interações da execução.
+    Exporta um relatório JSON e um textfile no formato do Prometheus.
+    """
+    def __init__(self):
+        self._amostras = {}
+        self._lock = threading.Lock()
+        self._etapa_atual = None
+        self.inicio = datetime.now()
+
+    def registrar(self, operacao, segundos, **rotulos):
+        """Adiciona uma amostra de duração para a operação"""
+        chave = (operacao, tuple(sorted((k, str(v)) for k, v in rotulos.items())))
+        with self._lock:
+            self._amostras.setdefault(chave, []).append(segundos)
+
+    @contextmanager
+    def medir(self, operacao, **rotulos):
+        """Mede a duração do bloco, mesmo que ele termine com exceção"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(operacao, time.perf_counter() - inicio, **rotulos)
+
+    def etapa(self, nome):
+        """Encerra a etapa em andamento (se houver) e começa a medir a próxima"""
+        self.finalizar_etapa()
+        self._etapa_atual = (nome, time.perf_counter())
+
+    def finalizar_etapa(self):
+        """Encerra a medição da etapa em andamento"""
+        if self._etapa_atual:
+            nome, inicio = self._etapa_atual
+            self.registrar("etapa", time.perf_counter() - inicio, etapa=nome)
+            self._etapa_atual = None
+
+    def resumo(self):
+        """Lista as séries com contagem, total e percentis"""
+        with self._lock:
+            series = [(chave, sorted(valores)) for chave, valores in self._amostras.items()]
+
+        linhas = []
+        for (operacao, rotulos), valores in sorted(series):
+            linhas.append({
+                "operacao": operacao,
+                "rotulos": dict(rotulos),
+                "contagem": len(valores),
+                "total": sum(valores),
+                "min": valores[0],
+                "max": valores[-1],
+                "percentis": {f"p{int(p * 100)}": _percentil(valores, p) for p in PERCENTIS},
+            })
+        return linhas
+
+    def exportar_json(self, caminho):
+        """Grava o relatório da execução em JSON"""
+        relatorio = {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "fim": datetime.now().isoformat(timespec="seconds"),
+            "series": self.resumo(),
+        }
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        return caminho
+
+    def exportar_prometheus(self, caminho):
+        """Grava um textfile (node_exporter) com um summary por série"""
+        linhas = [
+            f"# HELP {NOME_METRICA} Duração das etapas e interações da automação de preços",
+            f"# TYPE {NOME_METRICA} summary",
+        ]
+        for serie in self.resumo():
+            rotulos = {"operacao": serie["operacao"], **serie["rotulos"]}
+            for p in PERCENTIS:
+                valor = serie["percentis"][f"p{int(p * 100)}"]
+                linhas.append(f"{NOME_METRICA}{_rotulos({**rotulos, 'quantile': str(p)})} {valor:.6f}")
+            linhas.append(f"{NOME_METRICA}_sum{_rotulos(rotulos)} {serie['total']:.6f}")
+            linhas.append(f"{NOME_METRICA}_count{_rotulos(rotulos)} {serie['contagem']}")
+
+        # Escrita atômica para o coletor nunca ler um arquivo pela metade
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(temporario, caminho)
+        return caminho
+
+    def exportar(self, diretorio=METRICAS_DIR):
+        """Exporta JSON e Prometheus no diretório de métricas"""
+        self.finalizar_etapa()
+        os.makedirs(diretorio, exist_ok=True)
+        timestamp = self.inicio.strftime('%Y%m%d_%H%M%S')
+        caminho_json = self.exportar_json(os.path.join(diretorio, f"execucao_{timestamp}.json"))
+        caminho_prom = self.exportar_prometheus(os.path.join(diretorio, "alteracoes_preco.prom"))
+        print(f"📈 Métricas exportadas: {caminho_json}, {caminho_prom}")
+        return caminho_json, caminho_prom
+
+def _percentil(valores_ordenados, p):
+    """Percentil com interpolação linear sobre uma lista já ordenada"""
+    if len(valores_ordenados) == 1:
+        return valores_ordenados[0]
+    posicao = p * (len(valores_ordenados) - 1)
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fracao = posicao - inferior
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * fracao
+
+def _rotulos(rotulos):
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in rotulos.items())
+    return "{" + pares + "}"
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Registro global da execução
+metricas = Metricas()
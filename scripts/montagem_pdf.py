@@ -0,0 +1,118 @@
+# montagem_pdf.py
+import os
+
+import pikepdf
+from reportlab.lib.units import cm
+
+from config import ETIQUETAS_IMPOSICAO, ETIQUETAS_MODELO_PERSONALIZADO
+
+def montar_pdfs_por_pagina(caminho_mestre, paginas_por_arquivo):
+    """
+    Monta vários PDFs copiando páginas de um PDF mestre, sem renderizar de novo.
+    Recursos compartilhados (fontes, moldura, códigos de barras) são copiados uma
+    única vez por arquivo de saída.
+
+    Args:
+        caminho_mestre: PDF com todas as páginas já renderizadas
+        paginas_por_arquivo: Dict {caminho_saida: [índices das páginas no mestre]}
+
+    Returns:
+        list: Caminhos montados com sucesso
+    """
+    montados = []
+
+    with pikepdf.open(caminho_mestre) as mestre:
+        for caminho, indices in paginas_por_arquivo.items():
+            try:
+                with pikepdf.new() as destino:
+                    for indice in indices:
+                        destino.pages.append(mestre.pages[indice])
+                    destino.save(caminho)
+                montados.append(caminho)
+            except Exception as e:
+                print(f"❌ Erro ao montar {caminho}: {e}")
+
+    return montados
+
+def concatenar_pdfs(caminhos, destino):
+    """Junta vários PDFs, na ordem informada, em um único arquivo"""
+    with pikepdf.new() as saida:
+        for caminho in caminhos:
+            with pikepdf.open(caminho) as origem:
+                saida.pages.extend(origem.pages)
+        saida.save(destino)
+    return destino
+
+# Modelos de imposição em cm: página, grade de etiquetas, margens e espaçamentos.
+# As etiquetas mantêm o tamanho original; a grade precisa caber na página.
+MODELOS_IMPOSICAO = {
+    # A4 retrato, 2 × 9 etiquetas de 9 × 3 cm
+    "a4": {"pagina": (21.0, 29.7), "colunas": 2, "linhas": 9,
+           "margem_esq": 1.25, "margem_sup": 1.35, "espaco_h": 0.5, "espaco_v": 0.0},
+    # Carta retrato, 2 × 8 etiquetas
+    "carta": {"pagina": (21.59, 27.94), "colunas": 2, "linhas": 8,
+              "margem_esq": 1.55, "margem_sup": 1.57, "espaco_h": 0.5, "espaco_v": 0.1},
+    # Rolo contínuo de uma coluna, 10 etiquetas por página com 0,3 cm entre elas
+    "rolo": {"pagina": (9.0, 32.7), "colunas": 1, "linhas": 10,
+             "margem_esq": 0.0, "margem_sup": 0.0, "espaco_h": 0.0, "espaco_v": 0.3},
+}
+
+def modelo_imposicao(nome=ETIQUETAS_IMPOSICAO, personalizado=ETIQUETAS_MODELO_PERSONALIZADO):
+    """
+    Retorna o modelo de imposição pelo nome
+
+    Args:
+        nome: Chave de MODELOS_IMPOSICAO, "personalizado", ou vazio para uma etiqueta por página
+        personalizado: Para "personalizado", os valores em cm separados por vírgula:
+            largura_pagina,altura_pagina,colunas,linhas,margem_esq,margem_sup,espaco_h,espaco_v
+
+    Returns:
+        dict ou None
+    """
+    if not nome:
+        return None
+    if nome != "personalizado":
+        if nome not in MODELOS_IMPOSICAO:
+            raise ValueError(f"Modelo de imposição desconhecido: {nome}")
+        return MODELOS_IMPOSICAO[nome]
+
+    valores = [float(v) for v in personalizado.split(",")]
+    if len(valores) != 8:
+        raise ValueError("ETIQUETAS_MODELO_PERSONALIZADO precisa de 8 valores")
+    largura, altura, colunas, linhas, margem_esq, margem_sup, espaco_h, espaco_v = valores
+    return {"pagina": (largura, altura), "colunas": int(colunas), "linhas": int(linhas),
+            "margem_esq": margem_esq, "margem_sup": margem_sup, "espaco_h": espaco_h, "espaco_v": espaco_v}
+
+def posicoes_imposicao(modelo, largura, altura):
+    """
+    Calcula onde cada etiqueta fica na página, na ordem de leitura
+
+    Args:
+        modelo: Dict de MODELOS_IMPOSICAO
+        largura, altura: Tamanho da etiqueta em pontos
+
+    Returns:
+        tuple: ((largura_pagina, altura_pagina), [(x, y) do canto inferior esquerdo de cada etiqueta])
+    """
+    largura_pagina, altura_pagina = (v * cm for v in modelo["pagina"])
+    margem_esq, margem_sup = modelo["margem_esq"] * cm, modelo["margem_sup"] * cm
+    espaco_h, espaco_v = modelo["espaco_h"] * cm, modelo["espaco_v"] * cm
+
+    posicoes = [
+        (margem_esq + coluna * (largura + espaco_h),
+         altura_pagina - margem_sup - (linha + 1) * altura - linha * espaco_v)
+        for linha in range(modelo["linhas"]) for coluna in range(modelo["colunas"])
+    ]
+    # Tolerância de arredondamento das medidas em cm
+    if max(x for x, _ in posicoes) + largura > largura_pagina + 0.5 or min(y for _, y in posicoes) < -0.5:
+        raise ValueError(f"A grade de etiquetas do modelo não cabe na página: {modelo}")
+    return (largura_pagina, altura_pagina), posicoes
+
+def comprimir_pdf(caminho):
+    """Regrava o PDF no mesmo caminho com fluxos comprimidos e fluxos de objetos"""
+    temporario = f"{caminho}.tmp"
+    with pikepdf.open(caminho) as pdf:
+        pdf.save(temporario, compress_streams=True,
+                 object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    os.replace(temporario, caminho)
+    return caminho
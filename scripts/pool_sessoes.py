@@ -0,0 +1,193 @@
+# pool_sessoes.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
+
+from config import DOWNLOAD_DIR, MAX_SESSOES_TRIER, TRIER_DEPARTAMENTOS
+from scraper import TrierScraper
+from cache_produtos import resultados_conhecidos
+from metricas import metricas
+
+def extrair_dados_produtos_paralelo(df_produtos, cache=None, max_sessoes=MAX_SESSOES_TRIER, conhecidos=None):
+    """
+    Extrai EAN e descrição completa usando várias sessões do Trier em paralelo
+
+    Args:
+        df_produtos: DataFrame com a coluna 'Código'
+        cache: CacheProdutos opcional; somente os códigos ausentes são consultados
+        max_sessoes: Limite de sessões simultâneas abertas no Trier
+        conhecidos: Resultados já obtidos (cache e HTTP); quando informado, o cache não é relido
+
+    Returns:
+        dict: {codigo: (ean, descricao)}; códigos sem resultado ficam de fora
+    """
+    print("🔎 Iniciando extração paralela de EAN e Descrição Completa...")
+
+    codigos = list(dict.fromkeys(int(c) for c in df_produtos['Código']))
+    resultados = resultados_conhecidos(codigos, cache, conhecidos)
+    pendentes = [c for c in codigos if c not in resultados]
+    print(f"📦 {len(codigos)} códigos distintos: {len(resultados)} no cache, {len(pendentes)} a consultar.")
+
+    if pendentes:
+        n_sessoes = max(1, min(max_sessoes, len(pendentes)))
+        # Distribui os códigos de forma intercalada para equilibrar as sessões
+        lotes = [pendentes[i::n_sessoes] for i in range(n_sessoes)]
+        print(f"🧵 Abrindo {n_sessoes} sessões no Trier...")
+
+        novos = {}
+        with ThreadPoolExecutor(max_workers=n_sessoes) as executor:
+            futuros = {
+                executor.submit(_consultar_lote, indice, lote): indice
+                for indice, lote in enumerate(lotes)
+            }
+            for futuro in as_completed(futuros):
+                indice = futuros[futuro]
+                try:
+                    novos.update(futuro.result())
+                except Exception as e:
+                    print(f"⚠️ Sessão {indice} falhou: {e}")
+
+        resultados.update(novos)
+        if cache and novos:
+            cache.salvar_varios(novos)
+
+    if cache:
+        print(f"📊 {cache.resumo()}")
+
+    return resultados
+
+def _consultar_lote(indice, codigos):
+    """
+    Abre uma sessão própria do Trier e consulta um lote de códigos; se a sessão
+    cair no meio do lote, devolve o que já foi consultado
+    """
+    diretorio = os.path.join(DOWNLOAD_DIR, f"sessao_{indice}")
+    scraper = TrierScraper(download_dir=diretorio, perfil=f"sessao_{indice}")
+    resultados = {}
+    try:
+        scraper.login()
+        for codigo, dados in scraper.consultar_produtos_iter(codigos):
+            if dados is not None:
+                resultados[codigo] = dados
+    except Exception as e:
+        print(f"⚠️ Sessão {indice} falhou após {len(resultados)}/{len(codigos)} códigos: {e}")
+    finally:
+        scraper.fechar()
+    return resultados
+
+def baixar_relatorios_precos_departamentos(departamentos=TRIER_DEPARTAMENTOS, data=None,
+                                           max_sessoes=MAX_SESSOES_TRIER):
+    """
+    Baixa o relatório de alterações de preço de cada departamento em uma sessão
+    própria do Trier, com até max_sessoes sessões em paralelo
+
+    Args:
+        departamentos: Códigos dos departamentos
+        data: Dia das alterações; padrão hoje
+        max_sessoes: Limite de sessões simultâneas abertas no Trier
+
+    Returns:
+        dict: {departamento: (pdf, xls)} na ordem informada
+    """
+    departamentos = list(dict.fromkeys(str(d) for d in departamentos))
+    n_sessoes = max(1, min(len(departamentos), max_sessoes))
+    print(f"🧵 Baixando alterações de {len(departamentos)} departamentos em {n_sessoes} sessões paralelas...")
+
+    relatorios = {}
+    falhas = {}
+    with ThreadPoolExecutor(max_workers=n_sessoes, thread_name_prefix="departamento") as executor:
+        futuros = {
+            executor.submit(_baixar_precos_departamento, departamento, data): departamento
+            for departamento in departamentos
+        }
+        for futuro in as_completed(futuros):
+            departamento = futuros[futuro]
+            try:
+                relatorios[departamento] = futuro.result()
+                print(f"✅ Departamento {departamento} baixado.")
+            except Exception as e:
+                print(f"❌ Departamento {departamento} falhou: {e}")
+                falhas[departamento] = e
+
+    # Um departamento faltando deixaria etiquetas de fora sem aviso
+    if falhas:
+        raise Exception(f"❌ Falha ao baixar os departamentos {', '.join(falhas)}")
+    return {departamento: relatorios[departamento] for departamento in departamentos}
+
+def _baixar_precos_departamento(departamento, data):
+    """Abre uma sessão própria do Trier e baixa o relatório de um departamento"""
+    diretorio = os.path.join(DOWNLOAD_DIR, f"departamento_{departamento}")
+    with metricas.medir("sessao_departamento", departamento=departamento):
+        scraper = TrierScraper(download_dir=diretorio, perfil=f"departamento_{departamento}")
+        try:
+            scraper.login()
+            return scraper.baixar_relatorio_precos(data, departamento=departamento)
+        finally:
+            scraper.fechar()
+
+class TarefaEstoque:
+    """
+    Baixa o relatório de estoque em uma segunda sessão do Trier, com diretório de
+    download próprio, enquanto a sessão principal consulta os produtos.
+
+    O relatório só depende dos códigos da etapa 1. Erros da sessão de estoque são
+    relançados em resultado(); cancelar() interrompe a sessão e fecha o navegador.
+    """
+    def __init__(self, codigos, diretorio=os.path.join(DOWNLOAD_DIR, "sessao_estoque")):
+        self.diretorio = diretorio
+        self.cancelado = threading.Event()
+        self._scraper = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sessao-estoque")
+        self.futuro = self._executor.submit(self._executar, list(dict.fromkeys(int(c) for c in codigos)))
+        self._executor.shutdown(wait=False)
+
+    def _executar(self, codigos):
+        print(f"🧵 Sessão de estoque iniciada em paralelo ({len(codigos)} códigos).")
+        with metricas.medir("sessao_estoque"):
+            scraper = TrierScraper(download_dir=self.diretorio, perfil="estoque")
+            with self._lock:
+                self._scraper = scraper
+            try:
+                self._verificar_cancelamento()
+                scraper.login()
+                arquivos = scraper.baixar_relatorios_estoque(codigos, cancelar=self.cancelado)
+            except Exception:
+                if self.cancelado.is_set():
+                    raise CancelledError("Sessão de estoque cancelada.")
+                raise
+            finally:
+                self._fechar_navegador()
+        print(f"✅ Sessão de estoque concluída: {len(arquivos)} relatório(s).")
+        return arquivos
+
+    def resultado(self, timeout=None):
+        """
+        Aguarda a sessão de estoque
+
+        Returns:
+            list: Caminhos dos XLS de estoque
+        """
+        return self.futuro.result(timeout)
+
+    def cancelar(self):
+        """Interrompe a sessão: fechar o navegador faz a espera em andamento falhar"""
+        if self.futuro.done():
+            return
+        print("🛑 Cancelando a sessão de estoque...")
+        self.cancelado.set()
+        self.futuro.cancel()
+        self._fechar_navegador()
+
+    def _verificar_cancelamento(self):
+        if self.cancelado.is_set():
+            raise CancelledError("Sessão de estoque cancelada.")
+
+    def _fechar_navegador(self):
+        with self._lock:
+            scraper, self._scraper = self._scraper, None
+        if scraper:
+            try:
+                scraper.fechar()
+            except Exception as e:
+                print(f"⚠️ Erro ao fechar a sessão de estoque: {e}")
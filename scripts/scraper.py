@@ -1,27 +1,63 @@
 # scraper.py
 import time
+import json
+import heapq
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from concurrent.futures import CancelledError
 from datetime import datetime, timedelta
-import glob
 import os
 
 from config import *
 from file_utils import *
+from downloads import GerenciadorDownloads
+from esperas import Esperas, valor_diferente, valor_igual, pagina_carregada
+from cache_produtos import resultados_conhecidos
+from metricas import metricas
+
+# Recursos que a automação nunca usa; bloqueados para acelerar o carregamento das telas
+RECURSOS_BLOQUEADOS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp", "*.ico", "*.svg", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp3", "*.mp4", "*.webm",
+]
+ARQUIVO_SESSAO = "sessao_trier.json"
 
 class TrierScraper:
-    def __init__(self):
+    def __init__(self, download_dir=DOWNLOAD_DIR, perfil=None, login_url=LOGIN_URL):
+        """
+        Args:
+            download_dir: Pasta base dos downloads desta sessão
+            perfil: Nome do perfil persistente do Chrome (uma pasta por sessão
+                    simultânea); None usa um perfil temporário
+            login_url: Tela de login do Trier (o benchmark aponta para o Trier fake)
+        """
         self.navegador = None
-        self.wait = None
+        self.esperas = None
+        self.downloads = None
+        self.download_dir = download_dir
+        self.login_url = login_url
+        self.perfil_dir = os.path.join(CHROME_PERFIL_DIR, perfil) if perfil and SESSAO_PERSISTENTE else None
+        self._inicio = time.perf_counter()
+        self._primeiro_relatorio_registrado = False
+        os.makedirs(self.download_dir, exist_ok=True)
         self.setup_navegador()
     
     def setup_navegador(self):
         """Configura o navegador Chrome"""
+        inicio = time.perf_counter()
         chrome_options = webdriver.ChromeOptions()
+        # Libera a automação assim que o DOM está pronto, sem esperar imagens e estilos
+        chrome_options.page_load_strategy = "eager"
+        
+        if self.perfil_dir:
+            os.makedirs(self.perfil_dir, exist_ok=True)
+            _remover_travas_perfil(self.perfil_dir)
+            chrome_options.add_argument(f"--user-data-dir={self.perfil_dir}")
         
         if CHROME_OPTIONS["headless"]:
             chrome_options.add_argument("--headless")
@@ -36,7 +72,7 @@ class TrierScraper:
         chrome_options.add_argument("--unsafely-treat-insecure-origin-as-secure=http://drogcidade.ddns.net:4647/sgfpod1/Login.pod")
         
         prefs = {
-            "download.default_directory": DOWNLOAD_DIR,
+            "download.default_directory": self.download_dir,
             "download.prompt_for_download": False,
             "plugins.always_open_pdf_externally": True, # auto-downloads pdf files instead of opening in new window
             "download.open_pdf_in_system_reader": False,
@@ -44,201 +80,466 @@ class TrierScraper:
             "directory_upgrade": True,
             "safebrowsing.enabled": True,
         }
+        if CHROME_BLOQUEAR_RECURSOS:
+            prefs["profile.managed_default_content_settings.images"] = 2
         chrome_options.add_experimental_option("prefs", prefs)
         
         self.navegador = webdriver.Chrome(options=chrome_options)
-        self.wait = WebDriverWait(self.navegador, 30)
-    
-    def login(self):
-        """Realiza login no sistema"""
-        print("➡️ Acessando o sistema...")
-        self.navegador.get(LOGIN_URL)
+        self.esperas = Esperas(self.navegador)
+        self.downloads = GerenciadorDownloads(self.navegador, self.download_dir)
         
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="id_cod_usuario"]'))).send_keys(LOGIN_USUARIO)
-        print("✅ Usuário inserido.")
+        if CHROME_BLOQUEAR_RECURSOS:
+            self.navegador.execute_cdp_cmd("Network.enable", {})
+            self.navegador.execute_cdp_cmd("Network.setBlockedURLs", {"urls": RECURSOS_BLOQUEADOS})
         
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="nom_senha"]'))).send_keys(LOGIN_SENHA)
-        print("✅ Senha inserida.")
+        metricas.registrar("inicio_navegador", time.perf_counter() - inicio, perfil=bool(self.perfil_dir))
+    
+    def login(self):
+        """Realiza login no sistema, reaproveitando a sessão salva quando ainda é válida"""
+        inicio = time.perf_counter()
         
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="login"]'))).click()
-        print("🔐 Login realizado com sucesso.")
+        if self.restaurar_sessao():
+            print("♻️ Sessão anterior ainda válida, login dispensado.")
+            metricas.registrar("login", time.perf_counter() - inicio, sessao="reaproveitada")
+        else:
+            print("➡️ Acessando o sistema...")
+            self.navegador.get(self.login_url)
+            
+            self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="id_cod_usuario"]'))).send_keys(LOGIN_USUARIO)
+            print("✅ Usuário inserido.")
+            
+            self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="nom_senha"]'))).send_keys(LOGIN_SENHA)
+            print("✅ Senha inserida.")
+            
+            self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="login"]'))).click()
+            
+            # O menu principal só aparece depois do login aceito
+            self.esperas.ate(EC.presence_of_element_located((By.ID, "menuBar")))
+            print("🔐 Login realizado com sucesso.")
+            metricas.registrar("login", time.perf_counter() - inicio, sessao="nova")
+            self.salvar_sessao()
         
-        time.sleep(3)
         self.navegador.find_element(By.TAG_NAME, "body").send_keys(Keys.F11)
         print("🪟 Tela maximizada (F11).")
     
-    def baixar_relatorio_precos(self):
-        """Baixa relatório de preços em PDF e XLS"""
+    def salvar_sessao(self):
+        """Guarda os cookies e a página inicial do Trier no perfil persistente"""
+        if not self.perfil_dir:
+            return
+        sessao = {
+            "url": self.navegador.current_url,
+            "cookies": self.navegador.get_cookies(),
+            "salva_em": datetime.now().isoformat(timespec="seconds"),
+        }
+        caminho = os.path.join(self.perfil_dir, ARQUIVO_SESSAO)
+        with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+            json.dump(sessao, f)
+        os.replace(f"{caminho}.tmp", caminho)
+    
+    def restaurar_sessao(self):
+        """
+        Recoloca os cookies salvos e verifica se o Trier ainda aceita a sessão
+        
+        Returns:
+            bool: True se a página principal abriu sem pedir login
+        """
+        caminho = os.path.join(self.perfil_dir, ARQUIVO_SESSAO) if self.perfil_dir else None
+        if not caminho or not os.path.exists(caminho):
+            return False
+        
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                sessao = json.load(f)
+            
+            # Cookies só podem ser definidos com o navegador no domínio do Trier
+            self.navegador.get(self.login_url)
+            for cookie in sessao["cookies"]:
+                self.navegador.add_cookie(cookie)
+            self.navegador.get(sessao["url"])
+            
+            # A página mostra o menu (sessão válida) ou o formulário de login (expirada)
+            self.esperas.ate(EC.any_of(
+                EC.presence_of_element_located((By.ID, "menuBar")),
+                EC.presence_of_element_located((By.ID, "id_cod_usuario")),
+            ))
+            if self.navegador.find_elements(By.ID, "menuBar"):
+                return True
+            print("🔑 Sessão salva expirou; fazendo login.")
+        except Exception as e:
+            print(f"⚠️ Não foi possível reaproveitar a sessão salva: {e}")
+        
+        self.navegador.delete_all_cookies()
+        return False
+    
+    def baixar_relatorio_precos(self, data=None, departamento=None):
+        """
+        Baixa relatório de preços em PDF e XLS
+        
+        Args:
+            data: Dia das alterações (date/datetime); padrão hoje
+            departamento: Código do departamento; padrão o primeiro de TRIER_DEPARTAMENTOS
+        """
         print("📂 Acessando menu de relatórios...")
         
         # Navegação até o relatório
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[11]/a/span[2]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul123"]/li[7]/a/span'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul130"]/li[2]/a/span'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[11]/a/span[2]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul123"]/li[7]/a/span'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul130"]/li[2]/a/span'))).click()
         
         # Configura departamento
-        campo_departamento = self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_deptoEntrada"]')))
-        campo_departamento.send_keys('121')
+        departamento = str(departamento or TRIER_DEPARTAMENTOS[0])
+        campo_departamento = self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_deptoEntrada"]')))
+        campo_departamento.send_keys(Keys.CONTROL, 'a')
+        campo_departamento.send_keys(Keys.DELETE)
+        campo_departamento.send_keys(departamento)
         campo_departamento.send_keys(Keys.ENTER)
-        self.wait.until(EC.invisibility_of_element_located((By.ID, 'divLoading')))
-        time.sleep(0.5)
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="consid_depto_D"]'))).click()
+        print(f"🏬 Departamento {departamento}.")
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, 'divLoading')))
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="consid_depto_D"]'))).click()
         
         # Acessa aba de filtros
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_1"]/a'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_1"]/a'))).click()
         print("🧾 Aba de filtros acessada.")
         
-        # Define período (ontem)
-        data = (datetime.now()).strftime("%d/%m/%Y")
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="dat_init"]'))).send_keys(data)
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="dat_fim"]'))).send_keys(data)
+        # Define período (um único dia)
+        data = (data or datetime.now()).strftime("%d/%m/%Y")
+        for campo_id in ("dat_init", "dat_fim"):
+            campo_data = self.esperas.ate(EC.element_to_be_clickable((By.XPATH, f'//*[@id="{campo_id}"]')))
+            # Em relatórios seguidos na mesma sessão o campo pode manter a data anterior
+            campo_data.send_keys(Keys.CONTROL, 'a')
+            campo_data.send_keys(Keys.DELETE)
+            campo_data.send_keys(data)
         print(f"📅 Período definido: {data} a {data}")
         
         # Configura filtros
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ultima_alteracao"]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="sel_produ_alt_3"]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="sel_tipo_alt_preco_2"]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ultima_alteracao"]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="sel_produ_alt_3"]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="sel_tipo_alt_preco_2"]'))).click()
         
         # Baixa PDF
         print("📄 Gerando relatório em PDF...")
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
-        self.wait.until(EC.invisibility_of_element_located((By.ID, "divLoading")))
-        time.sleep(6)
+        destino_pdf = self.downloads.preparar("precos_pdf")
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
         
         # Aguarda download do PDF
         print("⏳ Aguardando download do PDF...")
-        time.sleep(5)
-        pdfs = glob.glob(os.path.join(DOWNLOAD_DIR, "*.pdf"))
-        if pdfs:
-            pdf_recente = max(pdfs, key=os.path.getctime)
-            print(f"💾 PDF baixado com sucesso: {pdf_recente}")
-            relatorio_pdf = pdf_recente
-        else:
-            raise Exception("❌ Nenhum PDF encontrado após download.")
+        relatorio_pdf = self.downloads.aguardar(destino_pdf, "pdf")
+        self._registrar_primeiro_relatorio()
+        print(f"💾 PDF baixado com sucesso: {relatorio_pdf}")
         
         # Fecha aba extra se necessário
         self.fechar_abas_extras()
         
         # Baixa XLS
         print("📊 Agora gerando relatório em planilha XLS...")
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="saida_4"]'))).click()
-        time.sleep(1)
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
-        self.wait.until(EC.invisibility_of_element_located((By.ID, "divLoading")))
-        time.sleep(8)
+        saida_xls = self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="saida_4"]')))
+        saida_xls.click()
+        self.esperas.ate(EC.element_to_be_selected(saida_xls))
+        destino_xls = self.downloads.preparar("precos_xls")
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
+        arquivo_xls = self.downloads.aguardar(destino_xls, "xls")
         
         self.fechar_abas_extras()
         
-        # Encontra arquivo XLS mais recente
-        arquivo_xls = encontrar_arquivo_mais_recente("xls")
-        if not arquivo_xls:
-            raise Exception("❌ Nenhum arquivo .xls encontrado após download.")
-        
         print(f"📄 Arquivo encontrado: {arquivo_xls}")
         return relatorio_pdf, arquivo_xls
     
-    def extrair_dados_produtos(self, df_produtos):
-        """Extrai EAN e descrição completa dos produtos"""
+    def extrair_dados_produtos(self, df_produtos, cache=None, conhecidos=None):
+        """
+        Extrai EAN e descrição completa dos produtos
+        
+        Args:
+            df_produtos: DataFrame com a coluna 'Código'
+            cache: CacheProdutos opcional; somente os códigos ausentes vão ao navegador
+            conhecidos: Resultados já obtidos (cache e HTTP); quando informado, o cache não é relido
+        
+        Returns:
+            dict: {codigo: (ean, descricao)}; códigos sem resultado ficam de fora
+                  (use alinhar_resultados para montar as colunas do DataFrame)
+        """
         print("🔎 Iniciando extração de EAN e Descrição Completa...")
         
+        # Remove códigos repetidos antes de qualquer consulta
+        codigos = list(dict.fromkeys(int(c) for c in df_produtos['Código']))
+        resultados = resultados_conhecidos(codigos, cache, conhecidos)
+        pendentes = [c for c in codigos if c not in resultados]
+        print(f"📦 {len(codigos)} códigos distintos: {len(resultados)} no cache, {len(pendentes)} a consultar.")
+        
+        if pendentes:
+            novos = self.consultar_produtos(pendentes)
+            resultados.update(novos)
+            if cache and novos:
+                cache.salvar_varios(novos)
+        
+        if cache:
+            print(f"📊 {cache.resumo()}")
+        
+        return resultados
+    
+    def consultar_produtos(self, codigos):
+        """
+        Consulta uma lista de códigos na tela de cadastro
+        
+        Returns:
+            dict: {codigo: (ean, descricao)} somente para os códigos consultados com sucesso
+        """
+        return {codigo: dados for codigo, dados in self.consultar_produtos_iter(codigos) if dados is not None}
+    
+    def consultar_produtos_iter(self, codigos, tentativas=CONSULTA_TENTATIVAS, espera_base=CONSULTA_ESPERA_BASE):
+        """
+        Consulta os códigos um a um, entregando cada resultado assim que fica pronto
+        
+        Um código que falha vai para uma fila de novas tentativas, processada depois
+        da primeira passada, com até `tentativas` consultas por código e espera
+        exponencial entre elas. A tela só é recarregada se a sessão parou de responder.
+        
+        Yields:
+            tuple: (codigo, (ean, descricao)) ou (codigo, None) quando todas as tentativas falham
+        """
         # Faz login novamente se necessário
         if not self.navegador:
             self.setup_navegador()
             self.login()
         
-        # Navega para tela de cadastro de produtos
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[1]/a/span[2]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul1"]/li[1]/a/span'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul77"]/li[1]/a/span'))).click()
-        self.wait.until(EC.invisibility_of_element_located((By.ID, 'divLoading')))
-        print("📂 Tela de cadastro de produtos aberta.\n")
-        
-        eans, descricoes = [], []
-        
-        for i, codigo in enumerate(df_produtos['Código']):
+        self.abrir_tela_cadastro()
+        
+        # Fila de novas tentativas: (liberado_em, ordem, codigo, tentativas_feitas)
+        fila = []
+        
+        def falhou(ordem, codigo, feitas):
+            if feitas >= tentativas:
+                print(f"❌ Código {codigo} sem resultado após {feitas} tentativa(s).")
+                return True
+            espera = espera_base * 2 ** (feitas - 1)
+            heapq.heappush(fila, (time.monotonic() + espera, ordem, codigo, feitas))
+            return False
+        
+        for i, codigo in enumerate(codigos):
+            codigo = int(codigo)
+            print(f"🔍 Processando código {i+1}/{len(codigos)}: {codigo}")
+            dados = self._tentar_consulta(codigo)
+            if dados is not None or falhou(i, codigo, 1):
+                yield codigo, dados
+        
+        if fila:
+            print(f"🔁 Nova passada para {len(fila)} código(s) com falha...")
+        while fila:
+            liberado_em, ordem, codigo, feitas = heapq.heappop(fila)
+            espera = liberado_em - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            print(f"🔍 Nova tentativa ({feitas + 1}/{tentativas}) do código {codigo}")
+            dados = self._tentar_consulta(codigo)
+            if dados is not None or falhou(ordem, codigo, feitas + 1):
+                yield codigo, dados
+    
+    def _tentar_consulta(self, codigo):
+        """
+        Consulta um código uma vez; falhas da consulta e da recuperação da sessão
+        viram None, para que a fila de novas tentativas siga com os demais códigos
+        
+        Returns:
+            tuple: (ean, descricao), ou None se a consulta falhou
+        """
+        try:
+            with metricas.medir("consulta_produto", backend="selenium"):
+                ean, desc_completa = self.consultar_produto(str(codigo))
+        except Exception as e:
+            tipo = "Timeout" if isinstance(e, TimeoutException) else "Erro"
+            print(f"⚠️ {tipo} no código {codigo}: {e}")
+            try:
+                self.recuperar_sessao()
+            except Exception as erro_recuperacao:
+                # Conta como uma tentativa do código; a próxima consulta tenta reabrir de novo
+                print(f"⚠️ Não foi possível recuperar a sessão: {erro_recuperacao}")
+            return None
+        
+        print(f"✅ Código {codigo} → EAN: {ean}, Desc: {desc_completa[:50]}...")
+        return ean, desc_completa
+    
+    def sessao_ativa(self):
+        """Verifica se a tela de cadastro ainda responde: sem carregamento travado e com o campo de código"""
+        if not self.navegador:
+            return False
+        try:
+            self.esperas.ate(EC.invisibility_of_element_located((By.ID, 'divLoading')),
+                             ponto="verificacao_sessao", timeout=ESPERA_TIMEOUT_MINIMO)
+            return any(campo.is_displayed() for campo in self.navegador.find_elements(By.ID, "cod_redbarraEntrada"))
+        except (TimeoutException, WebDriverException):
+            return False
+    
+    def recuperar_sessao(self):
+        """
+        Recarrega a tela de cadastro somente se a sessão estiver quebrada; se a
+        recarga não resolver (login expirado, navegador travado), reabre o navegador
+        """
+        if self.sessao_ativa():
+            return
+        
+        with metricas.medir("recuperacao_sessao"):
             try:
-                codigo_str = str(int(codigo))
-                print(f"🔍 Processando código {i+1}/{len(df_produtos)}: {codigo_str}")
-                
-                # Insere código
-                campo = self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_redbarraEntrada"]')))
-                campo.click()
-                campo.send_keys(Keys.CONTROL, 'a')
-                campo.send_keys(Keys.DELETE)
-                time.sleep(0.3)
-                campo.send_keys(codigo_str)
-                campo.send_keys(Keys.ENTER)
-                
-                # Aguarda carregamento
-                try:
-                    WebDriverWait(self.navegador, 30).until(EC.invisibility_of_element_located((By.ID, 'divLoading')))
-                except:
-                    print(f"⚠️ Timeout no código {codigo_str}. Recarregando...")
-                    self.recarregar_tela_cadastro()
-                    continue
-                
-                # Coleta dados
-                ean = self.navegador.find_element(By.XPATH, '//*[@id="cod_barra_principal"]').get_attribute("value")
-                desc_completa = self.navegador.find_element(By.XPATH, '//*[@id="nom_prodcomp"]').get_attribute("value")
-                
-                eans.append(ean)
-                descricoes.append(desc_completa)
-                print(f"✅ Código {codigo} → EAN: {ean}, Desc: {desc_completa[:50]}...")
-                
+                print("🔁 Sessão sem resposta. Recarregando a tela de cadastro...")
+                self.recarregar_tela_cadastro()
+                return
             except Exception as e:
-                print(f"⚠️ Erro ao processar código {codigo}: {e}")
-                eans.append("")
-                descricoes.append("")
-                continue
-        
-        return eans, descricoes
+                print(f"⚠️ A recarga não resolveu ({e}). Reabrindo o navegador...")
+            
+            try:
+                self.fechar()
+            except Exception:
+                # O navegador pode já ter morrido
+                pass
+            self.setup_navegador()
+            self.login()
+            self.abrir_tela_cadastro()
+    
+    def consultar_produto(self, codigo_str):
+        """
+        Consulta um código na tela de cadastro e retorna (ean, descricao)
+        
+        Raises:
+            TimeoutException: se a tela não mostrar os dados do código a tempo
+                              (a fila de novas tentativas trata a falha)
+        """
+        campo_ean = (By.ID, "cod_barra_principal")
+        campo_descricao = (By.ID, "nom_prodcomp")
+        
+        # Limpa os dados do produto anterior: o que aparecer depois vem desta consulta,
+        # mesmo quando EAN e descrição são iguais aos do anterior
+        self.navegador.execute_script(
+            "arguments[0].value = ''; arguments[1].value = '';",
+            self.navegador.find_element(*campo_ean), self.navegador.find_element(*campo_descricao)
+        )
+        
+        # Insere código
+        campo = self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_redbarraEntrada"]')))
+        campo.click()
+        campo.send_keys(Keys.CONTROL, 'a')
+        campo.send_keys(Keys.DELETE)
+        self.esperas.ate(valor_igual((By.ID, "cod_redbarraEntrada"), ""))
+        campo.send_keys(codigo_str)
+        campo.send_keys(Keys.ENTER)
+        
+        # Aguarda o carregamento e o preenchimento dos dados na tela
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, 'divLoading')), ponto="consulta_carregamento")
+        try:
+            self.esperas.ate(EC.any_of(
+                valor_diferente(campo_descricao, ""),
+                valor_diferente(campo_ean, ""),
+            ), ponto="consulta_valores")
+        except TimeoutException:
+            raise TimeoutException(f"Dados do código {codigo_str} não carregados na tela de cadastro")
+        
+        # Coleta dados
+        ean = self.navegador.find_element(*campo_ean).get_attribute("value")
+        desc_completa = self.navegador.find_element(*campo_descricao).get_attribute("value")
+        return ean, desc_completa
     
     def baixar_relatorio_estoque(self, codigos):
         """Baixa relatório de estoque por filial"""
         print("📦 Baixando relatório de SALDO EM ESTOQUE por filial...")
         
         # Navega para relatório de estoque
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[11]/a/span[2]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul123"]/li[4]/a/span'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul127"]/li[1]/a/span'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[11]/a/span[2]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul123"]/li[4]/a/span'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul127"]/li[1]/a/span'))).click()
         
         # Configura agrupamento por filial
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="agrup_fil_2"]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="agrup_fil_2"]'))).click()
         
         # Acessa aba de filtros
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_1"]/a'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_1"]/a'))).click()
         
         # Insere códigos dos produtos
-        campo_codigo = self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_reduzidoEntrada"]')))
-        for codigo in codigos:
-            campo_codigo.send_keys(str(int(codigo)))
-            campo_codigo.send_keys(Keys.ENTER)
-            self.wait.until(EC.invisibility_of_element_located((By.ID, "divLoading")))
-            time.sleep(0.2)
+        campo_codigo = self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="cod_reduzidoEntrada"]')))
+        self.inserir_codigos(campo_codigo, codigos)
         
         # Configura para baixar XLS
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_3"]/a'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="saida_4"]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
-        self.wait.until(EC.invisibility_of_element_located((By.ID, "divLoading")))
-        time.sleep(6)
-        
-        # Encontra arquivo baixado
-        estoque_xls = encontrar_arquivo_mais_recente("xls")
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="tabTabdhtmlgoodies_tabView1_3"]/a'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="saida_4"]'))).click()
+        destino = self.downloads.preparar("estoque_xls")
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="runReport"]'))).click()
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
+        
+        # Aguarda o arquivo deste pedido
+        estoque_xls = self.downloads.aguardar(destino, "xls")
+        self._registrar_primeiro_relatorio()
         print(f"📄 XLS de estoque encontrado: {estoque_xls}")
         return estoque_xls
     
+    def baixar_relatorios_estoque(self, codigos, codigos_por_relatorio=ESTOQUE_CODIGOS_POR_RELATORIO, cancelar=None):
+        """
+        Baixa o relatório de estoque dividindo os códigos em blocos
+        
+        Args:
+            cancelar: threading.Event opcional, verificado antes de cada bloco
+        
+        Returns:
+            list: Caminhos dos XLS baixados (um por bloco)
+        """
+        codigos = list(dict.fromkeys(int(c) for c in codigos))
+        tamanho = codigos_por_relatorio or len(codigos) or 1
+        blocos = [codigos[i:i + tamanho] for i in range(0, len(codigos), tamanho)]
+        
+        arquivos = []
+        for i, bloco in enumerate(blocos, start=1):
+            if cancelar is not None and cancelar.is_set():
+                raise CancelledError("Download do estoque cancelado.")
+            if len(blocos) > 1:
+                print(f"📦 Relatório de estoque {i}/{len(blocos)} ({len(bloco)} códigos)")
+            arquivos.append(self.baixar_relatorio_estoque(bloco))
+        return arquivos
+    
+    def inserir_codigos(self, campo_codigo, codigos, modo=ESTOQUE_MODO_ENTRADA):
+        """Insere os códigos no filtro do relatório conforme o modo configurado"""
+        codigos = [str(int(c)) for c in codigos]
+        inicio = time.perf_counter()
+        
+        if modo == "lote":
+            # Digita a lista inteira e confirma uma única vez
+            campo_codigo.send_keys(ESTOQUE_SEPARADOR_LOTE.join(codigos))
+            campo_codigo.send_keys(Keys.ENTER)
+            self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
+        elif modo == "js":
+            # Atribui a lista direto no campo, sem simular cada tecla
+            self.navegador.execute_script(
+                "arguments[0].value = arguments[1];"
+                "arguments[0].dispatchEvent(new Event('change', {bubbles: true}));",
+                campo_codigo, ESTOQUE_SEPARADOR_LOTE.join(codigos)
+            )
+            campo_codigo.send_keys(Keys.ENTER)
+            self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
+        else:
+            for codigo in codigos:
+                with metricas.medir("entrada_codigo"):
+                    campo_codigo.send_keys(codigo)
+                    campo_codigo.send_keys(Keys.ENTER)
+                    self.esperas.ate(EC.invisibility_of_element_located((By.ID, "divLoading")))
+                    # O Trier limpa o campo quando aceita o código
+                    self.esperas.ate(valor_igual((By.ID, "cod_reduzidoEntrada"), ""))
+        
+        metricas.registrar("entrada_codigos_relatorio", time.perf_counter() - inicio, modo=modo)
+        print(f"🔢 {len(codigos)} códigos inseridos (modo {modo}).")
+    
     def recarregar_tela_cadastro(self):
         """Recarrega a tela de cadastro de produtos"""
         self.navegador.refresh()
-        time.sleep(5)
+        self.esperas.ate(pagina_carregada)
+        self.esperas.ate(EC.presence_of_element_located((By.ID, "menuBar")))
         
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[1]/a/span[2]'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul1"]/li[1]/a/span'))).click()
-        self.wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul77"]/li[1]/a/span'))).click()
-        self.wait.until(EC.invisibility_of_element_located((By.ID, 'divLoading')))
+        self.abrir_tela_cadastro()
         print("🔁 Tela recarregada. Retomando processo...")
     
+    def abrir_tela_cadastro(self):
+        """Navega até a tela de cadastro de produtos"""
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="menuBar"]/li[1]/a/span[2]'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul1"]/li[1]/a/span'))).click()
+        self.esperas.ate(EC.element_to_be_clickable((By.XPATH, '//*[@id="ul77"]/li[1]/a/span'))).click()
+        self.esperas.ate(EC.invisibility_of_element_located((By.ID, 'divLoading')))
+        print("📂 Tela de cadastro de produtos aberta.\n")
+    
     def fechar_abas_extras(self):
         """Fecha abas extras abertas pelo sistema"""
         janelas = self.navegador.window_handles
@@ -248,8 +549,38 @@ class TrierScraper:
             self.navegador.switch_to.window(janelas[0])
             print("🪟 Aba extra fechada.")
     
+    def _registrar_primeiro_relatorio(self):
+        """Mede o tempo entre abrir o navegador e concluir o primeiro relatório da sessão"""
+        if not self._primeiro_relatorio_registrado:
+            self._primeiro_relatorio_registrado = True
+            segundos = time.perf_counter() - self._inicio
+            metricas.registrar("inicio_ate_primeiro_relatorio", segundos)
+            print(f"⏱️ Do início do navegador ao primeiro relatório: {segundos:.1f} s")
+    
     def fechar(self):
         """Fecha o navegador"""
+        if self.downloads:
+            self.downloads.fechar()
         if self.navegador:
-            self.navegador.quit()
+            navegador, self.navegador = self.navegador, None
+            navegador.quit()
             print("🧹 Navegador encerrado.\n")
+
+def _remover_travas_perfil(perfil_dir):
+    """
+    Remove as travas de um perfil restaurado do cache: o Chrome se recusa a abrir
+    um perfil que parece em uso por outra máquina
+    """
+    for nome in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+        caminho = os.path.join(perfil_dir, nome)
+        if os.path.lexists(caminho):
+            os.remove(caminho)
+
+def alinhar_resultados(df_produtos, resultados):
+    """
+    Converte {codigo: (ean, descricao)} em listas alinhadas com as linhas do DataFrame.
+    Códigos sem resultado ficam em branco, sem desalinhar as linhas.
+    """
+    eans = [resultados.get(int(c), ("", ""))[0] for c in df_produtos['Código']]
+    descricoes = [resultados.get(int(c), ("", ""))[1] for c in df_produtos['Código']]
+    return eans, descricoes
@@ -0,0 +1,183 @@
+# trier_http.py
+"""
+Backend HTTP opcional (PRODUTOS_BACKEND=http) para a consulta de EAN e descrição.
+
+Contrato com o Trier e de onde cada parte vem:
+- Login: GET e POST em LOGIN_URL com os campos cod_usuario e nom_senha; são os
+  inputs id_cod_usuario/nom_senha da tela de login real usados pelo TrierScraper.
+  A sessão fica no cookie devolvido pelo servidor.
+- Sessão expirada: qualquer resposta 401/403 ou que termine (inclusive depois de
+  um redirecionamento) na página com o input id_cod_usuario; é o mesmo sinal que o
+  TrierScraper usa em restaurar_sessao.
+- Produto: GET em TRIER_PRODUTO_URL com o parâmetro cod_redbarra, lendo o value dos
+  inputs cod_barra_principal e nom_prodcomp. Os ids são os da tela de cadastro real;
+  a URL e o nome do parâmetro NÃO foram confirmados no Trier de produção (não há
+  documentação da API) e precisam ser conferidos no DevTools antes de ligar o
+  backend. Por isso TRIER_PRODUTO_URL não tem valor padrão.
+
+O fake_trier implementa esse mesmo contrato: os testes contra ele validam o
+cliente (sessão, concorrência, novo login, queda para o Selenium), não o Trier real.
+Qualquer falha do backend deixa os códigos para o caminho Selenium.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (LOGIN_URL, LOGIN_USUARIO, LOGIN_SENHA, TRIER_PRODUTO_URL,
+                    TRIER_HTTP_CONEXOES, TRIER_HTTP_TIMEOUT)
+from metricas import metricas
+
+# Nomes dos campos enviados ao Trier (mesmos ids usados pelo TrierScraper)
+CAMPO_USUARIO = "cod_usuario"
+CAMPO_SENHA = "nom_senha"
+PARAMETRO_CODIGO = "cod_redbarra"
+
+class _LeitorCampos(HTMLParser):
+    """Coleta o atributo value dos inputs de interesse de uma página do Trier"""
+    def __init__(self, ids):
+        super().__init__()
+        self.ids = set(ids)
+        self.valores = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "input":
+            return
+        attrs = dict(attrs)
+        if attrs.get("id") in self.ids:
+            self.valores[attrs["id"]] = attrs.get("value") or ""
+
+def extrair_campos(html, ids):
+    """Retorna {id: value} dos inputs encontrados no HTML"""
+    leitor = _LeitorCampos(ids)
+    leitor.feed(html)
+    return leitor.valores
+
+class TrierHttpClient:
+    """
+    Consulta produtos diretamente por HTTP, sem navegador.
+    Faz login uma única vez e reaproveita as conexões (keep-alive) da sessão.
+    Se a sessão expirar, só uma thread refaz o login; as demais aguardam e repetem a consulta.
+    """
+    def __init__(self, login_url=LOGIN_URL, produto_url=TRIER_PRODUTO_URL,
+                 usuario=LOGIN_USUARIO, senha=LOGIN_SENHA,
+                 max_conexoes=TRIER_HTTP_CONEXOES, timeout=TRIER_HTTP_TIMEOUT):
+        if not produto_url:
+            raise ValueError("TRIER_PRODUTO_URL não configurada para o backend HTTP.")
+        self.login_url = login_url
+        self.produto_url = produto_url
+        self.usuario = usuario
+        self.senha = senha
+        self.max_conexoes = max_conexoes
+        self.timeout = timeout
+        self._lock_login = threading.Lock()
+        self._logins = 0
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+
+    def login(self):
+        """Realiza login e mantém o cookie de sessão"""
+        self.sessao.get(self.login_url, timeout=self.timeout)
+        resposta = self.sessao.post(
+            self.login_url,
+            data={CAMPO_USUARIO: self.usuario, CAMPO_SENHA: self.senha},
+            timeout=self.timeout
+        )
+        resposta.raise_for_status()
+        if self._pagina_de_login(resposta):
+            raise Exception("❌ Login HTTP recusado pelo Trier.")
+        self._logins += 1
+        print("🔐 Login HTTP realizado com sucesso.")
+
+    def consultar_produto(self, codigo):
+        """Consulta um código e retorna (ean, descricao)"""
+        logins = self._logins
+        resposta = self._buscar(codigo)
+        if self._pagina_de_login(resposta):
+            # Sessão expirou: faz login de novo e repete uma vez
+            self._renovar_login(logins)
+            resposta = self._buscar(codigo)
+        resposta.raise_for_status()
+
+        campos = extrair_campos(resposta.text, ("cod_barra_principal", "nom_prodcomp"))
+        if "nom_prodcomp" not in campos:
+            raise Exception(f"Produto {codigo} não encontrado na resposta do Trier.")
+        return campos.get("cod_barra_principal", ""), campos["nom_prodcomp"]
+
+    def consultar_produtos(self, codigos, max_workers=None):
+        """
+        Consulta vários códigos em paralelo sobre a mesma sessão
+
+        Returns:
+            dict: {codigo: (ean, descricao)} somente para os códigos consultados com sucesso
+        """
+        max_workers = max_workers or self.max_conexoes
+        resultados = {}
+
+        def consultar(codigo):
+            try:
+                with metricas.medir("consulta_produto", backend="http"):
+                    return codigo, self.consultar_produto(int(codigo))
+            except Exception as e:
+                print(f"⚠️ Erro HTTP no código {codigo}: {e}")
+                return codigo, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for codigo, dados in executor.map(consultar, codigos):
+                if dados is not None:
+                    resultados[int(codigo)] = dados
+        return resultados
+
+    def fechar(self):
+        """Encerra a sessão HTTP"""
+        self.sessao.close()
+
+    def _renovar_login(self, logins_vistos):
+        # Outra thread pode já ter refeito o login depois que esta consulta começou
+        with self._lock_login:
+            if self._logins == logins_vistos:
+                self.login()
+
+    def _buscar(self, codigo):
+        return self.sessao.get(self.produto_url, params={PARAMETRO_CODIGO: codigo}, timeout=self.timeout)
+
+    def _pagina_de_login(self, resposta):
+        return resposta.status_code in (401, 403) or 'id="id_cod_usuario"' in resposta.text
+
+def consultar_produtos_http(codigos, cache=None):
+    """
+    Consulta via HTTP os códigos que não estão no cache e grava os resultados nele.
+    Falhas são apenas registradas; esses códigos seguem para o caminho Selenium.
+
+    Returns:
+        dict: {codigo: (ean, descricao)} do cache e do HTTP; passe-o como `conhecidos`
+              para a etapa Selenium, que consulta somente os que faltarem
+    """
+    codigos = list(dict.fromkeys(int(c) for c in codigos))
+    em_cache = cache.obter_varios(codigos) if cache else {}
+    codigos = [c for c in codigos if c not in em_cache]
+    if not codigos:
+        return em_cache
+
+    print(f"🌐 Consultando {len(codigos)} códigos via HTTP...")
+    cliente = None
+    try:
+        cliente = TrierHttpClient()
+        cliente.login()
+        resultados = cliente.consultar_produtos(codigos)
+    except Exception as e:
+        print(f"⚠️ Backend HTTP indisponível, usando Selenium: {e}")
+        return em_cache
+    finally:
+        if cliente:
+            cliente.fechar()
+
+    print(f"✅ {len(resultados)}/{len(codigos)} códigos obtidos via HTTP.")
+    if cache and resultados:
+        cache.salvar_varios(resultados)
+    return {**em_cache, **resultados}
@@ -0,0 +1,11 @@
+# conftest.py
+"""
+Os módulos de scripts/ se importam pelo nome (from config import ...) e o config
+cria as pastas de trabalho no diretório atual; os testes rodam em uma pasta temporária.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+os.chdir(tempfile.mkdtemp(prefix="alteracoes_preco_testes_"))
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from checkpoint import Checkpoint
+
+@pytest.fixture
+def diretorio(tmp_path):
+    return str(tmp_path / "checkpoint")
+
+@pytest.fixture
+def csv(tmp_path):
+    caminho = tmp_path / "produtos.csv"
+    caminho.write_text("Código;Preço\n10;5.0\n", encoding="utf-8")
+    return str(caminho)
+
+def _concluir_etapas(diretorio, csv):
+    checkpoint = Checkpoint(diretorio)
+    checkpoint.iniciar()
+    checkpoint.salvar("precos", dados={"total": 1})
+    copias = checkpoint.salvar("produtos", {"csv": csv})
+    checkpoint.salvar("estoque", {"estoque_000": csv})
+    return copias
+
+def test_retomada_recupera_etapas_com_hash_valido(diretorio, csv):
+    copias = _concluir_etapas(diretorio, csv)
+
+    checkpoint = Checkpoint(diretorio)
+    checkpoint.iniciar(retomar=True)
+
+    assert checkpoint.carregar("precos") == ({}, {"total": 1})
+    assert checkpoint.carregar("produtos") == (copias, {})
+    assert checkpoint.carregar("etiquetas") is None
+
+def test_artefato_alterado_refaz_a_etapa(diretorio, csv):
+    copias = _concluir_etapas(diretorio, csv)
+    with open(copias["csv"], "a", encoding="utf-8") as f:
+        f.write("20;7.5\n")
+
+    checkpoint = Checkpoint(diretorio)
+    checkpoint.iniciar(retomar=True)
+
+    assert checkpoint.carregar("produtos") is None
+    assert checkpoint.carregar("estoque") is not None
+
+def test_invalidar_descarta_etapas_seguintes(diretorio, csv):
+    _concluir_etapas(diretorio, csv)
+    checkpoint = Checkpoint(diretorio)
+    checkpoint.iniciar(retomar=True)
+
+    checkpoint.invalidar_a_partir("produtos")
+    retomado = Checkpoint(diretorio)
+    retomado.iniciar(retomar=True)
+
+    assert retomado.carregar("precos") is not None
+    assert retomado.carregar("produtos") is None
+    assert retomado.carregar("estoque") is None
+
+def test_checkpoint_de_outro_dia_e_descartado(diretorio, csv):
+    _concluir_etapas(diretorio, csv)
+    manifesto = f"{diretorio}/manifesto.json"
+    with open(manifesto, encoding="utf-8") as f:
+        dados = json.load(f)
+    dados["criado_em"] = "2000-01-01T08:00:00"
+    with open(manifesto, "w", encoding="utf-8") as f:
+        json.dump(dados, f)
+
+    checkpoint = Checkpoint(diretorio)
+    checkpoint.iniciar(retomar=True)
+
+    assert checkpoint.manifesto["etapas"] == {}
+    assert checkpoint.carregar("precos") is None
+    assert checkpoint.manifesto["criado_em"][:10] != "2000-01-01"
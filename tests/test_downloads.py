@@ -0,0 +1,78 @@
+import json
+import queue
+import threading
+
+import pytest
+
+from downloads import GerenciadorDownloads, EventosDownload
+
+class ConexaoFake:
+    """Imita o websocket de depuração: responde aos comandos e entrega os eventos enfileirados"""
+    def __init__(self):
+        self.mensagens = queue.Queue()
+        self.comandos = []
+
+    def send(self, texto):
+        comando = json.loads(texto)
+        self.comandos.append(comando)
+        self.mensagens.put({"id": comando["id"], "result": {}})
+
+    def recv(self):
+        mensagem = self.mensagens.get()
+        if mensagem is None:
+            raise ConnectionError("conexão encerrada")
+        return json.dumps(mensagem)
+
+    def evento(self, metodo, **parametros):
+        self.mensagens.put({"method": metodo, "params": parametros})
+
+    def close(self):
+        self.mensagens.put(None)
+
+@pytest.fixture
+def conexao():
+    return ConexaoFake()
+
+@pytest.fixture
+def downloads(conexao, tmp_path):
+    gerenciador = GerenciadorDownloads(None, str(tmp_path), timeout=5, eventos=EventosDownload(conexao))
+    yield gerenciador
+    gerenciador.fechar()
+
+def test_conclusao_pelo_evento(downloads, conexao):
+    destino = downloads.preparar("precos_pdf")
+    assert conexao.comandos[-1]["params"] == {"behavior": "allow", "downloadPath": destino, "eventsEnabled": True}
+
+    conexao.evento("Browser.downloadWillBegin", guid="a", suggestedFilename="relatorio.pdf")
+    conexao.evento("Browser.downloadProgress", guid="a", state="inProgress", receivedBytes=10)
+    threading.Timer(0.1, conexao.evento, ["Browser.downloadProgress"],
+                    {"guid": "a", "state": "completed", "filePath": f"{destino}/relatorio.pdf"}).start()
+
+    assert downloads.aguardar(destino, "pdf") == f"{destino}/relatorio.pdf"
+
+def test_download_de_outra_pasta_nao_conta(downloads, conexao):
+    primeiro = downloads.preparar("precos_pdf")
+    conexao.evento("Browser.downloadWillBegin", guid="a", suggestedFilename="relatorio.pdf")
+    segundo = downloads.preparar("precos_xls")
+    conexao.evento("Browser.downloadWillBegin", guid="b", suggestedFilename="relatorio.xls")
+    conexao.evento("Browser.downloadProgress", guid="b", state="completed")
+
+    assert downloads.aguardar(segundo, "xls") == f"{segundo}/relatorio.xls"
+    with pytest.raises(TimeoutError):
+        downloads.aguardar(primeiro, "pdf", timeout=0.2)
+
+def test_download_cancelado(downloads, conexao):
+    destino = downloads.preparar("estoque_xls")
+    conexao.evento("Browser.downloadWillBegin", guid="a", suggestedFilename="estoque.xls")
+    conexao.evento("Browser.downloadProgress", guid="a", state="canceled")
+
+    with pytest.raises(RuntimeError):
+        downloads.aguardar(destino, "xls")
+
+def test_conexao_encerrada_acompanha_a_pasta(downloads, conexao):
+    destino = downloads.preparar("estoque_xls")
+    with open(f"{destino}/estoque.xls", "wb") as f:
+        f.write(b"planilha")
+    conexao.close()
+
+    assert downloads.aguardar(destino, "xls") == f"{destino}/estoque.xls"
@@ -0,0 +1,84 @@
+import base64
+from email import message_from_bytes
+
+import pytest
+
+from email_sender import enviar_email_com_pdfs
+
+class ErroGmail(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class ServicoFalho:
+    """Substituto da Gmail API que responde com os erros da fila antes de aceitar o envio"""
+    def __init__(self, erros_por_destino):
+        self.erros = {destino: list(erros) for destino, erros in erros_por_destino.items()}
+        self.tentativas = {destino: 0 for destino in erros_por_destino}
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return _Envio(self, body["raw"])
+
+class _Envio:
+    def __init__(self, servico, raw):
+        self.servico = servico
+        self.raw = raw
+
+    def execute(self):
+        destino = message_from_bytes(base64.urlsafe_b64decode(self.raw))["To"]
+        self.servico.tentativas[destino] += 1
+        if self.servico.erros[destino]:
+            raise ErroGmail(self.servico.erros[destino].pop(0))
+        return {"id": f"id-{destino}"}
+
+@pytest.fixture
+def pdfs(tmp_path):
+    caminhos = {}
+    for nome in ("relatorio", "1", "2", "3"):
+        caminho = tmp_path / f"{nome}.pdf"
+        caminho.write_bytes(b"%PDF-1.4\n%%EOF\n")
+        caminhos[nome] = str(caminho)
+    return caminhos
+
+def _enviar(pdfs, erros, tentativas=3):
+    emails = {filial: f"filial{filial}@teste.invalid" for filial in erros}
+    servico = ServicoFalho({emails[f]: e for f, e in erros.items()})
+    resultados = enviar_email_com_pdfs(
+        pdfs["relatorio"], {f: pdfs[f] for f in erros if f in pdfs}, fabrica_servico=lambda: servico,
+        emails_filiais=emails, max_threads=1, envios_por_segundo=0, tentativas=tentativas, espera_base=0,
+    )
+    return resultados, {f: servico.tentativas[emails[f]] for f in erros}
+
+def test_429_e_5xx_sao_retentados(pdfs):
+    resultados, tentativas = _enviar(pdfs, {"1": [429, 503], "2": [500]})
+
+    assert tentativas == {"1": 3, "2": 2}
+    assert resultados["1"] == {"status": "enviado", "id": "id-filial1@teste.invalid", "tentativas": 3, "erro": None}
+    assert resultados["2"]["status"] == "enviado" and resultados["2"]["tentativas"] == 2
+
+def test_4xx_nao_e_retentado(pdfs):
+    resultados, tentativas = _enviar(pdfs, {"1": [400], "2": []})
+
+    assert tentativas == {"1": 1, "2": 1}
+    assert resultados["1"]["status"] == "erro"
+    assert resultados["1"]["tentativas"] == 1
+    assert resultados["2"]["status"] == "enviado"
+
+def test_tentativas_esgotadas_marcam_erro(pdfs):
+    resultados, tentativas = _enviar(pdfs, {"1": [503, 503, 503], "3": [502]}, tentativas=3)
+
+    assert tentativas == {"1": 3, "3": 2}
+    assert resultados["1"] == {"status": "erro", "id": None, "tentativas": 3, "erro": "HTTP 503"}
+    assert resultados["3"]["status"] == "enviado"
+
+def test_filial_sem_etiquetas_nao_e_enviada(pdfs):
+    resultados, tentativas = _enviar(pdfs, {"1": [], "9": []})
+
+    assert tentativas == {"1": 1, "9": 0}
+    assert resultados["9"]["status"] == "sem_etiquetas"
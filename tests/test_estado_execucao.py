@@ -0,0 +1,97 @@
+# test_estado_execucao.py
+import pandas as pd
+import pytest
+
+from estado_execucao import EstadoExecucao, filtrar_alteracoes, pares_enviados
+from etiquetas import produtos_por_filial
+from historico_precos import HistoricoPrecos
+
+DATA = "2026-10-18"
+
+@pytest.fixture
+def estado(tmp_path):
+    estado = EstadoExecucao(caminho=str(tmp_path / "estado.db"), data=DATA)
+    yield estado
+    estado.fechar()
+
+@pytest.fixture
+def historico(tmp_path):
+    historico = HistoricoPrecos(caminho=str(tmp_path / "historico.db"))
+    yield historico
+    historico.fechar()
+
+def _relatorio(alteracoes):
+    return pd.DataFrame(alteracoes, columns=["Código", "Preço"])
+
+def _estoque(filiais, codigos):
+    return pd.DataFrame({
+        "filial": pd.Categorical([f for f in filiais for _ in codigos], categories=filiais),
+        "Código": [c for _ in filiais for c in codigos],
+    })
+
+def _executar(estado, historico, alteracoes, df_estoque, status):
+    """Uma execução: filtros da etapa 1, etiquetas por filial e registro dos envios"""
+    df = filtrar_alteracoes(_relatorio(alteracoes), estado, historico)
+    df = df.assign(EAN="7890000000000")
+    df_estoque = estado.filtrar_estoque(df, df_estoque)
+    produtos_filiais = produtos_por_filial(df, df_estoque)
+    resultados = {str(f): {"status": status.get(f, "enviado")} for f in produtos_filiais}
+    estado.registrar_execucao(df, produtos_filiais, resultados)
+    historico.registrar(pares_enviados(df, produtos_filiais, resultados), data=DATA)
+    return {f: list(zip(d["Código"], d["Preço"])) for f, d in produtos_filiais.items()}
+
+def test_preco_que_volta_no_mesmo_dia_e_impresso(estado, historico):
+    estoque = _estoque([1], [10])
+
+    assert _executar(estado, historico, [(10, 12.00)], estoque, {}) == {1: [(10, 12.00)]}
+    assert _executar(estado, historico, [(10, 12.00), (10, 10.00)], estoque, {}) == {1: [(10, 10.00)]}
+    assert _executar(estado, historico, [(10, 12.00), (10, 10.00), (10, 12.00)], estoque, {}) == {1: [(10, 12.00)]}
+    assert historico.ultimos_precos([10]) == {10: 12.00}
+
+def test_reexecucao_sem_alteracao_nova_nao_imprime(estado, historico):
+    estoque = _estoque([1], [10])
+    _executar(estado, historico, [(10, 12.00)], estoque, {})
+
+    assert _executar(estado, historico, [(10, 12.00)], estoque, {}) == {}
+
+def test_filial_com_falha_recebe_so_ela_na_reexecucao(estado, historico):
+    estoque = _estoque([1, 2], [10, 20])
+
+    primeira = _executar(estado, historico, [(10, 5.00), (20, 7.50)], estoque, {2: "erro"})
+    segunda = _executar(estado, historico, [(10, 5.00), (20, 7.50)], estoque, {})
+
+    assert set(primeira) == {1, 2}
+    assert segunda == {2: [(10, 5.00), (20, 7.50)]}
+    assert _executar(estado, historico, [(10, 5.00), (20, 7.50)], estoque, {}) == {}
+
+def test_sem_ean_fica_pendente(estado):
+    df = _relatorio([(10, 5.00), (20, 7.50)]).assign(EAN=["", "7890000000000"])
+    produtos_filiais = produtos_por_filial(df, _estoque([1], [10, 20]))
+
+    assert pares_enviados(df, produtos_filiais, {"1": {"status": "enviado"}}) == [(20, 7.50)]
+
+def test_envio_parcial_fica_pendente_so_nas_filiais_sem_envio(estado):
+    df = _relatorio([(10, 5.00), (20, 7.50)]).assign(EAN="7890000000000")
+    estoque = _estoque([1, 2, 3], [10, 20])
+    produtos_filiais = produtos_por_filial(df, estoque)
+
+    completos = estado.registrar_execucao(df, produtos_filiais, {
+        "1": {"status": "enviado"}, "2": {"status": "erro"}, "3": {"status": "sem_etiquetas"},
+    })
+
+    assert completos == 0
+    assert estado.pares_processados() == set()
+    assert estado.envios_filiais() == {(1, 10, 5.00), (1, 20, 7.50)}
+    # Nada sai na etapa 1 e só as filiais sem envio confirmado seguem no estoque
+    assert len(estado.filtrar_novos(df)) == 2
+    restante = estado.filtrar_estoque(df, estoque)
+    assert sorted(zip(restante["filial"], restante["Código"])) == [(2, 10), (2, 20), (3, 10), (3, 20)]
+
+    completos = estado.registrar_execucao(df, produtos_por_filial(df, restante), {
+        "2": {"status": "enviado"}, "3": {"status": "enviado"},
+    })
+
+    assert completos == 2
+    assert estado.pares_processados() == {(10, 5.00), (20, 7.50)}
+    assert len(estado.filtrar_novos(df)) == 0
+    assert len(estado.filtrar_estoque(df, estoque)) == 0
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from file_utils import ler_relatorios_precos_departamentos
+from gerador_relatorios import salvar_relatorio_precos
+
+def _relatorio(caminho, linhas):
+    df = pd.DataFrame(linhas, columns=["Código", "Descrição Produto", "Preço Venda Anterior", "Preço Venda Atual"])
+    return salvar_relatorio_precos(df, str(caminho))
+
+def test_preco_mais_recente_de_cada_departamento(tmp_path):
+    arquivos = {
+        "121": _relatorio(tmp_path / "precos_121.xls", [
+            (10, "DIPIRONA", 5.00, 6.00),
+            (20, "PARACETAMOL", 3.00, 3.50),
+            (10, "DIPIRONA", 6.00, 6.50),
+        ]),
+        "130": _relatorio(tmp_path / "precos_130.xls", [
+            (10, "DIPIRONA", 6.50, 9.99),
+            (30, "SHAMPOO", 12.00, 11.00),
+        ]),
+    }
+
+    df = ler_relatorios_precos_departamentos(arquivos)
+
+    assert list(zip(df["Código"], df["Preço"], df["Departamento"])) == [
+        (20, 3.50, "121"), (10, 6.50, "121"), (30, 11.00, "130"),
+    ]
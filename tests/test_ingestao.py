@@ -0,0 +1,47 @@
+import pandas as pd
+
+import ingestao
+from benchmark_estoque import processar_estoque_por_filial_loop
+from gerador_relatorios import LINHA_CABECALHO_ESTOQUE, salvar_relatorio_estoque
+
+# Relatório com as linhas que o laço original tratava caso a caso: cabeçalho repetido
+# no meio do bloco (quebra de página), saldo não numérico, filial sem número,
+# linha "Total" e código vazio encerrando o bloco
+LINHAS_ESTOQUE = [
+    ("Filial:", None, "F01 - LOJA CENTRO", None),
+    (101.0, "DIPIRONA", None, 5),
+    ("Cód.", "Descrição", None, "Saldo"),
+    (202.0, "ALGODAO", None, "S/ SALDO"),
+    ("Total", None, None, None),
+    (None, None, None, None),
+    (303.0, "FORA DE BLOCO", None, 1),
+    ("Filial:", None, "LOJA SEM NUMERO", None),
+    (404.0, "IGNORADO", None, 2),
+    ("Filial:", None, "F03 - LOJA BAIRRO", None),
+    (" 505 ", "SHAMPOO", None, "-"),
+    ("606", "CREME", None, 3),
+    ("", None, None, None),
+    (707.0, "DEPOIS DO BLOCO", None, 4),
+    ("Filial:", None, "F07 - LOJA VAZIA", None),
+    (None, None, None, None),
+]
+
+def _longo(filiais_dict):
+    """Converte o {filial: [códigos]} do laço original na tabela longa da ingestão"""
+    return pd.DataFrame({
+        "filial": pd.Categorical([f for f, codigos in filiais_dict.items() for _ in codigos],
+                                 categories=list(filiais_dict)),
+        "Código": pd.Series([c for codigos in filiais_dict.values() for c in codigos], dtype="int32"),
+    })
+
+def test_parser_vetorizado_igual_ao_laco(tmp_path):
+    df = pd.DataFrame(LINHAS_ESTOQUE, columns=["Cód.", "Descrição", "Unnamed: 2", "Saldo"])
+    caminho = salvar_relatorio_estoque(df, str(tmp_path / "estoque.xls"))
+
+    obtido = ingestao.ler_relatorio_estoque(caminho, usar_cache=False)
+    esperado = _longo(processar_estoque_por_filial_loop(pd.read_excel(caminho, header=LINHA_CABECALHO_ESTOQUE)))
+
+    pd.testing.assert_frame_equal(obtido, esperado)
+    assert obtido.groupby("filial", observed=False)["Código"].apply(list).to_dict() == {
+        1: [101, 202], 3: [505, 606], 7: [],
+    }
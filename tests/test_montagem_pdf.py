@@ -0,0 +1,33 @@
+import pytest
+from reportlab.lib.units import cm
+
+from config import ETIQUETA_LARGURA_CM, ETIQUETA_ALTURA_CM
+from montagem_pdf import MODELOS_IMPOSICAO, modelo_imposicao, posicoes_imposicao
+
+LARGURA, ALTURA = ETIQUETA_LARGURA_CM * cm, ETIQUETA_ALTURA_CM * cm
+# Mesma tolerância de arredondamento usada por posicoes_imposicao
+TOLERANCIA = 0.5
+
+@pytest.mark.parametrize("nome, por_folha", [("a4", 18), ("carta", 16), ("rolo", 10)])
+def test_etiquetas_por_folha_dentro_da_pagina(nome, por_folha):
+    (largura_pagina, altura_pagina), posicoes = posicoes_imposicao(modelo_imposicao(nome), LARGURA, ALTURA)
+
+    assert len(posicoes) == por_folha
+    for x, y in posicoes:
+        assert -TOLERANCIA <= x and x + LARGURA <= largura_pagina + TOLERANCIA
+        assert -TOLERANCIA <= y and y + ALTURA <= altura_pagina + TOLERANCIA
+
+@pytest.mark.parametrize("nome", sorted(MODELOS_IMPOSICAO))
+def test_etiquetas_nao_se_sobrepoem(nome):
+    _, posicoes = posicoes_imposicao(modelo_imposicao(nome), LARGURA, ALTURA)
+
+    for i, (x1, y1) in enumerate(posicoes):
+        for x2, y2 in posicoes[i + 1:]:
+            assert x1 + LARGURA <= x2 + TOLERANCIA or x2 + LARGURA <= x1 + TOLERANCIA \
+                or y1 + ALTURA <= y2 + TOLERANCIA or y2 + ALTURA <= y1 + TOLERANCIA
+
+def test_grade_que_nao_cabe_na_pagina():
+    modelo = modelo_imposicao("personalizado", "21,29.7,3,9,1,1,0.5,0")
+
+    with pytest.raises(ValueError):
+        posicoes_imposicao(modelo, LARGURA, ALTURA)
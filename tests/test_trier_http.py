@@ -0,0 +1,143 @@
+# test_trier_http.py
+import functools
+
+import pandas as pd
+import pytest
+
+import trier_http
+from cache_produtos import CacheProdutos
+from fake_trier import iniciar_servidor_fake, CAMINHO_LOGIN, CAMINHO_PRODUTO
+from scraper import TrierScraper
+from trier_http import TrierHttpClient, consultar_produtos_http
+
+PRODUTOS = {
+    101: ("7890000000101", "DIPIRONA 500MG 10 COMPRIMIDOS"),
+    202: ("", "ALGODAO HIDROFILO 50G"),
+    303: ("7890000000303", "PROTETOR SOLAR FPS 50 120ML"),
+}
+
+# O fake segue o contrato documentado em trier_http (não confirmado no Trier real):
+# estes testes cobrem o comportamento do cliente, não o protocolo de produção
+
+@pytest.fixture
+def servidor():
+    servidor, url_base = iniciar_servidor_fake(PRODUTOS)
+    yield servidor, url_base
+    servidor.shutdown()
+    servidor.server_close()
+
+@pytest.fixture
+def cliente_fake(servidor, monkeypatch):
+    """Faz o consultar_produtos_http usar o servidor fake"""
+    _, url_base = servidor
+    monkeypatch.setattr(trier_http, "TrierHttpClient", functools.partial(
+        TrierHttpClient, login_url=url_base + CAMINHO_LOGIN, produto_url=url_base + CAMINHO_PRODUTO,
+        usuario="teste", senha="teste", max_conexoes=4, timeout=5,
+    ))
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheProdutos(caminho=str(tmp_path / "produtos.db"))
+    yield cache
+    cache.fechar()
+
+def test_consulta_produtos(servidor, cliente_fake, cache):
+    resultados = consultar_produtos_http([101, 202, 303, 101], cache=cache)
+
+    assert resultados == PRODUTOS
+    assert cache.obter_varios(PRODUTOS) == PRODUTOS
+
+def test_codigo_inexistente_fica_para_o_selenium(servidor, cliente_fake):
+    resultados = consultar_produtos_http([101, 999])
+
+    assert resultados == {101: PRODUTOS[101]}
+
+def test_cache_nao_e_consultado_de_novo(servidor, cliente_fake, cache):
+    cache.salvar_varios({101: PRODUTOS[101]})
+    servidor_fake, _ = servidor
+
+    resultados = consultar_produtos_http([101, 303], cache=cache)
+
+    assert resultados == {101: PRODUTOS[101], 303: PRODUTOS[303]}
+    assert servidor_fake.consultas == 1
+    assert (cache.acertos, cache.falhas) == (1, 1)
+
+def test_atualizacao_forcada_entrega_resultados_http(servidor, cliente_fake, tmp_path):
+    cache = CacheProdutos(caminho=str(tmp_path / "produtos.db"), forcar_atualizacao=True)
+    try:
+        resultados = consultar_produtos_http([101, 303], cache=cache)
+    finally:
+        cache.fechar()
+
+    # Sem leitura do cache, a etapa Selenium depende só do retorno
+    assert resultados == {101: PRODUTOS[101], 303: PRODUTOS[303]}
+
+def test_login_expirado_refaz_login_uma_vez(servidor):
+    servidor_fake, url_base = servidor
+    cliente = TrierHttpClient(login_url=url_base + CAMINHO_LOGIN, produto_url=url_base + CAMINHO_PRODUTO,
+                              usuario="teste", senha="teste", max_conexoes=4, timeout=5)
+    try:
+        cliente.login()
+        assert cliente.consultar_produto(101) == PRODUTOS[101]
+
+        servidor_fake.sessoes.clear()
+        resultados = cliente.consultar_produtos(list(PRODUTOS) * 4)
+    finally:
+        cliente.fechar()
+
+    assert resultados == PRODUTOS
+    assert len(servidor_fake.sessoes) == 1
+
+def test_login_recusado_segue_pelo_selenium(servidor, monkeypatch, cache):
+    _, url_base = servidor
+    monkeypatch.setattr(trier_http, "TrierHttpClient", functools.partial(
+        TrierHttpClient, login_url=url_base + CAMINHO_LOGIN, produto_url=url_base + CAMINHO_PRODUTO,
+        usuario="teste", senha="errada", timeout=5,
+    ))
+    cache.salvar_varios({101: PRODUTOS[101]})
+
+    assert consultar_produtos_http([101, 202], cache=cache) == {101: PRODUTOS[101]}
+
+def test_servidor_fora_do_ar_segue_pelo_selenium(monkeypatch):
+    monkeypatch.setattr(trier_http, "TrierHttpClient", functools.partial(
+        TrierHttpClient, login_url="http://127.0.0.1:9/sgfpod1/Login.pod",
+        produto_url="http://127.0.0.1:9/sgfpod1/Produto.pod", usuario="teste", senha="teste", timeout=2,
+    ))
+
+    assert consultar_produtos_http([101, 202]) == {}
+
+def test_sessao_expirada_no_meio_do_lote(servidor):
+    servidor_fake, url_base = servidor
+    servidor_fake.expirar_apos = 3
+    cliente = TrierHttpClient(login_url=url_base + CAMINHO_LOGIN, produto_url=url_base + CAMINHO_PRODUTO,
+                              usuario="teste", senha="teste", max_conexoes=1, timeout=5)
+    try:
+        cliente.login()
+        resultados = cliente.consultar_produtos([101, 202, 303, 101, 202, 303])
+    finally:
+        cliente.fechar()
+
+    # A partir da quarta consulta o fake redireciona para o login; um novo login e o lote continua
+    assert resultados == PRODUTOS
+    assert cliente._logins == 2
+    assert len(servidor_fake.sessoes) == 1
+
+def test_codigos_sem_resposta_http_seguem_para_o_selenium(servidor, cliente_fake, cache, monkeypatch):
+    consultados = []
+
+    def consultar_selenium(self, codigos):
+        consultados.extend(codigos)
+        return {c: ("7890000000999", f"PRODUTO {c}") for c in codigos}
+
+    monkeypatch.setattr(TrierScraper, "consultar_produtos", consultar_selenium)
+    df = pd.DataFrame({"Código": [101, 999, 303, 888]})
+
+    conhecidos = consultar_produtos_http(df["Código"], cache=cache)
+    # Sem abrir o navegador: só a etapa de seleção dos códigos pendentes é exercitada
+    resultados = TrierScraper.__new__(TrierScraper).extrair_dados_produtos(df, cache=cache, conhecidos=conhecidos)
+
+    assert consultados == [999, 888]
+    assert resultados == {
+        101: PRODUTOS[101], 303: PRODUTOS[303],
+        999: ("7890000000999", "PRODUTO 999"), 888: ("7890000000999", "PRODUTO 888"),
+    }